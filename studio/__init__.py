@@ -1,23 +1,28 @@
-"""CV Tailoring Agent Studio package."""
+"""CV Tailoring Agent Studio package.
 
-from .agent import graph
-from .tools import (
-    read_template,
-    read_user_data,
-    write_user_data,
-    read_cv,
-    write_cv,
-    generate_pdf,
-    extract_job_url
-)
+Exports are resolved on first access, so importing the package does not
+build the graph or load the LLM stack until something actually uses it.
+"""
 
-__all__ = [
-    'graph',
-    'read_template',
-    'read_user_data',
-    'write_user_data',
-    'read_cv',
-    'write_cv',
-    'generate_pdf',
-    'extract_job_url'
-]
+import importlib
+
+_EXPORTS = {
+    'graph': '.agent',
+    'read_template': '.tools',
+    'read_user_data': '.tools',
+    'write_user_data': '.tools',
+    'read_cv': '.tools',
+    'write_cv': '.tools',
+    'generate_pdf': '.tools',
+    'extract_job_url': '.tools',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
@@ -6,23 +6,35 @@ It follows a strict set of rules to prevent hallucination and ensure
 all content is grounded in the user's actual data.
 """
 
+import time
+from functools import lru_cache
+
 from langchain_core.messages import SystemMessage
-from langchain_openai import ChatOpenAI
 from langgraph.graph import START, StateGraph, MessagesState, END
 from langgraph.prebuilt import ToolNode, tools_condition
 
+import prefetch
+from resilience import guarded
+from routing import FAST, STRONG, choose_tier, model_for, needs_escalation, routing_metrics
 from tools import (
     read_template,
     read_user_data,
     write_user_data,
+    patch_user_data,
     read_cv,
     write_cv,
+    write_cv_structured,
+    write_cv_variants,
     generate_pdf,
+    export_cv,
+    fit_cv_pages,
     extract_job_url,
     clean_job_description,
     translate_job_description,
     analyze_job_requirements,
-    polish_cv
+    score_cv_keywords,
+    polish_cv,
+    chat_model
 )
 
 # Define all available tools
@@ -30,19 +42,28 @@ tools = [
     read_template,
     read_user_data,
     write_user_data,
+    patch_user_data,
     read_cv,
     write_cv,
+    write_cv_structured,
+    write_cv_variants,
     generate_pdf,
+    export_cv,
+    fit_cv_pages,
     extract_job_url,
     clean_job_description,
     translate_job_description,
     analyze_job_requirements,
+    score_cv_keywords,
     polish_cv
 ]
 
-# Initialize LLM with tools
-llm = ChatOpenAI(model="gpt-5.2")
-llm_with_tools = llm.bind_tools(tools)
+
+@lru_cache(maxsize=None)
+def llm_with_tools(model: str):
+    """LLM bound to the tools, built on the first turn that uses it (not at import)."""
+    return chat_model(model).bind_tools(tools)
+
 
 # System message with strict rules
 SYSTEM_PROMPT = """You are a professional CV tailoring assistant. You create high-quality, job-specific CVs that maximize the user's chances of getting interviews by strategically presenting their background in the language employers use.
@@ -91,6 +112,7 @@ Then wait for their input. Do NOT generate a CV until they provide job details.
 ### [CV MODE] - Creating CVs
 1. **Extract & Process Job**:
    - `extract_job_url` → `clean_job_description` → `translate_job_description` (if non-English) → `analyze_job_requirements`
+   - If `extract_job_url` or `analyze_job_requirements` reports a NEAR-DUPLICATE, compare the stored posting with the new one (title, company, requirements). Only if it is the same vacancy, use the stored description and analysis, skip the remaining steps and offer the CVs it lists (`read_cv`) as a starting point. Otherwise process the new posting, calling `analyze_job_requirements` with `check_reposts=false`
    
 2. **Gather Context**:
    - `read_template` for structure/formatting rules
@@ -98,24 +120,34 @@ Then wait for their input. Do NOT generate a CV until they provide job details.
    
 3. **Generate CV**:
    - Apply Content Tiers and Professional Writing principles
-   - `write_cv` with tailored markdown
+   - `write_cv_structured` with target role, summary, chosen roles with tailored bullets, and ordered skills (header, contact, dates, education and formatting are filled in from user.md)
+   - `score_cv_keywords` with the `analyze_job_requirements` output; work in missing terms only if the user can demonstrate them
    
 4. **Polish & Finalize**:
    - `polish_cv` to ensure professional language
    - `write_cv` again with polished version
    - `generate_pdf` to create final output
+   - If the PDF runs past one page, call `fit_cv_pages` (target_pages=1) before rewriting anything; only shorten the sections it reports as overflowing
+
+### [CV MODE] - Comparing Versions
+When the user wants to compare emphasis options (e.g. leadership- vs technical-heavy) or asks for several versions:
+1. Extract & process the job as above, then `read_user_data`
+2. `write_cv_variants` with the job description, the `analyze_job_requirements` output and the emphases to compare
+3. Report the ranking; the best version is already saved and rendered, the others are kept for comparison
 
 ### [CV MODE] - Editing Existing CVs
 1. `read_cv` to get current content
 2. Make requested changes
 3. `write_cv` with complete updated markdown
 4. `generate_pdf` to regenerate
+5. If the user asks for other formats (Word, HTML, plain text), call `export_cv` once with all of them
 
 ### [PROFILE EDIT MODE]
 When message starts with `[PROFILE EDIT MODE]`:
-1. `read_user_data` → make changes → `write_user_data` with complete content
-2. Preserve existing data unless explicitly asked to remove
-3. Summarize what was changed
+1. `read_user_data` → `patch_user_data` with only the edits (add/update/remove a role, bullet, skill, language or contact field; `set_text` for the summary)
+2. Use `write_user_data` with complete content only for restructuring the whole profile or filling in an empty one
+3. Preserve existing data unless explicitly asked to remove
+4. Summarize what was changed
 
 ---
 ## 3. PROFESSIONAL CV WRITING
@@ -216,20 +248,53 @@ When message starts with `[PROFILE EDIT MODE]`:
 sys_msg = SystemMessage(content=SYSTEM_PROMPT)
 
 
+def _invoke(tier: str, reason: str, messages: list, escalated: bool = False):
+    model = model_for(tier)
+    started = time.perf_counter()
+    response = guarded("openai", model, llm_with_tools(model).invoke, messages)
+    routing_metrics().record(tier, model, reason, time.perf_counter() - started,
+                             response, escalated)
+    return response
+
+
 def assistant(state: MessagesState):
-    """Main assistant node that processes messages and decides on tool calls."""
-    return {"messages": [llm_with_tools.invoke([sys_msg] + state["messages"])]}
+    """Main assistant node that processes messages and decides on tool calls.
+    
+    Planning turns run on the fast model; writing turns (and any fast turn
+    that tries to write content) run on the strong model. See routing.py.
+    """
+    messages = [sys_msg] + state["messages"]
+    tier, reason = choose_tier(state["messages"])
+    response = _invoke(tier, reason, messages)
+    if tier == FAST:
+        escalation = needs_escalation(response)
+        if escalation:
+            response = _invoke(STRONG, escalation, messages, escalated=True)
+    return {"messages": [response]}
+
+
+def prefetch_urls(state: MessagesState):
+    """Start scraping job URLs in the new user message while the assistant thinks.
+    
+    extract_job_url / clean_job_description pick up the results (see prefetch.py).
+    """
+    last = state["messages"][-1] if state["messages"] else None
+    if getattr(last, "type", None) == "human" and isinstance(last.content, str):
+        prefetch.start(last.content)
+    return {}
 
 
 # Build the graph
 builder = StateGraph(MessagesState)
 
 # Add nodes
+builder.add_node("prefetch", prefetch_urls)
 builder.add_node("assistant", assistant)
 builder.add_node("tools", ToolNode(tools))
 
 # Add edges
-builder.add_edge(START, "assistant")
+builder.add_edge(START, "prefetch")
+builder.add_edge("prefetch", "assistant")
 builder.add_conditional_edges(
     "assistant",
     tools_condition,  # Uses built-in routing: returns "tools" if tool calls, else END
@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+"""
+Local, deterministic ATS keyword-coverage scorer.
+
+Scores how well CV markdown covers the requirement lists produced by
+analyze_job_requirements, without calling a model:
+
+1. CVs and requirement terms are tokenized, normalized and stemmed
+   (Porter), and each posting is parsed once.
+2. Everything is mapped onto one shared vocabulary: CVs become a binary
+   CV x vocabulary matrix, requirement terms a binary term x vocabulary
+   matrix.
+3. A single matrix product gives, for every (CV, term) pair, how many of
+   the term's stems the CV contains; category coverage is the mean over
+   each category's terms.
+
+Because all CVs and all postings go through the same product, scoring one
+CV against many postings or many CVs against one posting is one call.
+
+Usage:
+    python3 ats_score.py --cv cv_a.md [cv_b.md ...] --requirements req.json [req2.json ...]
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+from functools import lru_cache
+
+import numpy as np
+
+# Requirement categories: analyze_job_requirements key -> short name
+CATEGORIES = {
+    "core_skills_and_requirements": "skills",
+    "tools_and_technologies": "tools",
+    "soft_skills": "soft_skills",
+    "key_action_verbs": "verbs",
+    "languages": "languages",
+}
+
+# Relative weight of each category in the overall score
+WEIGHTS = {
+    "skills": 0.35,
+    "tools": 0.25,
+    "soft_skills": 0.15,
+    "verbs": 0.10,
+    "languages": 0.15,
+}
+
+# A term counts as covered when at least this share of its stems appear
+COVERED_THRESHOLD = 1.0
+
+_STOPWORDS = frozenset("""
+a an and or the of to in on for with by at as from into via per
+is are be being been will would can should must
+our your their its we you they it this that these those
+etc e.g i.e
+""".split())
+
+# Keeps tokens like "c++", "c#", "node.js", "ci/cd" intact
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#]*(?:[./][a-z0-9+#]+)*")
+
+# Irregular past tenses common in CV bullets ("Led", "Built", ...)
+_IRREGULAR = {
+    "led": "lead", "built": "build", "drove": "drive", "driven": "drive",
+    "ran": "run", "grew": "grow", "grown": "grow", "won": "win", "made": "make",
+    "wrote": "write", "written": "write", "taught": "teach", "sold": "sell",
+    "brought": "bring", "began": "begin", "begun": "begin", "spoke": "speak",
+    "spoken": "speak", "chose": "choose", "chosen": "choose", "held": "hold",
+    "oversaw": "oversee", "overseen": "oversee", "undertook": "undertake",
+}
+
+# Porter (1980) rule tables: (suffix, replacement), longest match per step
+_STEP2 = (
+    ("ational", "ate"), ("tional", "tion"), ("enci", "ence"), ("anci", "ance"),
+    ("izer", "ize"), ("abli", "able"), ("alli", "al"), ("entli", "ent"), ("eli", "e"),
+    ("ousli", "ous"), ("ization", "ize"), ("ation", "ate"), ("ator", "ate"),
+    ("alism", "al"), ("iveness", "ive"), ("fulness", "ful"), ("ousness", "ous"),
+    ("aliti", "al"), ("iviti", "ive"), ("biliti", "ble"),
+)
+_STEP3 = (
+    ("icate", "ic"), ("ative", ""), ("alize", "al"), ("iciti", "ic"),
+    ("ical", "ic"), ("ful", ""), ("ness", ""),
+)
+_STEP4 = (
+    "al", "ance", "ence", "er", "ic", "able", "ible", "ant", "ement", "ment",
+    "ent", "ion", "ou", "ism", "ate", "iti", "ous", "ive", "ize",
+)
+
+
+def _is_consonant(word: str, i: int) -> bool:
+    if word[i] in "aeiou":
+        return False
+    if word[i] == "y":
+        return i == 0 or not _is_consonant(word, i - 1)
+    return True
+
+
+def _measure(stem: str) -> int:
+    """Number of vowel-consonant sequences (Porter's m)."""
+    m, previous_vowel = 0, False
+    for i in range(len(stem)):
+        consonant = _is_consonant(stem, i)
+        if consonant and previous_vowel:
+            m += 1
+        previous_vowel = not consonant
+    return m
+
+
+def _has_vowel(stem: str) -> bool:
+    return any(not _is_consonant(stem, i) for i in range(len(stem)))
+
+
+def _double_consonant(word: str) -> bool:
+    return len(word) >= 2 and word[-1] == word[-2] and _is_consonant(word, len(word) - 1)
+
+
+def _cvc(word: str) -> bool:
+    """Ends consonant-vowel-consonant, the last not w, x or y ("hop", not "snow")."""
+    return (len(word) >= 3 and _is_consonant(word, len(word) - 3)
+            and not _is_consonant(word, len(word) - 2)
+            and _is_consonant(word, len(word) - 1) and word[-1] not in "wxy")
+
+
+def _replace(word: str, rules, min_measure: int) -> str:
+    for suffix, replacement in sorted(rules, key=lambda r: -len(r[0])):
+        if word.endswith(suffix):
+            stem = word[:-len(suffix)]
+            return stem + replacement if _measure(stem) > min_measure else word
+    return word
+
+
+def _porter(word: str) -> str:
+    # Step 1a: plurals
+    if word.endswith("sses") or word.endswith("ies"):
+        word = word[:-2]
+    elif word.endswith("s") and not word.endswith("ss"):
+        word = word[:-1]
+    # Step 1b: -eed, -ed, -ing
+    if word.endswith("eed"):
+        if _measure(word[:-3]) > 0:
+            word = word[:-1]
+    else:
+        for suffix in ("ed", "ing"):
+            if word.endswith(suffix) and _has_vowel(word[:-len(suffix)]):
+                word = word[:-len(suffix)]
+                if word.endswith(("at", "bl", "iz")):
+                    word += "e"
+                elif _double_consonant(word) and word[-1] not in "lsz":
+                    word = word[:-1]
+                elif _measure(word) == 1 and _cvc(word):
+                    word += "e"
+                break
+    # Step 1c: -y -> -i
+    if word.endswith("y") and _has_vowel(word[:-1]):
+        word = word[:-1] + "i"
+    # Steps 2-3: derivational suffixes
+    word = _replace(word, _STEP2, 0)
+    word = _replace(word, _STEP3, 0)
+    # Step 4: strip the remaining suffix when the stem is long enough
+    for suffix in sorted(_STEP4, key=len, reverse=True):
+        if word.endswith(suffix):
+            stem = word[:-len(suffix)]
+            if _measure(stem) > 1 and (suffix != "ion" or stem.endswith(("s", "t"))):
+                word = stem
+            break
+    # Step 5: final -e and -ll
+    if word.endswith("e"):
+        stem = word[:-1]
+        if _measure(stem) > 1 or (_measure(stem) == 1 and not _cvc(stem)):
+            word = stem
+    if _measure(word) > 1 and word.endswith("ll"):
+        word = word[:-1]
+    return word
+
+
+@lru_cache(maxsize=65536)
+def stem(token: str) -> str:
+    """Porter stemmer (deterministic, no dependencies).
+
+    Every word of a family gets the same stem ("process"/"processes",
+    "automation"/"automated"). Only plain alphabetic words are stemmed;
+    technical tokens such as "node.js" or "c++" are kept verbatim.
+    """
+    token = _IRREGULAR.get(token, token)
+    if not token.isalpha() or len(token) <= 2:
+        return token
+    return _porter(token)
+
+
+def normalize(text: str) -> list[str]:
+    """Lowercase, strip markdown, tokenize and stem ``text``."""
+    text = text.lower()
+    text = re.sub(r"[*_`#>|]", " ", text)
+    stems = []
+    for token in _TOKEN_RE.findall(text):
+        token = token.strip("./")
+        if not token or token in _STOPWORDS or token.isdigit():
+            continue
+        stems.append(stem(token))
+    return stems
+
+
+def parse_requirements(requirements: str | dict) -> dict[str, list[str]]:
+    """Parse analyze_job_requirements output into {category: [terms]}.
+
+    Accepts the raw model output (optionally wrapped in a ```json fence),
+    an already-decoded dict, or the result of an earlier call.
+    """
+    if isinstance(requirements, str):
+        match = re.search(r"\{.*\}", requirements, re.DOTALL)
+        if match is None:
+            raise ValueError("No JSON object found in requirements")
+        requirements = json.loads(match.group(0))
+    parsed = {}
+    for key, category in CATEGORIES.items():
+        terms = requirements.get(key, requirements.get(category)) or []
+        if isinstance(terms, str):
+            terms = [terms]
+        parsed[category] = [t for t in terms if isinstance(t, str) and t.strip()]
+    return parsed
+
+
+class _Vocabulary:
+    def __init__(self):
+        self.index: dict[str, int] = {}
+
+    def ids(self, stems) -> list[int]:
+        return [self.index.setdefault(s, len(self.index)) for s in stems]
+
+
+def score_matrix(cvs: list[str], postings: list[str | dict]) -> dict:
+    """Score every CV against every posting in one batched pass.
+
+    Args:
+        cvs: CV markdown texts
+        postings: analyze_job_requirements outputs (JSON strings or dicts),
+            or parse_requirements() results
+
+    Returns:
+        {
+          "categories": [category names],
+          "coverage": array (n_cvs, n_postings, n_categories), NaN where a
+                      posting has no terms in a category,
+          "overall": array (n_cvs, n_postings), weighted 0-1 score,
+          "missing": nested list [cv][posting] -> {category: [terms]},
+        }
+    """
+    categories = list(WEIGHTS)
+    vocab = _Vocabulary()
+
+    # Requirement terms from all postings, stacked into one matrix
+    term_ids, term_posting, term_category, term_text = [], [], [], []
+    parsed = [parse_requirements(posting) for posting in postings]
+    for p, posting in enumerate(parsed):
+        for c, category in enumerate(categories):
+            for term in posting[category]:
+                ids = sorted(set(vocab.ids(normalize(term))))
+                if not ids:
+                    continue
+                term_ids.append(ids)
+                term_posting.append(p)
+                term_category.append(c)
+                term_text.append(term)
+
+    cv_ids = [set(vocab.ids(normalize(text))) for text in cvs]
+
+    n_vocab = len(vocab.index)
+    term_matrix = np.zeros((len(term_ids), n_vocab), dtype=np.float32)
+    for row, ids in enumerate(term_ids):
+        term_matrix[row, ids] = 1.0
+    cv_matrix = np.zeros((len(cvs), n_vocab), dtype=np.float32)
+    for row, ids in enumerate(cv_ids):
+        cv_matrix[row, list(ids)] = 1.0
+
+    # (n_cvs, n_terms): share of each term's stems present in each CV
+    term_len = term_matrix.sum(axis=1)
+    hits = cv_matrix @ term_matrix.T
+    covered = (hits / np.maximum(term_len, 1.0)) >= COVERED_THRESHOLD
+
+    # (n_terms, n_postings * n_categories) one-hot group membership
+    n_groups = len(postings) * len(categories)
+    group = np.asarray(term_posting, dtype=np.int64) * len(categories) + np.asarray(term_category, dtype=np.int64)
+    membership = np.zeros((len(term_ids), n_groups), dtype=np.float32)
+    membership[np.arange(len(term_ids)), group] = 1.0
+    group_sizes = membership.sum(axis=0)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        coverage = (covered.astype(np.float32) @ membership) / group_sizes
+    coverage = coverage.reshape(len(cvs), len(postings), len(categories))
+
+    weights = np.asarray([WEIGHTS[c] for c in categories], dtype=np.float32)
+    present = ~np.isnan(coverage)
+    weighted = np.where(present, coverage, 0.0) @ weights
+    total_weight = present.astype(np.float32) @ weights
+    with np.errstate(invalid="ignore", divide="ignore"):
+        overall = np.where(total_weight > 0, weighted / total_weight, 0.0)
+
+    missing = []
+    for i in range(len(cvs)):
+        per_cv = [{c: [] for c in categories} for _ in postings]
+        for t in np.flatnonzero(~covered[i]):
+            per_cv[term_posting[t]][categories[term_category[t]]].append(term_text[t])
+        missing.append(per_cv)
+
+    return {"categories": categories, "coverage": coverage, "overall": overall, "missing": missing}
+
+
+def score_cv(cv_markdown: str, requirements: str | dict) -> dict:
+    """Score one CV against one posting; returns plain Python values."""
+    result = score_matrix([cv_markdown], [requirements])
+    coverage = {
+        c: (None if np.isnan(v) else round(float(v), 3))
+        for c, v in zip(result["categories"], result["coverage"][0, 0])
+    }
+    return {
+        "overall": round(float(result["overall"][0, 0]), 3),
+        "coverage": coverage,
+        "missing": result["missing"][0][0],
+    }
+
+
+def format_score(score: dict) -> str:
+    """Human-readable summary for the agent."""
+    lines = [f"Keyword coverage: {score['overall']:.0%}"]
+    for category, value in score["coverage"].items():
+        if value is None:
+            continue
+        missing = score["missing"][category]
+        line = f"- {category}: {value:.0%}"
+        if missing:
+            line += f" (missing: {', '.join(missing)})"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Score CV keyword coverage against job requirements.")
+    parser.add_argument("--cv", nargs="+", required=True, help="CV markdown files")
+    parser.add_argument("--requirements", nargs="+", required=True,
+                        help="Files with analyze_job_requirements JSON output")
+    args = parser.parse_args(argv)
+
+    cvs = []
+    for path in args.cv:
+        with open(path, "r") as f:
+            cvs.append(f.read())
+    postings = []
+    for path in args.requirements:
+        with open(path, "r") as f:
+            postings.append(f.read())
+
+    result = score_matrix(cvs, postings)
+    rows = []
+    for i, cv_path in enumerate(args.cv):
+        for j, req_path in enumerate(args.requirements):
+            rows.append({
+                "cv": os.path.basename(cv_path),
+                "requirements": os.path.basename(req_path),
+                "overall": round(float(result["overall"][i, j]), 3),
+                "coverage": {
+                    c: (None if np.isnan(v) else round(float(v), 3))
+                    for c, v in zip(result["categories"], result["coverage"][i, j])
+                },
+                "missing": result["missing"][i][j],
+            })
+    rows.sort(key=lambda r: r["overall"], reverse=True)
+    json.dump(rows, sys.stdout, indent=2)
+    print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
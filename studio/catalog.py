@@ -0,0 +1,485 @@
+#!/usr/bin/env python3
+"""
+SQLite catalog of generated CVs.
+
+Every write_cv / generate_pdf call records what it produced here, so the
+web UI can list CVs with their metadata (job, source URL, hashes, page
+count, sizes, engine, timestamps) without scanning data/output.
+
+The catalog also keeps an append-only change feed: clients remember the
+last sequence number they saw and ask only for newer events.
+
+Listing reads the catalog only, so it costs one page, not one directory
+scan. The tools and the web routes write through write_cv_file /
+record_pdf; files changed around them (manual edits and deletes) are
+reconciled by ``sync``, by ``list --sync``, by the prerender service's
+periodic sync_if_changed(), and once on the first listing of a new
+catalog.
+
+Usage (used by the web API routes):
+    python3 catalog.py list [--limit N] [--cursor C] [--query Q] [--has-pdf]
+    python3 catalog.py changes [--since SEQ] [--limit N]
+    python3 catalog.py sync
+    python3 catalog.py write JOB_NAME < cv.md
+    python3 catalog.py record-pdf JOB_NAME --engine ENGINE
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: renders are not coordinated across processes
+    fcntl = None
+
+# Directory paths relative to this file
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.getenv("CV_DATA_DIR") or os.path.join(BASE_DIR, "data")
+OUTPUT_DIR = os.path.join(DATA_DIR, "output")
+USER_MD_PATH = os.path.join(DATA_DIR, "user.md")
+CATALOG_PATH = os.path.join(OUTPUT_DIR, "catalog.db")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cvs (
+    job_name        TEXT PRIMARY KEY,
+    source_url      TEXT,
+    md_path         TEXT NOT NULL,
+    md_sha256       TEXT,
+    md_size         INTEGER,
+    profile_sha256  TEXT,
+    pdf_path        TEXT,
+    pdf_sha256      TEXT,
+    pdf_size        INTEGER,
+    page_count      INTEGER,
+    engine          TEXT,
+    created_at      REAL NOT NULL,
+    updated_at      REAL NOT NULL,
+    rendered_at     REAL
+);
+CREATE INDEX IF NOT EXISTS cvs_updated ON cvs (updated_at DESC, job_name DESC);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key         TEXT PRIMARY KEY,
+    value       TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS changes (
+    seq         INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_name    TEXT NOT NULL,
+    event       TEXT NOT NULL,
+    at          REAL NOT NULL
+);
+"""
+
+# Matches page objects ("/Type /Page") but not the page tree ("/Type /Pages")
+_PDF_PAGE_RE = re.compile(rb"/Type\s*/Page(?![a-zA-Z])")
+
+
+def safe_job_name(job_name: str) -> str:
+    """Sanitize a job name the same way the CV tools build filenames."""
+    return job_name.lower().replace(" ", "_").replace("-", "_")
+
+
+def sha256_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def sha256_file(path: str) -> str | None:
+    """Hash a file's contents, or None if it does not exist."""
+    if not os.path.exists(path):
+        return None
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def pdf_page_count(pdf_path: str) -> int | None:
+    """Count pages in a PDF by counting its page objects.
+
+    Good enough for the PDFs pandoc/weasyprint produce (uncompressed object
+    dictionaries); returns None when the file is missing or unreadable.
+    """
+    try:
+        with open(pdf_path, "rb") as f:
+            count = len(_PDF_PAGE_RE.findall(f.read()))
+    except OSError:
+        return None
+    return count or None
+
+
+def connect(path: str = CATALOG_PATH) -> sqlite3.Connection:
+    """Open the catalog, creating the schema on first use."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=10)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+@contextmanager
+def transaction(path: str = CATALOG_PATH):
+    """Yield a connection inside a single IMMEDIATE transaction."""
+    conn = connect(path)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        yield conn
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+@contextmanager
+def render_lock(output_path: str):
+    """Hold an exclusive lock on ``output_path`` while rendering it.
+
+    The agent's tools, the prerender service and the web routes run in
+    different processes and write the same PDFs; the lock (a hidden file
+    next to the output) makes them take turns.
+    """
+    directory, name = os.path.split(output_path)
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, f".{name}.lock"), "a") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def temp_output_path(output_path: str) -> str:
+    """Hidden sibling of ``output_path`` (same extension) to render into before os.replace."""
+    directory, name = os.path.split(output_path)
+    return os.path.join(directory, f".{name}.{os.getpid()}.tmp{os.path.splitext(name)[1]}")
+
+
+def is_fresh(output_path: str, inputs: list[str]) -> bool:
+    """True if ``output_path`` exists and is newer than every existing input."""
+    try:
+        output_mtime = os.path.getmtime(output_path)
+    except OSError:
+        return False
+    return all(output_mtime >= os.path.getmtime(p) for p in inputs if os.path.exists(p))
+
+
+def _log_change(conn: sqlite3.Connection, job_name: str, event: str, at: float) -> None:
+    conn.execute(
+        "INSERT INTO changes (job_name, event, at) VALUES (?, ?, ?)",
+        (job_name, event, at),
+    )
+
+
+def _atomic_write(path: str, data: bytes) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def write_cv_file(job_name: str, md_path: str, content: str, source_url: str = "") -> None:
+    """Write a CV markdown file and record it in the catalog in one transaction.
+
+    The file is written to a temp path first and moved into place only while
+    the catalog row is being updated, so a failed write leaves neither a
+    half-written file nor a stale row behind.
+    """
+    data = content.encode("utf-8")
+    now = time.time()
+    with transaction() as conn:
+        existing = conn.execute(
+            "SELECT 1 FROM cvs WHERE job_name = ?", (job_name,)
+        ).fetchone()
+        conn.execute(
+            """INSERT INTO cvs (job_name, source_url, md_path, md_sha256, md_size,
+                                profile_sha256, created_at, updated_at)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+               ON CONFLICT(job_name) DO UPDATE SET
+                   source_url = COALESCE(excluded.source_url, source_url),
+                   md_path = excluded.md_path, md_sha256 = excluded.md_sha256,
+                   md_size = excluded.md_size, profile_sha256 = excluded.profile_sha256,
+                   updated_at = excluded.updated_at""",
+            (job_name, source_url or None, md_path, sha256_bytes(data), len(data),
+             sha256_file(USER_MD_PATH), now, now),
+        )
+        _log_change(conn, job_name, "written" if existing else "created", now)
+        _atomic_write(md_path, data)
+
+
+def record_pdf(job_name: str, md_path: str, pdf_path: str, engine: str) -> None:
+    """Record a freshly rendered PDF (or HTML fallback) for a CV."""
+    now = time.time()
+    pdf_size = os.path.getsize(pdf_path) if os.path.exists(pdf_path) else None
+    page_count = pdf_page_count(pdf_path) if pdf_path.endswith(".pdf") else None
+    with transaction() as conn:
+        existing = conn.execute(
+            "SELECT 1 FROM cvs WHERE job_name = ?", (job_name,)
+        ).fetchone()
+        if existing is None:
+            # CV written outside write_cv (e.g. the web editor): backfill the row
+            md_size = os.path.getsize(md_path) if os.path.exists(md_path) else None
+            conn.execute(
+                """INSERT INTO cvs (job_name, md_path, md_sha256, md_size,
+                                    created_at, updated_at)
+                   VALUES (?, ?, ?, ?, ?, ?)""",
+                (job_name, md_path, sha256_file(md_path), md_size, now, now),
+            )
+        conn.execute(
+            """UPDATE cvs SET pdf_path = ?, pdf_sha256 = ?, pdf_size = ?,
+                              page_count = ?, engine = ?, rendered_at = ?,
+                              updated_at = ?
+               WHERE job_name = ?""",
+            (pdf_path, sha256_file(pdf_path), pdf_size, page_count, engine,
+             now, now, job_name),
+        )
+        _log_change(conn, job_name, "rendered", now)
+
+
+def _row_to_dict(row: sqlite3.Row) -> dict:
+    item = dict(row)
+    item["pdf_filename"] = os.path.basename(item["pdf_path"]) if item.get("pdf_path") else None
+    item["md_filename"] = os.path.basename(item["md_path"])
+    return item
+
+
+def _encode_cursor(row: sqlite3.Row) -> str:
+    return f"{row['updated_at']!r}|{row['job_name']}"
+
+
+def _decode_cursor(cursor: str) -> tuple[float, str]:
+    updated_at, _, job_name = cursor.partition("|")
+    return float(updated_at), job_name
+
+
+def list_cvs(limit: int = 50, cursor: str | None = None, query: str | None = None,
+             has_pdf: bool = False) -> dict:
+    """Return one page of CVs, most recently updated first.
+
+    Pagination is keyset-based (``cursor`` is the ``next_cursor`` of the
+    previous page), so each page costs O(limit) regardless of catalog size.
+    ``query`` filters by substring of the job name or source URL.
+    """
+    clauses = []
+    params: list = []
+    if cursor:
+        updated_at, job_name = _decode_cursor(cursor)
+        clauses.append("(updated_at < ? OR (updated_at = ? AND job_name < ?))")
+        params.extend([updated_at, updated_at, job_name])
+    if query:
+        clauses.append("(job_name LIKE ? OR source_url LIKE ?)")
+        pattern = f"%{query.lower()}%"
+        params.extend([pattern, pattern])
+    if has_pdf:
+        clauses.append("pdf_path IS NOT NULL AND pdf_path LIKE '%.pdf'")
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+    conn = connect()
+    try:
+        rows = conn.execute(
+            f"SELECT * FROM cvs {where} ORDER BY updated_at DESC, job_name DESC LIMIT ?",
+            params + [limit + 1],
+        ).fetchall()
+        last_seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM changes").fetchone()[0]
+    finally:
+        conn.close()
+
+    page = rows[:limit]
+    next_cursor = _encode_cursor(page[-1]) if len(rows) > limit else None
+    return {
+        "items": [_row_to_dict(r) for r in page],
+        "next_cursor": next_cursor,
+        "last_seq": last_seq,
+    }
+
+
+def changes_since(since: int = 0, limit: int = 500) -> dict:
+    """Return catalog events with a sequence number greater than ``since``."""
+    conn = connect()
+    try:
+        rows = conn.execute(
+            "SELECT seq, job_name, event, at FROM changes WHERE seq > ? ORDER BY seq LIMIT ?",
+            (since, limit),
+        ).fetchall()
+    finally:
+        conn.close()
+    events = [dict(r) for r in rows]
+    return {"events": events, "last_seq": events[-1]["seq"] if events else since}
+
+
+def _cv_files() -> list[str]:
+    if not os.path.isdir(OUTPUT_DIR):
+        return []
+    return sorted(
+        f for f in os.listdir(OUTPUT_DIR)
+        if f.startswith("cv_") and (f.endswith(".md") or f.endswith(".pdf"))
+    )
+
+
+def disk_signature() -> str:
+    """Digest of the names, mtimes and sizes of the CV files (stat only)."""
+    digest = hashlib.sha256()
+    for name in _cv_files():
+        try:
+            st = os.stat(os.path.join(OUTPUT_DIR, name))
+        except OSError:
+            continue
+        digest.update(f"{name}\0{st.st_mtime_ns}\0{st.st_size}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _synced_before() -> bool:
+    conn = connect()
+    try:
+        return conn.execute("SELECT 1 FROM meta WHERE key = 'disk_signature'").fetchone() is not None
+    finally:
+        conn.close()
+
+
+def sync_if_changed() -> int:
+    """Run sync_from_disk() only if the CV files changed since the last sync."""
+    signature = disk_signature()
+    conn = connect()
+    try:
+        row = conn.execute("SELECT value FROM meta WHERE key = 'disk_signature'").fetchone()
+    finally:
+        conn.close()
+    if row is not None and row["value"] == signature:
+        return 0
+    touched = sync_from_disk()
+    with transaction() as conn:
+        conn.execute(
+            "INSERT INTO meta (key, value) VALUES ('disk_signature', ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (signature,),
+        )
+    return touched
+
+
+def sync_from_disk() -> int:
+    """Reconcile the catalog with data/output.
+
+    Adds rows for CV files the catalog has not seen, refreshes rows whose
+    files changed on disk and drops rows whose markdown is gone. Returns the
+    number of rows touched. Meant for first start and for edits made
+    outside the Python tools.
+    """
+    if not os.path.isdir(OUTPUT_DIR):
+        return 0
+    on_disk = {f[len("cv_"):-len(".md")] for f in _cv_files() if f.endswith(".md")}
+    touched = 0
+    now = time.time()
+    with transaction() as conn:
+        known = {
+            r["job_name"]: r
+            for r in conn.execute("SELECT job_name, updated_at, md_sha256, pdf_sha256 FROM cvs")
+        }
+        for job_name in sorted(known.keys() - on_disk):
+            conn.execute("DELETE FROM cvs WHERE job_name = ?", (job_name,))
+            _log_change(conn, job_name, "deleted", now)
+            touched += 1
+        for job_name in sorted(on_disk):
+            md_path = os.path.join(OUTPUT_DIR, f"cv_{job_name}.md")
+            pdf_path = os.path.join(OUTPUT_DIR, f"cv_{job_name}.pdf")
+            row = known.get(job_name)
+            mtimes = [os.path.getmtime(p) for p in (md_path, pdf_path) if os.path.exists(p)]
+            pdf_unchanged = (row is not None and
+                             (row["pdf_sha256"] is not None) == os.path.exists(pdf_path))
+            if pdf_unchanged and row["updated_at"] >= max(mtimes):
+                # Only stat() unchanged files; hashing is for files that moved
+                continue
+            md_hash = sha256_file(md_path)
+            pdf_hash = sha256_file(pdf_path)
+            if row is not None and row["md_sha256"] == md_hash and row["pdf_sha256"] == pdf_hash:
+                continue
+            mtime = os.path.getmtime(md_path)
+            conn.execute(
+                """INSERT INTO cvs (job_name, md_path, md_sha256, md_size,
+                                    pdf_path, pdf_sha256, pdf_size, page_count,
+                                    created_at, updated_at, rendered_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT(job_name) DO UPDATE SET
+                       md_sha256 = excluded.md_sha256, md_size = excluded.md_size,
+                       pdf_path = excluded.pdf_path, pdf_sha256 = excluded.pdf_sha256,
+                       pdf_size = excluded.pdf_size, page_count = excluded.page_count,
+                       updated_at = excluded.updated_at""",
+                (job_name, md_path, md_hash, os.path.getsize(md_path),
+                 pdf_path if pdf_hash else None, pdf_hash,
+                 os.path.getsize(pdf_path) if pdf_hash else None,
+                 pdf_page_count(pdf_path) if pdf_hash else None,
+                 mtime, now, os.path.getmtime(pdf_path) if pdf_hash else None),
+            )
+            _log_change(conn, job_name, "synced", now)
+            touched += 1
+    return touched
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Query the CV output catalog.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    list_p = sub.add_parser("list", help="List CVs, newest first")
+    list_p.add_argument("--limit", type=int, default=50)
+    list_p.add_argument("--cursor")
+    list_p.add_argument("--query")
+    list_p.add_argument("--has-pdf", action="store_true")
+    list_p.add_argument("--sync", action="store_true", help="Reconcile with disk first")
+
+    changes_p = sub.add_parser("changes", help="Show catalog events after a sequence number")
+    changes_p.add_argument("--since", type=int, default=0)
+    changes_p.add_argument("--limit", type=int, default=500)
+
+    sub.add_parser("sync", help="Reconcile the catalog with data/output")
+
+    write_p = sub.add_parser("write", help="Write cv_<JOB_NAME>.md from stdin and record it")
+    write_p.add_argument("job_name")
+
+    pdf_p = sub.add_parser("record-pdf", help="Record a PDF rendered outside the tools")
+    pdf_p.add_argument("job_name")
+    pdf_p.add_argument("--engine", default="unknown")
+
+    args = parser.parse_args(argv)
+    if args.command == "list":
+        if args.sync:
+            sync_from_disk()
+        elif not _synced_before():
+            sync_if_changed()
+        result = list_cvs(args.limit, args.cursor, args.query, args.has_pdf)
+    elif args.command == "changes":
+        result = changes_since(args.since, args.limit)
+    elif args.command == "write":
+        job_name = safe_job_name(args.job_name)
+        md_path = os.path.join(OUTPUT_DIR, f"cv_{job_name}.md")
+        write_cv_file(job_name, md_path, sys.stdin.read())
+        result = {"written": md_path}
+    elif args.command == "record-pdf":
+        job_name = safe_job_name(args.job_name)
+        md_path = os.path.join(OUTPUT_DIR, f"cv_{job_name}.md")
+        pdf_path = os.path.join(OUTPUT_DIR, f"cv_{job_name}.pdf")
+        if not os.path.exists(pdf_path):
+            print(f"No PDF at {pdf_path}", file=sys.stderr)
+            return 1
+        record_pdf(job_name, md_path, pdf_path, args.engine)
+        result = {"recorded": pdf_path}
+    else:
+        result = {"synced": sync_from_disk()}
+
+    json.dump(result, sys.stdout)
+    print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+"""
+Local assembly of CV markdown from a compact structured selection.
+
+Instead of writing the whole CV (header, contact lines, separators,
+education, formatting), the model returns only the tailored parts:
+
+    {
+      "target_role": "Senior Product Manager",
+      "summary": "Product leader with ...",
+      "roles": [
+        {"role": "Operations Manager | Example GmbH",
+         "bullets": ["Led ...", "Built ..."]},
+        {"role": "3", "description": "One-sentence summary of a less relevant role."}
+      ],
+      "skills": {
+        "competencies": ["..."], "soft_skills": ["..."],
+        "tools": ["..."], "languages": ["..."]
+      }
+    }
+
+Everything else comes from user.md and is laid out here exactly as
+template.md prescribes. Sections user.md has nothing for (e.g. no
+education) are left out; profile_gaps() names them so validation can
+treat them as warnings. Roles are referenced by "Title | Company" as in
+user.md (or their 1-based position), so titles, companies and dates
+cannot drift from the profile.
+"""
+
+import re
+
+import user_profile
+
+SEPARATOR = "---"
+
+# Skills line labels, in template order
+SKILL_LABELS = [
+    ("competencies", "Competencies"),
+    ("soft_skills", "Soft Skills"),
+    ("tools", "Tools"),
+    ("languages", "Languages"),
+]
+
+_PLACEHOLDER_RE = re.compile(r"^\[.*\]$")
+
+
+class SelectionError(ValueError):
+    """The structured selection does not match the profile."""
+
+
+def _real(value: str) -> str:
+    """Drop unfilled template placeholders like '[your.email@example.com]'."""
+    value = value.replace("(optional)", "").strip()
+    return "" if not value or _PLACEHOLDER_RE.match(value) else value
+
+
+def _match_role(ref: str, roles: list[user_profile.Role]) -> user_profile.Role:
+    ref = ref.strip()
+    if ref.isdigit():
+        index = int(ref) - 1
+        if 0 <= index < len(roles):
+            return roles[index]
+        raise SelectionError(f"Role #{ref} does not exist; profile has {len(roles)} roles.")
+    wanted = ref.casefold()
+    for role in roles:
+        if role.label.casefold() == wanted:
+            return role
+    # Tolerate "Title at Company" / company-only references
+    matches = [r for r in roles if r.company and r.company.casefold() in wanted
+               or r.title.casefold() == wanted]
+    if len(matches) == 1:
+        return matches[0]
+    known = "; ".join(r.label for r in roles)
+    raise SelectionError(f"Role '{ref}' not found in profile. Known roles: {known}")
+
+
+def _header(info: dict[str, str], target_role: str) -> list[str]:
+    contact = []
+    location = _real(info.get("location", ""))
+    if location:
+        contact.append(location)
+    for key, label in (("email", "Email"), ("phone", "Phone"), ("telegram", "Telegram")):
+        value = _real(info.get(key, ""))
+        if value:
+            contact.append(f"{label}: {value}")
+    lines = [f"# {_real(info.get('name', ''))}", f"**{target_role.strip()}**"]
+    if contact:
+        lines.append(" | ".join(contact))
+    linkedin = _real(info.get("linkedin", ""))
+    if linkedin:
+        lines.append(f"LinkedIn: {linkedin}")
+    # Two trailing spaces on every header line but the last
+    return [line + "  " for line in lines[:-1]] + [lines[-1]]
+
+
+def _education_line(item: str) -> str:
+    """'**Degree** — Field | Uni' (user.md) -> '**Degree — Field** | Uni' (template)."""
+    match = re.match(r"^\*\*(.+?)\*\*\s*(—\s*[^|]+?)?\s*(\|.*)?$", item)
+    if match is None:
+        return item
+    degree, field, rest = match.group(1), match.group(2), match.group(3)
+    bold = f"**{degree} {field.strip()}**" if field else f"**{degree}**"
+    return f"{bold} {rest.strip()}" if rest else bold
+
+
+def _language_item(item: str) -> str:
+    """'English — C1' (user.md) -> 'English (C1)' (template)."""
+    name, sep, level = item.partition("—")
+    return f"{name.strip()} ({level.strip()})" if sep and level.strip() else item.strip()
+
+
+def _education(root: user_profile.Node) -> list[str]:
+    return [_education_line(item) for item in user_profile.list_items(root, "education")
+            if not _PLACEHOLDER_RE.match(item)]
+
+
+def profile_gaps(profile: "str | user_profile.Node") -> tuple[str, ...]:
+    """Template section keys assemble_cv() leaves out because user.md has no entries."""
+    root = user_profile.parse(profile) if isinstance(profile, str) else profile
+    return () if _education(root) else ("EDUCATION",)
+
+
+def assemble_cv(selection: dict, profile: "str | user_profile.Node") -> str:
+    """Build the full CV markdown from a selection and user.md (text or parsed tree)."""
+    root = user_profile.parse(profile) if isinstance(profile, str) else profile
+    info = user_profile.personal_info(root)
+    if not _real(info.get("name", "")):
+        raise SelectionError("user.md has no name under Personal Information.")
+    profile_roles = user_profile.roles(root)
+
+    target_role = (selection.get("target_role") or "").strip()
+    summary = (selection.get("summary") or "").strip()
+    if not target_role or not summary:
+        raise SelectionError("Selection needs both 'target_role' and 'summary'.")
+
+    lines = _header(info, target_role)
+    lines += ["", SEPARATOR, "", "## PROFESSIONAL SUMMARY", "", summary, "", SEPARATOR, ""]
+
+    lines += ["## PROFESSIONAL EXPERIENCE", ""]
+    for chosen in selection.get("roles") or []:
+        role = _match_role(str(chosen.get("role", "")), profile_roles)
+        lines.append(f"### {role.label}")
+        if role.date_line:
+            lines.append(role.date_line)
+        bullets = [b.strip().lstrip("-* ").strip() for b in chosen.get("bullets") or [] if b.strip()]
+        description = (chosen.get("description") or "").strip()
+        lines.append("")
+        if bullets:
+            lines += [f"- {b}" for b in bullets]
+        elif description:
+            lines.append(description)
+        lines.append("")
+    lines += [SEPARATOR, ""]
+
+    education = _education(root)
+    if education:
+        lines += ["## EDUCATION & CERTIFICATIONS", ""]
+        lines += [line + "  " for line in education[:-1]] + [education[-1]]
+        lines += ["", SEPARATOR, ""]
+
+    skills = dict(selection.get("skills") or {})
+    if not skills.get("languages"):
+        skills["languages"] = [_language_item(item) for item in user_profile.list_items(root, "languages")]
+    skill_lines = [
+        f"**{label}:** {', '.join(s.strip() for s in skills[key] if s.strip())}"
+        for key, label in SKILL_LABELS
+        if skills.get(key)
+    ]
+    if skill_lines:
+        lines += ["## SKILLS & LANGUAGES", ""]
+        lines += [line + "  " for line in skill_lines[:-1]] + [skill_lines[-1]]
+
+    return "\n".join(lines).rstrip() + "\n"
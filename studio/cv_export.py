@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+One-pass export of a CV to several formats.
+
+The markdown is parsed once into pandoc's JSON AST; every writer (HTML,
+DOCX, plain text, PDF) starts from that AST instead of re-reading the
+markdown, and the writers run concurrently. cv_style.css (plus the saved
+fit_cv_pages layout, if any) is read once and shared:
+
+- html: standalone page with the stylesheet inlined, so it can be sent as is
+- pdf:  with weasyprint, the HTML above is laid out directly by the
+        weasyprint library (no second pandoc run); other engines get the
+        AST with the same arguments generate_pdf uses
+- docx: pandoc's Word writer
+- txt:  pandoc's plain-text writer
+
+Outputs are written next to the markdown as cv_<job>.<ext>, with
+per-format timings in the report.
+
+Usage:
+    python3 cv_export.py <job_name> [--formats pdf html docx txt] [--json]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from catalog import OUTPUT_DIR, record_pdf, render_lock, safe_job_name, temp_output_path
+from layout_fit import load_fit, saved_fit_args
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ASSETS_DIR = os.path.join(BASE_DIR, "assets")
+CSS_PATH = os.path.join(ASSETS_DIR, "cv_style.css")
+HEADER_PATH = os.path.join(ASSETS_DIR, "cv_header.tex")
+
+# format -> file extension
+FORMATS = {"pdf": "pdf", "html": "html", "docx": "docx", "txt": "txt"}
+
+
+def pdf_args(md_path: str, engine: str, css_path: str = CSS_PATH,
+             header_path: str = HEADER_PATH) -> list[str]:
+    """Pandoc arguments for rendering the CV to PDF with ``engine``."""
+    args = ['--standalone', f'--pdf-engine={engine}']
+    if engine in ('pdflatex', 'xelatex'):
+        # Reuse the layout chosen by fit_cv_pages, if any
+        layout_args = saved_fit_args(md_path, engine) or [
+            '-V', 'geometry:margin=0.6in',
+            '-V', 'fontsize=10pt',
+            '-V', 'linestretch=1.05',
+        ]
+        header = ['-H', header_path] if os.path.exists(header_path) else []
+        return args + layout_args + header
+    return args + ['--css', css_path] + saved_fit_args(md_path, engine)
+
+
+def _stylesheet(md_path: str, css_path: str) -> str:
+    """cv_style.css followed by the saved page-fit overrides."""
+    with open(css_path, "r") as f:
+        css = f.read()
+    params = load_fit(md_path)
+    if params is not None:
+        css += "\n" + params.css()
+    return css
+
+
+def _inline_css(html: str, css: str) -> str:
+    return html.replace("</head>", f"<style>\n{css}\n</style>\n</head>", 1)
+
+
+def export_cv(md_path: str, formats: list[str], engine: str | None,
+              css_path: str = CSS_PATH, header_path: str = HEADER_PATH) -> dict:
+    """Write the requested formats of ``md_path``; returns paths, timings and errors.
+
+    ``engine`` is the PDF engine from generate_pdf's detection; "pdf" is
+    reported as an error when it is None.
+    """
+    import pypandoc
+
+    unknown = [f for f in formats if f not in FORMATS]
+    if unknown:
+        raise ValueError(f"Unknown format(s): {', '.join(unknown)}. Choose from {', '.join(FORMATS)}.")
+    stem = md_path[:-len(".md")]
+    outputs, timings, errors = {}, {}, {}
+
+    export_started = time.perf_counter()
+    with open(md_path, "r") as f:
+        ast = pypandoc.convert_text(f.read(), 'json', format='markdown')
+    css = _stylesheet(md_path, css_path)
+    timings["parse"] = time.perf_counter() - export_started
+
+    def timed(name, render):
+        started = time.perf_counter()
+        path = f"{stem}.{FORMATS[name]}"
+        tmp_path = temp_output_path(path)
+        try:
+            # Readers never see a half-written file
+            render(tmp_path)
+            os.replace(tmp_path, path)
+            outputs[name] = path
+        except Exception as e:
+            errors[name] = str(e)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        timings[name] = time.perf_counter() - started
+
+    html_needed = "html" in formats or ("pdf" in formats and engine == "weasyprint")
+    html = None
+    if html_needed:
+        started = time.perf_counter()
+        html = pypandoc.convert_text(ast, 'html', format='json',
+                                     extra_args=['--standalone', '--metadata', 'pagetitle=CV'])
+        timings["html_convert"] = time.perf_counter() - started
+
+    def write_html(path):
+        with open(path, "w") as f:
+            f.write(_inline_css(html, css))
+
+    def write_pdf(path):
+        if engine is None:
+            raise RuntimeError("no PDF engine available")
+        if engine == "weasyprint":
+            from weasyprint import CSS, HTML
+            HTML(string=html, base_url=os.path.dirname(md_path)).write_pdf(
+                path, stylesheets=[CSS(string=css)])
+        else:
+            pypandoc.convert_text(ast, 'pdf', format='json', outputfile=path,
+                                  extra_args=pdf_args(md_path, engine, css_path, header_path))
+
+    def write_docx(path):
+        pypandoc.convert_text(ast, 'docx', format='json', outputfile=path)
+
+    def write_txt(path):
+        pypandoc.convert_text(ast, 'plain', format='json', outputfile=path)
+
+    writers = {"html": write_html, "pdf": write_pdf, "docx": write_docx, "txt": write_txt}
+    with ThreadPoolExecutor(max_workers=len(formats) or 1) as pool:
+        for name in dict.fromkeys(formats):
+            pool.submit(timed, name, writers[name])
+    timings["total"] = time.perf_counter() - export_started
+
+    return {
+        "outputs": outputs,
+        "errors": errors,
+        "timings_ms": {name: round(seconds * 1000, 1) for name, seconds in timings.items()},
+    }
+
+
+def format_report(report: dict) -> str:
+    """Human-readable summary for the agent."""
+    timings = report["timings_ms"]
+    lines = [f"Parsed once in {timings['parse']} ms."]
+    for name, path in report["outputs"].items():
+        lines.append(f"- {name}: {path} ({timings[name]} ms)")
+    for name, error in report["errors"].items():
+        lines.append(f"- {name}: FAILED - {error}")
+    lines.append(f"Total {timings['total']} ms.")
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Export a CV to several formats from one parse.")
+    parser.add_argument("job_name")
+    parser.add_argument("--formats", nargs="+", default=list(FORMATS), choices=list(FORMATS))
+    parser.add_argument("--engine", default="weasyprint",
+                        help="PDF engine (weasyprint, wkhtmltopdf, xelatex, pdflatex)")
+    parser.add_argument("--json", action="store_true", help="Print a JSON report")
+    args = parser.parse_args(argv)
+
+    safe_name = safe_job_name(args.job_name)
+    md_path = os.path.join(OUTPUT_DIR, f"cv_{safe_name}.md")
+    if not os.path.exists(md_path):
+        print(f"Error: No markdown file found at {md_path}", file=sys.stderr)
+        return 1
+    # Same lock as generate_pdf and the prerender service
+    with render_lock(md_path[:-len(".md")] + ".pdf"):
+        report = export_cv(md_path, args.formats, args.engine)
+        if "pdf" in report["outputs"]:
+            record_pdf(safe_name, md_path, report["outputs"]["pdf"], args.engine)
+    if args.json:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        print(format_report(report))
+    return 1 if report["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
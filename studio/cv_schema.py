@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+CV schema compiled from data/template.md, plus a single-pass validator.
+
+template.md is compiled once (and again only when it changes) into a
+CVSchema: the required sections and their order, the role header format,
+skill labels and the numeric limits stated in its rules (summary
+sentences, bullets per role, word budget).
+
+validate_cv() then walks the CV line by line exactly once. While walking,
+it normalizes formatting (trailing two spaces for PDF line breaks, blank
+lines after headings and before bullet lists) and collects
+machine-readable violations:
+
+    {"code": "too_many_bullets", "severity": "error", "line": 27,
+     "section": "PROFESSIONAL EXPERIENCE", "message": "..."}
+
+Errors are structural problems the agent must fix (missing or misordered
+sections, summary too long, ...). Warnings are reported but do not block
+a write. Formatting issues are fixed silently.
+
+Usage (used by the web editor's save route):
+    python3 cv_schema.py --normalize < cv.md   # prints {"content", "violations"}
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+from dataclasses import asdict, dataclass, field
+
+# Directory paths relative to this file
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.getenv("CV_DATA_DIR") or os.path.join(BASE_DIR, "data")
+TEMPLATE_PATH = os.path.join(DATA_DIR, "template.md")
+
+# Words that do not identify a section ("PROFESSIONAL SUMMARY" -> SUMMARY)
+_GENERIC_TITLE_WORDS = {"PROFESSIONAL", "&", "AND"}
+
+_SENTENCE_END_RE = re.compile(r"(?<!\be\.g)(?<!\bi\.e)(?<!\betc)[.!?](?=\s+[A-Z(]|\s*$)")
+_SKILL_LINE_RE = re.compile(r"^\*\*([^*]+?):\*\*")
+_ROLE_DATE_RE = re.compile(r"^\*[^*].*\*\s*$")
+_NA_RE = re.compile(r"\bN/A\b")
+
+
+@dataclass
+class CVSchema:
+    """Structure and limits extracted from template.md."""
+    sections: list[str]                      # "## " titles in required order
+    section_keys: list[str]                  # identifying word per section
+    skill_labels: list[str] = field(default_factory=list)
+    summary_max_sentences: int = 4
+    max_bullets_per_role: int = 4
+    max_words: int = 500
+
+    def key_for(self, title: str) -> str | None:
+        """Map a CV heading to the template section it stands for."""
+        words = set(re.findall(r"[A-Z&]+", title.upper()))
+        for key in self.section_keys:
+            if key in words:
+                return key
+        return None
+
+
+def compile_template(template: str) -> CVSchema:
+    """Compile template.md text into a CVSchema."""
+    sections, keys, skill_labels = [], [], []
+    in_code = False
+    for line in template.split("\n"):
+        if line.startswith("```"):
+            in_code = not in_code
+            continue
+        if not in_code:
+            continue
+        if line.startswith("## "):
+            title = line[3:].strip()
+            words = [w for w in re.findall(r"[A-Z&]+", title.upper()) if w not in _GENERIC_TITLE_WORDS]
+            sections.append(title)
+            keys.append(words[0] if words else title.upper())
+        match = _SKILL_LINE_RE.match(line)
+        if match and not match.group(1).startswith("["):
+            skill_labels.append(match.group(1))
+
+    schema = CVSchema(sections=sections, section_keys=keys, skill_labels=skill_labels)
+    match = re.search(r"Maximum (\d+) sentences", template, re.IGNORECASE)
+    if match:
+        schema.summary_max_sentences = int(match.group(1))
+    match = re.search(r"max (\d+) bullets per role", template, re.IGNORECASE)
+    if match:
+        schema.max_bullets_per_role = int(match.group(1))
+    match = re.search(r"~?\d+\s*-\s*(\d+) words", template)
+    if match:
+        schema.max_words = int(match.group(1))
+    return schema
+
+
+_schema_cache: dict[str, tuple[float, CVSchema]] = {}
+
+
+def load_schema(template_path: str = TEMPLATE_PATH) -> CVSchema:
+    """Return the compiled schema, recompiling only when template.md changes.
+
+    Without a template only formatting is normalized (no section rules).
+    """
+    if not os.path.exists(template_path):
+        return CVSchema(sections=[], section_keys=[])
+    mtime = os.path.getmtime(template_path)
+    cached = _schema_cache.get(template_path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    with open(template_path, "r") as f:
+        schema = compile_template(f.read())
+    _schema_cache[template_path] = (mtime, schema)
+    return schema
+
+
+@dataclass
+class Violation:
+    code: str
+    severity: str  # "error" | "warning"
+    line: int      # 1-based line in the submitted CV (0 = whole document)
+    section: str | None
+    message: str
+
+
+def _needs_break(kind: str, line: str, next_line: str) -> bool:
+    """Whether ``line`` needs two trailing spaces given the next line."""
+    if not next_line.strip() or next_line.startswith(("#", "---", "- ", "* ")):
+        return False
+    if kind == "header":
+        return True
+    if kind == "skills":
+        return line.startswith("**") and bool(_SKILL_LINE_RE.match(next_line))
+    if kind == "education":
+        return line.startswith("**") and next_line.startswith("**")
+    return False
+
+
+def validate_cv(content: str, schema: CVSchema | None = None,
+                optional_sections: tuple[str, ...] = ()) -> tuple[str, list[Violation]]:
+    """Validate and normalize a CV in one pass over its lines.
+
+    Returns (normalized markdown, violations). Each line is held back by
+    one step so its trailing line break can be decided from the next line;
+    nothing else needs lookahead. Missing sections whose key is in
+    ``optional_sections`` (e.g. "EDUCATION" when user.md has none) are
+    warnings instead of errors.
+    """
+    schema = schema or load_schema()
+    violations: list[Violation] = []
+    out: list[str] = []
+
+    def report(code, severity, line_no, message):
+        violations.append(Violation(code, severity, line_no, current_title, message))
+
+    current_title = None
+    current_key = None
+    kind = None                # "header" | "summary" | "experience" | "skills" | "education" | None
+    seen_keys: list[str] = []
+    seen_h1 = False
+    summary_text: list[str] = []
+    summary_line = 0
+    role_line = 0
+    role_bullets = 0
+    expect_date = False
+    words = 0
+
+    pending: str | None = None     # previous line, not yet emitted
+    pending_kind = None
+
+    def emit(line: str) -> None:
+        nonlocal pending, pending_kind
+        if pending is not None:
+            prev = pending.rstrip()
+            if _needs_break(pending_kind, prev, line):
+                prev += "  "
+            # Blank line after section headings, and before headings,
+            # separators (pandoc would read text + '---' as a heading)
+            # and the first bullet of a list
+            out.append(prev)
+            if prev.strip() and (
+                (prev.startswith("## ") and line.strip())
+                or line.startswith(("#", "---"))
+                or (line.startswith("- ") and not prev.startswith("- "))
+            ):
+                out.append("")
+        pending, pending_kind = line, kind
+
+    def close_role():
+        if role_line and role_bullets > schema.max_bullets_per_role:
+            violations.append(Violation(
+                "too_many_bullets", "error", role_line, current_title,
+                f"Role has {role_bullets} bullets; max {schema.max_bullets_per_role}.",
+            ))
+
+    def close_section():
+        close_role()
+        if current_key == _summary_key(schema) and summary_text:
+            sentences = len(_SENTENCE_END_RE.findall(" ".join(summary_text)))
+            if sentences > schema.summary_max_sentences:
+                violations.append(Violation(
+                    "summary_too_long", "error", summary_line, current_title,
+                    f"Summary has {sentences} sentences; max {schema.summary_max_sentences}.",
+                ))
+
+    for line_no, raw in enumerate(content.split("\n"), start=1):
+        line = raw.rstrip()
+        stripped = line.strip()
+
+        if line.startswith("# "):
+            if seen_h1:
+                report("duplicate_name_heading", "error", line_no,
+                       "Only the candidate's name may use a '# ' heading.")
+            elif seen_keys:
+                report("name_not_first", "error", line_no, "The name heading must come first.")
+            seen_h1 = True
+            kind = "header"
+        elif line.startswith("## "):
+            close_section()
+            current_title = line[3:].strip()
+            current_key = schema.key_for(current_title)
+            role_line = role_bullets = 0
+            expect_date = False
+            if current_key is None:
+                report("unknown_section", "warning", line_no,
+                       f"Section '{current_title}' is not in the template.")
+                kind = None
+            else:
+                if current_key in seen_keys:
+                    report("duplicate_section", "error", line_no,
+                           f"Section '{current_title}' appears twice.")
+                elif seen_keys and schema.section_keys.index(current_key) < max(
+                        schema.section_keys.index(k) for k in seen_keys):
+                    report("section_order", "error", line_no,
+                           f"Section '{current_title}' is out of order; expected order: "
+                           f"{', '.join(schema.sections)}.")
+                seen_keys.append(current_key)
+                kind = {"SUMMARY": "summary", "EXPERIENCE": "experience",
+                        "EDUCATION": "education", "SKILLS": "skills"}.get(current_key, "section")
+                summary_line = line_no
+                summary_text = []
+        elif line.startswith("### "):
+            if kind != "experience":
+                report("misplaced_role_heading", "warning", line_no,
+                       "'### ' headings are for roles inside the experience section.")
+            close_role()
+            role_line, role_bullets = line_no, 0
+            if " | " not in line:
+                report("bad_role_header", "error", line_no,
+                       "Role heading must be '### [Job Title] | [Company Name]'.")
+            expect_date = True
+        elif line.startswith("#"):
+            report("bad_heading_level", "error", line_no,
+                   "Use '#' for the name, '##' for sections and '###' for roles only.")
+        elif stripped:
+            if expect_date:
+                if not _ROLE_DATE_RE.match(stripped):
+                    report("missing_date_line", "warning", line_no,
+                           "Role heading should be followed by '*[Start] – [End] | [Location]*'.")
+                expect_date = False
+            if line.startswith(("- ", "* ")) and kind == "experience":
+                role_bullets += 1
+            if kind == "summary" and not stripped.startswith("---"):
+                summary_text.append(stripped)
+            if kind == "skills" and line.startswith("**"):
+                match = _SKILL_LINE_RE.match(line)
+                if match is None:
+                    report("bad_skill_line", "warning", line_no,
+                           "Skill lines must look like '**Label:** item, item'.")
+                elif schema.skill_labels and match.group(1) not in schema.skill_labels:
+                    report("unknown_skill_label", "warning", line_no,
+                           f"Skill label '{match.group(1)}' is not one of: "
+                           f"{', '.join(schema.skill_labels)}.")
+            if _NA_RE.search(line):
+                report("na_value", "error", line_no, "Omit missing fields instead of writing 'N/A'.")
+            if not stripped.startswith("---"):
+                words += len(stripped.split())
+
+        if stripped.startswith("---") and kind == "header":
+            kind = None
+        # Collapse runs of blank lines
+        if stripped or (pending is not None and pending.strip()):
+            emit(line)
+    close_section()
+    emit("")
+
+    if not seen_h1:
+        violations.append(Violation("missing_name", "error", 0, None,
+                                    "CV must start with '# [Full Name]'."))
+    for title, key in zip(schema.sections, schema.section_keys):
+        if key in seen_keys:
+            continue
+        if key in optional_sections:
+            violations.append(Violation("missing_section", "warning", 0, None,
+                                        f"Section '## {title}' left out: user.md has no entries for it."))
+        else:
+            violations.append(Violation("missing_section", "error", 0, None,
+                                        f"Missing required section '## {title}'."))
+    if words > schema.max_words * 1.2:
+        violations.append(Violation(
+            "too_long", "warning", 0, None,
+            f"CV has ~{words} words; target is at most {schema.max_words} (one page).",
+        ))
+
+    normalized = "\n".join(out).strip("\n") + "\n"
+    return normalized, violations
+
+
+def _summary_key(schema: CVSchema) -> str | None:
+    return "SUMMARY" if "SUMMARY" in schema.section_keys else None
+
+
+def errors(violations: list[Violation]) -> list[Violation]:
+    return [v for v in violations if v.severity == "error"]
+
+
+def violations_json(violations: list[Violation]) -> str:
+    return json.dumps([asdict(v) for v in violations], indent=2, ensure_ascii=False)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Validate and normalize CV markdown against template.md.")
+    parser.add_argument("--normalize", action="store_true",
+                        help="Read CV from stdin, print JSON with normalized content and violations")
+    parser.add_argument("path", nargs="?", help="CV file to validate (default: stdin)")
+    args = parser.parse_args(argv)
+
+    if args.path:
+        with open(args.path, "r") as f:
+            content = f.read()
+    else:
+        content = sys.stdin.read()
+
+    normalized, violations = validate_cv(content)
+    if args.normalize:
+        json.dump({"content": normalized, "violations": [asdict(v) for v in violations]},
+                  sys.stdout, ensure_ascii=False)
+        print()
+    else:
+        print(violations_json(violations))
+    return 1 if errors(violations) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,159 @@
+"""
+Local ranking of alternative CV drafts for the same job.
+
+write_cv_variants (tools.py) asks the model for several drafts at once,
+each with a different emphasis (leadership, technical, ...), and this
+module picks the one to keep without any further AI call or PDF render:
+
+- keyword coverage: all drafts are scored against the requirements in a
+  single ats_score.score_matrix() pass
+- page fit: the page count is estimated from the markdown with the same
+  font size, margins and line height the renderers use (layout_fit), at
+  the default layout and at the most compact one fit_cv_pages may pick
+Drafts with template errors (cv_schema) are dropped by the caller before
+ranking. The winner becomes cv_<job>.md; once it is saved, the others are
+kept under data/output/variants/<job>/ for comparison (outside the CV
+listing). Each run replaces that directory as a whole, so it never mixes
+drafts from an earlier job description with the current ones.
+"""
+
+import math
+import os
+import re
+import shutil
+
+from ats_score import score_matrix
+from layout_fit import DEFAULT_PARAMS, LADDER, LayoutParams
+
+# Built-in emphases; any other string is used as the emphasis itself
+EMPHASES = {
+    "leadership": "Lead with people and program leadership: team size, stakeholders, "
+                  "ownership of outcomes and cross-functional coordination.",
+    "technical": "Lead with hands-on technical depth: tools, systems, data and "
+                 "automation the user built or ran, with concrete metrics.",
+    "impact": "Lead with business results: revenue, cost, time saved and growth, "
+              "putting the biggest measurable outcomes first.",
+    "balanced": "Balance leadership, technical depth and business results evenly, "
+                "mirroring the order of the job's requirements.",
+}
+DEFAULT_EMPHASES = ["leadership", "technical", "balanced"]
+# Drafts requested from the model at the same time
+MAX_CONCURRENT_DRAFTS = 4
+
+A4_HEIGHT_IN = 11.69
+A4_WIDTH_IN = 8.27
+# Average glyph width as a share of the font size (body text in cv_style.css)
+_CHAR_WIDTH_EM = 0.5
+
+_HEADING_LINES = {1: 2.2, 2: 1.8, 3: 1.3}
+
+
+def emphasis_instructions(emphasis: str) -> str:
+    return EMPHASES.get(emphasis.strip().lower(), emphasis.strip())
+
+
+def estimate_pages(markdown: str, params: LayoutParams = DEFAULT_PARAMS) -> float:
+    """Approximate rendered page count of CV markdown at ``params``."""
+    line_pt = params.font_size * params.line_height
+    lines_per_page = (A4_HEIGHT_IN - 2 * params.margin_v) * 72 / line_pt
+    chars_per_line = (A4_WIDTH_IN - 2 * params.margin_h) * 72 / (params.font_size * _CHAR_WIDTH_EM)
+
+    lines = 0.0
+    for line in markdown.split("\n"):
+        stripped = line.strip()
+        if not stripped:
+            lines += 0.4
+            continue
+        heading = re.match(r"^(#{1,6})\s", stripped)
+        if heading:
+            lines += _HEADING_LINES.get(len(heading.group(1)), 1.3)
+        elif stripped == "---":
+            lines += 0.8
+        else:
+            text = re.sub(r"[*_`]", "", stripped)
+            indent = 3 if re.match(r"^[-*]\s", stripped) else 0
+            lines += math.ceil(len(text) / (chars_per_line - indent))
+    return lines / lines_per_page
+
+
+def page_fit(markdown: str, target_pages: int) -> dict:
+    """Estimated pages, and how well the draft fits ``target_pages`` (1.0 = as is)."""
+    default = estimate_pages(markdown, DEFAULT_PARAMS)
+    compact = estimate_pages(markdown, LADDER[-1])
+    if default <= target_pages:
+        fit = 1.0
+    elif compact <= target_pages:
+        # fit_cv_pages can make it fit by tightening the layout
+        fit = 0.9 - 0.2 * (default - target_pages) / max(default - compact, 1e-6)
+    else:
+        fit = max(0.0, 0.5 - 0.5 * (compact - target_pages))
+    return {"pages": round(default, 2), "pages_compact": round(compact, 2), "fit": round(fit, 3)}
+
+
+def rank_variants(drafts: dict[str, str], requirements: str, target_pages: int = 1) -> list[dict]:
+    """Score valid drafts ({emphasis: markdown}); best first.
+
+    Score = 0.7 * keyword coverage + 0.3 * page fit.
+    """
+    names = list(drafts)
+    result = score_matrix([drafts[name] for name in names], [requirements])
+    ranked = []
+    for i, name in enumerate(names):
+        fit = page_fit(drafts[name], target_pages)
+        coverage = float(result["overall"][i, 0])
+        ranked.append({
+            "emphasis": name,
+            "score": round(0.7 * coverage + 0.3 * fit["fit"], 3),
+            "coverage": round(coverage, 3),
+            "missing": sum(len(terms) for terms in result["missing"][i][0].values()),
+            **fit,
+        })
+    ranked.sort(key=lambda r: r["score"], reverse=True)
+    return ranked
+
+
+def variants_dir(output_dir: str, safe_name: str) -> str:
+    return os.path.join(output_dir, "variants", safe_name)
+
+
+def variant_path(output_dir: str, safe_name: str, emphasis: str) -> str:
+    slug = re.sub(r"[^a-z0-9]+", "_", emphasis.lower()).strip("_")[:40] or "variant"
+    return os.path.join(variants_dir(output_dir, safe_name), f"{slug}.md")
+
+
+def save_variants(output_dir: str, safe_name: str, drafts: dict[str, str]) -> str:
+    """Replace the job's variants directory with ``drafts`` ({emphasis: markdown}).
+
+    The drafts are written to a hidden sibling directory which is then
+    swapped in, so readers see either the previous set or the new one.
+    Returns the directory.
+    """
+    target = variants_dir(output_dir, safe_name)
+    parent = os.path.dirname(target)
+    os.makedirs(parent, exist_ok=True)
+    staging = os.path.join(parent, f".{safe_name}.{os.getpid()}.tmp")
+    retired = os.path.join(parent, f".{safe_name}.{os.getpid()}.old")
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    try:
+        for emphasis, markdown in drafts.items():
+            with open(os.path.join(staging, os.path.basename(
+                    variant_path(output_dir, safe_name, emphasis))), "w") as f:
+                f.write(markdown)
+        if os.path.isdir(target):
+            os.replace(target, retired)
+        os.replace(staging, target)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+        shutil.rmtree(retired, ignore_errors=True)
+    return target
+
+
+def format_ranking(ranked: list[dict]) -> str:
+    """Human-readable comparison for the agent."""
+    lines = []
+    for place, r in enumerate(ranked, start=1):
+        lines.append(f"{place}. {r['emphasis']}: score {r['score']:.2f} "
+                     f"(coverage {r['coverage']:.0%}, ~{r['pages']} pages, "
+                     f"{r['missing']} requirement terms missing)")
+    return "\n".join(lines)
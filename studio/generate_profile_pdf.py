@@ -8,12 +8,11 @@ import os
 import sys
 import subprocess
 
+from catalog import BASE_DIR, DATA_DIR, USER_MD_PATH, is_fresh, render_lock, temp_output_path
+
 # Directory paths
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-DATA_DIR = os.path.join(BASE_DIR, "data")
 ASSETS_DIR = os.path.join(BASE_DIR, "assets")
 
-USER_MD_PATH = os.path.join(DATA_DIR, "user.md")
 PROFILE_PDF_PATH = os.path.join(DATA_DIR, "profile_preview.pdf")
 CSS_PATH = os.path.join(ASSETS_DIR, "cv_style.css")
 
@@ -37,22 +36,25 @@ def get_pdf_engine():
     return None
 
 
-def generate_pdf():
-    """Generate PDF from user.md."""
+def render_profile_pdf(only_if_stale: bool = False) -> str:
+    """Render user.md to profile_preview.pdf and return the PDF path.
+    
+    Raises RuntimeError when inputs or a PDF engine are missing, so callers
+    running in-process (e.g. prerender.py) can handle failures themselves.
+    With ``only_if_stale``, a PDF newer than user.md and the stylesheet is
+    left as is (another process may have just rendered it).
+    """
     import pypandoc
     
     if not os.path.exists(USER_MD_PATH):
-        print(f"Error: {USER_MD_PATH} not found", file=sys.stderr)
-        sys.exit(1)
+        raise RuntimeError(f"{USER_MD_PATH} not found")
     
     if not os.path.exists(CSS_PATH):
-        print(f"Error: {CSS_PATH} not found", file=sys.stderr)
-        sys.exit(1)
+        raise RuntimeError(f"{CSS_PATH} not found")
     
     engine = get_pdf_engine()
     if engine is None:
-        print("Error: No PDF engine available", file=sys.stderr)
-        sys.exit(1)
+        raise RuntimeError("No PDF engine available")
     
     extra_args = ['--standalone', f'--pdf-engine={engine}']
     
@@ -67,14 +69,29 @@ def generate_pdf():
         # For weasyprint
         extra_args.extend(['--css', CSS_PATH])
     
+    with render_lock(PROFILE_PDF_PATH):
+        if only_if_stale and is_fresh(PROFILE_PDF_PATH, [USER_MD_PATH, CSS_PATH]):
+            return PROFILE_PDF_PATH
+        tmp_path = temp_output_path(PROFILE_PDF_PATH)
+        try:
+            pypandoc.convert_file(
+                USER_MD_PATH,
+                'pdf',
+                outputfile=tmp_path,
+                extra_args=extra_args
+            )
+            os.replace(tmp_path, PROFILE_PDF_PATH)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    return PROFILE_PDF_PATH
+
+
+def generate_pdf():
+    """Generate PDF from user.md."""
     try:
-        pypandoc.convert_file(
-            USER_MD_PATH,
-            'pdf',
-            outputfile=PROFILE_PDF_PATH,
-            extra_args=extra_args
-        )
-        print(f"success:{PROFILE_PDF_PATH}")
+        pdf_path = render_profile_pdf()
+        print(f"success:{pdf_path}")
     except Exception as e:
         print(f"Error: {str(e)}", file=sys.stderr)
         sys.exit(1)
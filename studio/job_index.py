@@ -0,0 +1,497 @@
+#!/usr/bin/env python3
+"""
+Near-duplicate index of job postings, so reposts skip the LLM pipeline.
+
+The same vacancy is often reposted on several boards with small wording
+changes. Every posting that goes through extract_job_url ->
+clean_job_description -> translate_job_description ->
+analyze_job_requirements is recorded here with the output of each stage.
+A stage's stored output is reused silently only for exactly the same
+input (sha256). When a new posting is merely a near-duplicate of a
+recorded one, the stored outputs (and any CV already tailored for it) are
+shown to the agent with a notice (format_match): two postings can share
+most of their text (company boilerplate) and still be different jobs, so
+the agent compares them and decides whether to reuse.
+
+Similarity is the Jaccard index of 5-word shingles, estimated with a
+128-value MinHash signature. Signatures are banded (16 bands x 8 rows)
+into an in-memory LSH table, so a lookup is a few dict probes plus a
+comparison against the handful of candidates: microseconds, regardless
+of how many postings are stored. Two kinds of text are indexed:
+
+- raw:  scraped page content (extract_job_url / clean_job_description input)
+- text: the description the analysis ran on (cleaned or translated)
+
+A repost on another board wraps the same description in different page
+chrome, so its raw page is not a near-duplicate of the first one. Scraped
+pages are therefore also checked for *containing* a recorded description:
+the MinHash estimate of containment shortlists candidates, which are then
+verified on exact shingles. This runs in extract_job_url, before
+clean_job_description, so a confirmed repost skips the LLM clean as well.
+
+Postings live in their own database (data/output/jobs.db), so CV catalog
+writes do not invalidate the in-memory LSH table; it is rebuilt only when
+another process records a posting.
+
+Configuration (environment variables):
+    CV_DUP_THRESHOLD   minimum estimated similarity (default 0.8)
+
+Usage:
+    python3 job_index.py list
+    python3 job_index.py match <file>      # check a posting against the index
+"""
+
+import argparse
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+
+import numpy as np
+
+import catalog
+from catalog import OUTPUT_DIR, sha256_bytes
+
+JOBS_DB_PATH = os.path.join(OUTPUT_DIR, "jobs.db")
+
+NUM_PERM = 128
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_WORDS = 5
+# Containment candidates verified on exact shingles per lookup
+MAX_CONTAINMENT_CHECKS = 5
+
+# Universal hashing (a*x + b) mod p over 32-bit shingle hashes; a, b < 2^32
+# keep a*x + b inside uint64.
+_PRIME = np.uint64(4294967311)
+_rng = np.random.default_rng(20240611)
+_A = _rng.integers(1, 2**32 - 1, NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, 2**32 - 1, NUM_PERM, dtype=np.uint64)
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS postings (
+    id           INTEGER PRIMARY KEY AUTOINCREMENT,
+    url          TEXT,
+    raw_sha256   TEXT,
+    raw_sig      BLOB,
+    clean        TEXT,
+    clean_sha256 TEXT,
+    english      TEXT,
+    english_sha256 TEXT,
+    text_sig     BLOB,
+    text_shingles INTEGER,
+    analysis     TEXT,
+    created_at   REAL NOT NULL,
+    updated_at   REAL NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS postings_raw ON postings (raw_sha256);
+CREATE INDEX IF NOT EXISTS postings_clean ON postings (clean_sha256);
+CREATE INDEX IF NOT EXISTS postings_english ON postings (english_sha256);
+"""
+
+KINDS = ("raw", "text")
+
+
+def threshold() -> float:
+    return float(os.getenv("CV_DUP_THRESHOLD", "0.8"))
+
+
+def _sha(text: str) -> str:
+    return sha256_bytes(text.strip().encode("utf-8"))
+
+
+def shingles(text: str) -> np.ndarray:
+    """32-bit hashes of the overlapping 5-word windows of ``text``."""
+    words = _WORD_RE.findall(text.lower())
+    if not words:
+        return np.zeros(0, dtype=np.uint64)
+    width = min(SHINGLE_WORDS, len(words))
+    hashes = {
+        zlib.crc32(" ".join(words[i:i + width]).encode("utf-8"))
+        for i in range(len(words) - width + 1)
+    }
+    return np.fromiter(hashes, dtype=np.uint64, count=len(hashes))
+
+
+def _minhash(hashed: np.ndarray) -> np.ndarray:
+    return ((np.outer(hashed, _A) + _B) % _PRIME).min(axis=0)
+
+
+def signature(text: str) -> np.ndarray | None:
+    """MinHash signature of ``text``; None for text without words."""
+    hashed = shingles(text)
+    return None if hashed.size == 0 else _minhash(hashed)
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    return float(np.count_nonzero(a == b)) / NUM_PERM
+
+
+def _band_keys(sig: np.ndarray) -> list[tuple[int, bytes]]:
+    return [(band, sig[band * ROWS:(band + 1) * ROWS].tobytes()) for band in range(BANDS)]
+
+
+@dataclass
+class Match:
+    posting_id: int
+    similarity: float
+    url: str | None
+    clean: str | None
+    english: str | None
+    analysis: str | None
+    cvs: list[str]          # job names of CVs tailored for this posting
+
+    @property
+    def description(self) -> str | None:
+        return self.english or self.clean
+
+
+class JobIndex:
+    """Postings in SQLite plus an in-memory LSH table over their signatures."""
+
+    def __init__(self, path: str = JOBS_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+        self._data_version = None
+        self._buckets = {kind: {} for kind in KINDS}   # kind -> band key -> {id}
+        self._sigs = {kind: {} for kind in KINDS}      # kind -> id -> signature
+        self._text_shingles: dict[int, int] = {}       # id -> shingle count of its text
+        self._text_matrix = None                       # (ids, stacked text signatures)
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+            self._conn.row_factory = sqlite3.Row
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+        return self._conn
+
+    def _add_to_lsh(self, kind: str, posting_id: int, sig: np.ndarray,
+                    shingle_count: int | None = None) -> None:
+        self._sigs[kind][posting_id] = sig
+        for key in _band_keys(sig):
+            self._buckets[kind].setdefault(key, set()).add(posting_id)
+        if kind == "text":
+            self._text_shingles[posting_id] = shingle_count or 0
+            self._text_matrix = None
+
+    def _refresh(self) -> sqlite3.Connection:
+        """Rebuild the LSH table if another connection changed the postings."""
+        conn = self._connection()
+        version = conn.execute("PRAGMA data_version").fetchone()[0]
+        if version != self._data_version:
+            self._buckets = {kind: {} for kind in KINDS}
+            self._sigs = {kind: {} for kind in KINDS}
+            self._text_shingles = {}
+            self._text_matrix = None
+            for row in conn.execute("SELECT id, raw_sig, text_sig, text_shingles FROM postings"):
+                if row["raw_sig"]:
+                    self._add_to_lsh("raw", row["id"], np.frombuffer(row["raw_sig"], dtype=np.uint64))
+                if row["text_sig"]:
+                    self._add_to_lsh("text", row["id"], np.frombuffer(row["text_sig"], dtype=np.uint64),
+                                     row["text_shingles"])
+            self._data_version = version
+        return conn
+
+    def _match(self, conn: sqlite3.Connection, posting_id: int, score: float) -> Match:
+        row = conn.execute("SELECT * FROM postings WHERE id = ?", (posting_id,)).fetchone()
+        cvs = []
+        if row["url"]:
+            catalog_conn = catalog.connect()
+            try:
+                cvs = [r[0] for r in catalog_conn.execute(
+                    "SELECT job_name FROM cvs WHERE source_url = ? ORDER BY updated_at DESC",
+                    (row["url"],),
+                )]
+            finally:
+                catalog_conn.close()
+        return Match(posting_id, score, row["url"], row["clean"], row["english"], row["analysis"], cvs)
+
+    def _satisfies(self, conn, posting_id: int, require: str | None) -> bool:
+        return require is None or conn.execute(
+            f"SELECT {require} IS NOT NULL FROM postings WHERE id = ?", (posting_id,)
+        ).fetchone()[0]
+
+    def _nearest(self, conn, kind: str, sig: np.ndarray,
+                 require: str | None = None) -> tuple[int, float] | None:
+        """Most similar posting above the threshold (with ``require`` set, if given)."""
+        candidates = set()
+        for key in _band_keys(sig):
+            candidates |= self._buckets[kind].get(key, set())
+        scored = sorted(((similarity(sig, self._sigs[kind][posting_id]), posting_id)
+                         for posting_id in candidates), reverse=True)
+        for score, posting_id in scored:
+            if score < threshold():
+                break
+            if self._satisfies(conn, posting_id, require):
+                return posting_id, score
+        return None
+
+    def _contained(self, conn, page_hashes: np.ndarray, sig: np.ndarray,
+                   require: str | None) -> tuple[int, float] | None:
+        """Posting whose description appears (>= threshold of its shingles) in the page."""
+        if not self._sigs["text"]:
+            return None
+        if self._text_matrix is None:
+            ids = list(self._sigs["text"])
+            self._text_matrix = (np.asarray(ids), np.stack([self._sigs["text"][i] for i in ids]))
+        ids, matrix = self._text_matrix
+        counts = np.asarray([self._text_shingles[i] for i in ids], dtype=np.float64)
+
+        # |A & B| = J / (1 + J) * (|A| + |B|); containment of A in B = |A & B| / |A|
+        jaccard = (matrix == sig).mean(axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            estimate = jaccard / (1 + jaccard) * (counts + page_hashes.size) / counts
+        # MinHash is coarse when the page is much larger than the description,
+        # so shortlist generously and verify exactly
+        shortlist = [i for i in np.argsort(-estimate)[:MAX_CONTAINMENT_CHECKS]
+                     if estimate[i] >= threshold() * 0.6]
+        page_set = set(page_hashes.tolist())
+        best = None
+        for i in shortlist:
+            posting_id = int(ids[i])
+            row = conn.execute("SELECT clean FROM postings WHERE id = ?", (posting_id,)).fetchone()
+            text_hashes = set(shingles(row["clean"] or "").tolist())
+            if not text_hashes:
+                continue
+            containment = len(text_hashes & page_set) / len(text_hashes)
+            if containment >= threshold() and (best is None or containment > best[1]) \
+                    and self._satisfies(conn, posting_id, require):
+                best = (posting_id, containment)
+        return best
+
+    def find(self, text: str, kind: str = "text", require: str | None = "analysis") -> Match | None:
+        """Best recorded posting whose ``kind`` text is a near-duplicate of ``text``."""
+        sig = signature(text)
+        if sig is None:
+            return None
+        with self._lock:
+            conn = self._refresh()
+            best = self._nearest(conn, kind, sig, require)
+            return None if best is None else self._match(conn, *best)
+
+    def find_in_page(self, page: str, require: str | None = "analysis") -> Match | None:
+        """Recorded posting that ``page`` (a scraped page) reposts.
+
+        Either the page is a near-duplicate of a recorded page, or it
+        contains a recorded description (the same vacancy on another board).
+        """
+        hashed = shingles(page)
+        if hashed.size == 0:
+            return None
+        sig = _minhash(hashed)
+        with self._lock:
+            conn = self._refresh()
+            best = (self._nearest(conn, "raw", sig, require)
+                    or self._contained(conn, hashed, sig, require))
+            return None if best is None else self._match(conn, *best)
+
+    def _upsert(self, conn, posting_id: int | None, fields: dict) -> int:
+        now = time.time()
+        if posting_id is None:
+            columns = ", ".join(list(fields) + ["created_at", "updated_at"])
+            marks = ", ".join("?" * (len(fields) + 2))
+            cursor = conn.execute(f"INSERT INTO postings ({columns}) VALUES ({marks})",
+                                  (*fields.values(), now, now))
+            posting_id = cursor.lastrowid
+        else:
+            assignments = ", ".join(f"{column} = ?" for column in fields)
+            conn.execute(f"UPDATE postings SET {assignments}, updated_at = ? WHERE id = ?",
+                         (*fields.values(), now, posting_id))
+        conn.commit()
+        return posting_id
+
+    def record_scrape(self, url: str, raw: str) -> int:
+        """Record a scraped page (the start of a new posting)."""
+        with self._lock:
+            conn = self._refresh()
+            row = conn.execute(
+                "SELECT id, url FROM postings WHERE raw_sha256 = ? AND (url IS ? OR url IS NULL) "
+                "ORDER BY url IS NULL LIMIT 1", (_sha(raw), url)
+            ).fetchone()
+            if row is not None:
+                # Cleaned before it was recorded (prefetch): attach the URL
+                if row["url"] is None:
+                    self._upsert(conn, row["id"], {"url": url})
+                return row["id"]
+            sig = signature(raw)
+            fields = {"url": url, "raw_sha256": _sha(raw),
+                      "raw_sig": None if sig is None else sig.tobytes()}
+            posting_id = self._upsert(conn, None, fields)
+            if sig is not None:
+                self._add_to_lsh("raw", posting_id, sig)
+            return posting_id
+
+    def cached_clean(self, raw: str) -> str | None:
+        """Stored clean_job_description output for exactly this page."""
+        with self._lock:
+            conn = self._refresh()
+            row = conn.execute(
+                "SELECT clean FROM postings WHERE raw_sha256 = ? AND clean IS NOT NULL "
+                "ORDER BY id DESC LIMIT 1", (_sha(raw),)
+            ).fetchone()
+            return None if row is None else row["clean"]
+
+    def record_clean(self, raw: str, clean: str) -> None:
+        with self._lock:
+            conn = self._refresh()
+            row = conn.execute("SELECT id, clean FROM postings WHERE raw_sha256 = ? ORDER BY id DESC LIMIT 1",
+                               (_sha(raw),)).fetchone()
+            posting_id = row["id"] if row is not None and row["clean"] is None else None
+            fields = {"clean": clean, "clean_sha256": _sha(clean)}
+            if posting_id is None:
+                sig = signature(raw)
+                fields.update(raw_sha256=_sha(raw), raw_sig=None if sig is None else sig.tobytes())
+            text_hashes = shingles(clean)
+            text_sig = _minhash(text_hashes) if text_hashes.size else None
+            fields["text_sig"] = None if text_sig is None else text_sig.tobytes()
+            fields["text_shingles"] = int(text_hashes.size)
+            new_id = self._upsert(conn, posting_id, fields)
+            if posting_id is None and fields.get("raw_sig"):
+                self._add_to_lsh("raw", new_id, np.frombuffer(fields["raw_sig"], dtype=np.uint64))
+            if text_sig is not None:
+                self._add_to_lsh("text", new_id, text_sig, int(text_hashes.size))
+
+    def cached_translation(self, clean: str) -> str | None:
+        """Stored translate_job_description output for exactly this cleaned text."""
+        with self._lock:
+            conn = self._refresh()
+            row = conn.execute(
+                "SELECT english FROM postings WHERE clean_sha256 = ? AND english IS NOT NULL "
+                "ORDER BY id DESC LIMIT 1", (_sha(clean),)
+            ).fetchone()
+            return None if row is None else row["english"]
+
+    def record_translation(self, clean: str, english: str) -> None:
+        with self._lock:
+            conn = self._refresh()
+            row = conn.execute("SELECT id FROM postings WHERE clean_sha256 = ? ORDER BY id DESC LIMIT 1",
+                               (_sha(clean),)).fetchone()
+            if row is None:
+                return
+            self._upsert(conn, row["id"], {"english": english, "english_sha256": _sha(english)})
+
+    def cached_analysis(self, description: str) -> str | None:
+        """Stored analysis for exactly this description (cleaned or translated)."""
+        with self._lock:
+            conn = self._refresh()
+            sha = _sha(description)
+            row = conn.execute(
+                "SELECT analysis FROM postings WHERE (clean_sha256 = ? OR english_sha256 = ?) "
+                "AND analysis IS NOT NULL ORDER BY id DESC LIMIT 1", (sha, sha)
+            ).fetchone()
+            return None if row is None else row["analysis"]
+
+    def record_analysis(self, description: str, analysis: str) -> None:
+        with self._lock:
+            conn = self._refresh()
+            sha = _sha(description)
+            row = conn.execute(
+                "SELECT id FROM postings WHERE clean_sha256 = ? OR english_sha256 = ? "
+                "ORDER BY id DESC LIMIT 1", (sha, sha)
+            ).fetchone()
+            if row is not None:
+                self._upsert(conn, row["id"], {"analysis": analysis})
+                return
+            # Pasted description that never went through clean_job_description
+            hashed = shingles(description)
+            sig = _minhash(hashed) if hashed.size else None
+            posting_id = self._upsert(conn, None, {
+                "clean": description, "clean_sha256": sha, "analysis": analysis,
+                "text_sig": None if sig is None else sig.tobytes(),
+                "text_shingles": int(hashed.size),
+            })
+            if sig is not None:
+                self._add_to_lsh("text", posting_id, sig, int(hashed.size))
+
+    def list_postings(self) -> list[dict]:
+        with self._lock:
+            conn = self._refresh()
+            rows = conn.execute(
+                "SELECT id, url, clean IS NOT NULL AS cleaned, english IS NOT NULL AS translated, "
+                "analysis IS NOT NULL AS analyzed, updated_at FROM postings ORDER BY id DESC"
+            ).fetchall()
+            return [dict(row) for row in rows]
+
+
+def format_match(match: Match, otherwise: str) -> str:
+    """Notice for the agent: a possible repost, with its stored results.
+
+    ``otherwise`` tells the agent how to continue if, after comparing, the
+    new posting turns out to be a different job.
+    """
+    source = f" ({match.url})" if match.url else ""
+    lines = [
+        f"NEAR-DUPLICATE: this looks like a posting already processed{source}, "
+        f"similarity {match.similarity:.2f}.",
+        "Compare its job title, company and requirements below with the new posting. "
+        "If it is the same vacancy, reuse these results and SKIP clean_job_description, "
+        "translate_job_description and analyze_job_requirements.",
+        f"If it is a different job, {otherwise}",
+    ]
+    if match.cvs:
+        lines.append("CVs already tailored for it: " + ", ".join(
+            f"'{name}' (read_cv)" for name in match.cvs))
+    lines += ["", "JOB DESCRIPTION:", match.description or "", "",
+              "REQUIREMENTS ANALYSIS:", match.analysis or ""]
+    return "\n".join(lines)
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def job_index() -> JobIndex:
+    """Process-wide index on the postings database."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = JobIndex(JOBS_DB_PATH)
+        return _index
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Near-duplicate job posting index.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list", help="List recorded postings")
+    match_cmd = sub.add_parser("match", help="Find the near-duplicate of a posting")
+    match_cmd.add_argument("file", help="Posting text (scraped page or description)")
+    args = parser.parse_args(argv)
+
+    index = job_index()
+    if args.command == "list":
+        json.dump(index.list_postings(), sys.stdout, indent=2)
+        print()
+        return 0
+
+    with open(args.file, "r") as f:
+        text = f.read()
+    started = time.perf_counter()
+    result = {kind: index.find(text, kind, require=None) for kind in KINDS}
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    report = {
+        kind: None if match is None else {
+            "posting_id": match.posting_id, "similarity": match.similarity,
+            "url": match.url, "analyzed": match.analysis is not None, "cvs": match.cvs,
+        }
+        for kind, match in result.items()
+    }
+    report["match_ms"] = round(elapsed_ms, 3)
+    json.dump(report, sys.stdout, indent=2)
+    print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,361 @@
+"""
+Page-fit layout engine for CV PDFs.
+
+Instead of asking the agent to rewrite a CV until it fits, this module
+searches over the style parameters the renderers already use (font size,
+page margins, line height) and picks the least compact setting that hits
+the target page count.
+
+- weasyprint: pandoc converts the markdown to HTML once; each candidate is
+  a weasyprint layout pass with a small CSS override on top of
+  cv_style.css. Layout passes are cached, and section headings are
+  located through the document's bookmark tree to report per-section
+  overflow.
+- LaTeX engines: each candidate is a pandoc run with the corresponding
+  `-V` options. LaTeX only supports 10/11/12pt, so only margins and line
+  stretch vary, and rungs that differ only in font size are searched
+  once (LATEX_LADDER).
+
+The chosen parameters are saved next to the CV (cv_<job>.fit.json) with
+the hash of the markdown they were fitted to, so later generate_pdf calls
+keep the fitted layout until the CV is rewritten.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+
+from catalog import BASE_DIR, OUTPUT_DIR, pdf_page_count, sha256_file
+
+ASSETS_DIR = os.path.join(BASE_DIR, "assets")
+CSS_PATH = os.path.join(ASSETS_DIR, "cv_style.css")
+
+
+@dataclass(frozen=True)
+class LayoutParams:
+    """Style knobs shared by the CSS and LaTeX render paths."""
+    font_size: float      # body font size in pt (cv_style.css: 10pt)
+    margin_v: float       # top/bottom page margin in inches (cv_style.css: 0.5in)
+    margin_h: float       # left/right page margin in inches (cv_style.css: 0.6in)
+    line_height: float    # CSS line-height / LaTeX linestretch (cv_style.css: 1.3)
+
+    def css(self) -> str:
+        """CSS override applied on top of cv_style.css."""
+        return (
+            f"@page {{ margin: {self.margin_v}in {self.margin_h}in !important; }}\n"
+            f"body {{ font-size: {self.font_size}pt !important;"
+            f" line-height: {self.line_height} !important; }}\n"
+        )
+
+    def latex_args(self) -> list[str]:
+        """pandoc `-V` options for the LaTeX engines."""
+        # LaTeX line spacing is already tighter than CSS at the same number;
+        # map the CSS line-height range (1.1-1.3) onto 0.9-1.05.
+        linestretch = round(0.9 + (self.line_height - 1.1) * 0.75, 3)
+        return [
+            '-V', f'geometry:top={self.margin_v}in,bottom={self.margin_v}in,'
+                  f'left={self.margin_h}in,right={self.margin_h}in',
+            '-V', 'fontsize=10pt',
+            '-V', f'linestretch={linestretch}',
+        ]
+
+
+DEFAULT_PARAMS = LayoutParams(font_size=10.0, margin_v=0.5, margin_h=0.6, line_height=1.3)
+
+# Candidates from the stylesheet's defaults to the most compact layout that
+# is still comfortable to read. Ordered so page count never increases along
+# the list, which lets fit() binary-search it.
+LADDER = [
+    DEFAULT_PARAMS,
+    LayoutParams(10.0, 0.45, 0.55, 1.25),
+    LayoutParams(9.75, 0.45, 0.55, 1.25),
+    LayoutParams(9.75, 0.4, 0.5, 1.2),
+    LayoutParams(9.5, 0.4, 0.5, 1.2),
+    LayoutParams(9.5, 0.35, 0.5, 1.15),
+    LayoutParams(9.25, 0.35, 0.45, 1.15),
+    LayoutParams(9.0, 0.35, 0.45, 1.15),
+    LayoutParams(9.0, 0.3, 0.4, 1.1),
+    LayoutParams(8.75, 0.3, 0.4, 1.1),
+    LayoutParams(8.5, 0.3, 0.4, 1.1),
+]
+
+# LADDER without the rungs that render identically under LaTeX
+LATEX_LADDER = list({tuple(p.latex_args()): p for p in reversed(LADDER)}.values())[::-1]
+
+# (html sha256, params) -> Measurement; bounded so a long-lived agent
+# process does not grow without limit
+_LAYOUT_CACHE: "OrderedDict[tuple[str, LayoutParams], Measurement]" = OrderedDict()
+_LAYOUT_CACHE_SIZE = 256
+
+
+@dataclass
+class Measurement:
+    """Result of one layout pass."""
+    pages: int | None
+    # (section title, first page, last page), 1-based; empty for LaTeX
+    sections: list[tuple[str, int, int]]
+
+
+def fit_path(md_path: str) -> str:
+    return md_path[:-len(".md")] + ".fit.json"
+
+
+def load_fit(md_path: str) -> LayoutParams | None:
+    """Return the saved layout for a CV, if fit_cv() chose one for its current text."""
+    try:
+        with open(fit_path(md_path), "r") as f:
+            saved = json.load(f)
+        if saved.get("md_sha256") != sha256_file(md_path):
+            # The CV was rewritten since it was fitted
+            return None
+        return LayoutParams(**saved["params"])
+    except (OSError, KeyError, TypeError, ValueError, AttributeError):
+        return None
+
+
+def clear_fit(md_path: str) -> None:
+    """Drop the saved layout (the CV's text changed)."""
+    for path in (fit_path(md_path), md_path[:-len(".md")] + ".fit.css"):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def _save_fit(md_path: str, md_hash: str, params: LayoutParams, target_pages: int) -> None:
+    with open(fit_path(md_path), "w") as f:
+        json.dump({"params": asdict(params), "target_pages": target_pages,
+                   "md_sha256": md_hash}, f, indent=2)
+    # pandoc takes stylesheets as files, so keep the override next to the CV
+    with open(md_path[:-len(".md")] + ".fit.css", "w") as f:
+        f.write(params.css())
+
+
+def saved_fit_args(md_path: str, engine: str) -> list[str]:
+    """Extra pandoc arguments that reapply a saved fit for ``engine``.
+
+    For CSS engines this is a second --css (appended after cv_style.css);
+    for LaTeX engines it is the `-V` options, which generate_pdf uses in
+    place of its defaults. Empty when the CV has never been fitted.
+    """
+    params = load_fit(md_path)
+    if params is None:
+        return []
+    if engine in ('pdflatex', 'xelatex'):
+        return params.latex_args()
+    css_override = md_path[:-len(".md")] + ".fit.css"
+    if not os.path.exists(css_override):
+        with open(css_override, "w") as f:
+            f.write(params.css())
+    return ['--css', css_override]
+
+
+def _markdown_to_html(md_path: str) -> str:
+    """Convert the CV to standalone HTML once; every layout pass reuses it."""
+    import pypandoc
+    return pypandoc.convert_file(
+        md_path,
+        'html',
+        extra_args=['--standalone', '--css', CSS_PATH],
+    )
+
+
+def _sections_from_bookmarks(bookmarks, page_count: int) -> list[tuple[str, int, int]]:
+    """Flatten the bookmark tree into h2-level sections with page spans."""
+    # The CV's name is the only h1, so sections (h2) are its children;
+    # without an h1 they are the top-level bookmarks.
+    nodes = bookmarks[0][2] if len(bookmarks) == 1 and bookmarks[0][2] else bookmarks
+    starts = [(node[0], node[1][0] + 1) for node in nodes]
+    sections = []
+    for i, (label, first) in enumerate(starts):
+        last = starts[i + 1][1] if i + 1 < len(starts) else page_count
+        sections.append((label, first, max(first, last)))
+    return sections
+
+
+def _weasyprint_pass(html: str, html_hash: str, params: LayoutParams):
+    """Lay the document out with weasyprint; returns (measurement, document)."""
+    from weasyprint import CSS, HTML
+
+    document = HTML(string=html, base_url=OUTPUT_DIR).render(
+        stylesheets=[CSS(string=params.css())]
+    )
+    pages = len(document.pages)
+    measurement = Measurement(pages, _sections_from_bookmarks(document.make_bookmark_tree(), pages))
+    _cache_put((html_hash, params), measurement)
+    return measurement, document
+
+
+def _latex_pass(md_path: str, md_hash: str, params: LayoutParams, engine: str,
+                header_path: str, pdf_path: str) -> Measurement:
+    import pypandoc
+
+    pypandoc.convert_file(
+        md_path,
+        'pdf',
+        outputfile=pdf_path,
+        extra_args=['--standalone', f'--pdf-engine={engine}', '-H', header_path]
+        + params.latex_args(),
+    )
+    measurement = Measurement(_count_pages(pdf_path), [])
+    _cache_put((md_hash, params), measurement)
+    return measurement
+
+
+def _count_pages(pdf_path: str) -> int | None:
+    """Page count, falling back to pdfinfo for compressed (LaTeX) PDFs."""
+    pages = pdf_page_count(pdf_path)
+    if pages is None and shutil.which("pdfinfo"):
+        result = subprocess.run(['pdfinfo', pdf_path], capture_output=True, text=True)
+        for line in result.stdout.splitlines():
+            if line.startswith("Pages:"):
+                return int(line.split()[1])
+    return pages
+
+
+def _cache_put(key, measurement: Measurement) -> None:
+    _LAYOUT_CACHE[key] = measurement
+    _LAYOUT_CACHE.move_to_end(key)
+    while len(_LAYOUT_CACHE) > _LAYOUT_CACHE_SIZE:
+        _LAYOUT_CACHE.popitem(last=False)
+
+
+def _search(measure, target_pages: int, ladder: list[LayoutParams] = LADDER
+            ) -> tuple[int, Measurement, int]:
+    """Binary-search ``ladder`` for the first candidate with pages <= target.
+
+    Returns (ladder index, its measurement, number of layout passes run).
+    When nothing fits, returns the most compact candidate.
+    """
+    passes = 0
+    results: dict[int, Measurement] = {}
+
+    def at(i: int) -> Measurement:
+        nonlocal passes
+        if i not in results:
+            measurement, ran = measure(ladder[i])
+            results[i] = measurement
+            passes += ran
+        return results[i]
+
+    def fits(i: int) -> bool:
+        pages = at(i).pages
+        return pages is not None and pages <= target_pages
+
+    if fits(0):
+        return 0, results[0], passes
+    lo, hi = 1, len(ladder) - 1
+    if not fits(hi):
+        return hi, results[hi], passes
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if fits(mid):
+            hi = mid
+        else:
+            lo = mid + 1
+    return lo, at(lo), passes
+
+
+def fit_cv(md_path: str, pdf_path: str, engine: str, target_pages: int = 1,
+           header_path: str | None = None) -> dict:
+    """Render a CV at the least compact layout that fits ``target_pages``.
+
+    Writes the final PDF to ``pdf_path`` and saves the chosen parameters
+    next to the markdown. Returns a report dict with the chosen params,
+    page count, number of layout passes and per-section overflow.
+    """
+    with open(md_path, "rb") as f:
+        md_hash = hashlib.sha256(f.read()).hexdigest()
+
+    if engine == 'weasyprint':
+        html = _markdown_to_html(md_path)
+        html_hash = hashlib.sha256((html + _stylesheet_text()).encode("utf-8")).hexdigest()
+        documents = {}
+
+        def measure(params):
+            cached = _LAYOUT_CACHE.get((html_hash, params))
+            if cached is not None:
+                return cached, 0
+            measurement, documents[params] = _weasyprint_pass(html, html_hash, params)
+            return measurement, 1
+
+        index, measurement, passes = _search(measure, target_pages)
+        params = LADDER[index]
+        document = documents.get(params)
+        if document is None:
+            # Cached measurement from an earlier call: lay out once more to write
+            measurement, document = _weasyprint_pass(html, html_hash, params)
+            passes += 1
+        document.write_pdf(pdf_path)
+    elif engine in ('pdflatex', 'xelatex'):
+        workdir = tempfile.mkdtemp(prefix="cvfit_")
+        candidates = {}
+
+        def measure(params):
+            cached = _LAYOUT_CACHE.get((md_hash, params))
+            if cached is not None:
+                return cached, 0
+            candidate_pdf = os.path.join(workdir, f"candidate_{len(candidates)}.pdf")
+            candidates[params] = candidate_pdf
+            return _latex_pass(md_path, md_hash, params, engine, header_path, candidate_pdf), 1
+
+        try:
+            index, measurement, passes = _search(measure, target_pages, LATEX_LADDER)
+            params = LATEX_LADDER[index]
+            if params in candidates:
+                shutil.copyfile(candidates[params], pdf_path)
+            else:
+                measurement = _latex_pass(md_path, md_hash, params, engine, header_path, pdf_path)
+                passes += 1
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+    else:
+        raise RuntimeError(f"Page fitting is not supported for PDF engine '{engine}'")
+
+    _save_fit(md_path, md_hash, params, target_pages)
+    overflow = [
+        {"section": title, "pages": [first, last]}
+        for title, first, last in measurement.sections
+        if last > target_pages
+    ]
+    return {
+        "params": asdict(params),
+        "pages": measurement.pages,
+        "target_pages": target_pages,
+        "fits": measurement.pages is not None and measurement.pages <= target_pages,
+        "layout_passes": passes,
+        "overflow": overflow,
+    }
+
+
+def _stylesheet_text() -> str:
+    """Stylesheet contents, so cached layouts are invalidated by CSS edits."""
+    try:
+        with open(CSS_PATH, "r") as f:
+            return f.read()
+    except OSError:
+        return ""
+
+
+def format_report(report: dict) -> str:
+    """Human-readable summary for the agent."""
+    params = report["params"]
+    style = (f"font {params['font_size']}pt, margins {params['margin_v']}in/"
+             f"{params['margin_h']}in, line-height {params['line_height']}")
+    if report["fits"]:
+        return (f"Fits {report['pages']} page(s) (target {report['target_pages']}) with "
+                f"{style} after {report['layout_passes']} layout pass(es).")
+    lines = [
+        f"Does NOT fit: {report['pages']} page(s) at the most compact layout "
+        f"({style}); target is {report['target_pages']}."
+    ]
+    if report["overflow"]:
+        lines.append("Sections past the target page (shorten these):")
+        for item in report["overflow"]:
+            first, last = item["pages"]
+            span = f"page {first}" if first == last else f"pages {first}-{last}"
+            lines.append(f"- {item['section']}: {span}")
+    return "\n".join(lines)
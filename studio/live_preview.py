@@ -0,0 +1,566 @@
+#!/usr/bin/env python3
+"""
+Live HTML preview of CVs and the profile, updated in milliseconds.
+
+PDF previews cost a pandoc + weasyprint run per save. While editing, this
+server renders the markdown to HTML in-process instead:
+
+- the markdown is split into blocks (heading, paragraph, list, rule,
+  code); each block is rendered once and cached by its source text, so an
+  edit only re-renders the blocks it touched
+- cv_style.css is read once (and again only when it changes) and inlined
+- clients get a block-level diff: an open page receives "patch" events
+  (insert / delete / replace blocks) over Server-Sent Events, and an
+  editor can POST unsaved markdown and get the patches from the saved
+  version back directly; drafts are never shown to other clients
+
+The web editor (web/src/components/LivePreview.tsx) embeds the page in an
+iframe. While the user types it POSTs the draft (cross-origin, so only
+from the origins in LIVE_PREVIEW_ORIGINS) and hands the returned patches
+to the iframe with postMessage; saves reach the iframe over the event
+stream.
+
+The renderer covers the markdown the CV template and user.md use
+(headings, bold/italic, lists, rules, links, two-space line breaks); PDFs
+are still produced only by generate_pdf / export_cv.
+
+Endpoints (doc is "profile" or "cv/<job_name>"):
+    GET  /<doc>                     styled HTML page that follows changes
+    GET  /<doc>/events?since=N      SSE stream of patch/reset/style events
+    POST /<doc>                     body = draft markdown -> {"version", "patches", "render_ms"}
+                                    (patches turn saved "version" into the draft)
+
+Configuration (environment variables):
+    LIVE_PREVIEW_ORIGINS   comma-separated origins allowed to POST drafts and
+                           to send them to the page (default: the web app on
+                           http://localhost:3000 and http://127.0.0.1:3000)
+
+Usage:
+    python3 live_preview.py [--host 127.0.0.1] [--port 8765] [--allow-origin ORIGIN ...]
+"""
+
+import argparse
+import difflib
+import hashlib
+import html
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from catalog import OUTPUT_DIR, USER_MD_PATH, safe_job_name
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CSS_PATH = os.path.join(BASE_DIR, "assets", "cv_style.css")
+
+POLL_INTERVAL = 0.1    # seconds between file checks while a page is open
+HISTORY = 64           # patch sets kept for clients that reconnect
+DEFAULT_ORIGINS = "http://localhost:3000,http://127.0.0.1:3000"
+
+_FENCE_RE = re.compile(r"^(```|~~~)")
+_HEADING_RE = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+_RULE_RE = re.compile(r"^\s*([-*_])(\s*\1){2,}\s*$")
+_ITEM_RE = re.compile(r"^(\s*)([-*+]|\d+[.)])\s+(.*)$")
+
+
+# --- Markdown -> HTML, one block at a time ---------------------------------
+
+def _quote_attr(text: str) -> str:
+    """Make already-escaped text safe inside a double-quoted attribute."""
+    return text.replace('"', "&quot;")
+
+
+def _inline(text: str) -> str:
+    """Render inline markdown (code, links, bold, italic) to HTML."""
+    out = []
+    # Code spans are literal; split them out before any other rule
+    for i, part in enumerate(re.split(r"(`[^`]+`)", text)):
+        if i % 2:
+            out.append(f"<code>{html.escape(part[1:-1])}</code>")
+            continue
+        # Escaped once here; hrefs only need their quotes escaped on top
+        part = html.escape(part, quote=False)
+        part = re.sub(r"\[([^\]]+)\]\(([^)\s]+)\)",
+                      lambda m: f'<a href="{_quote_attr(m.group(2))}">{m.group(1)}</a>', part)
+        part = re.sub(r"(?<![\"=>])(https?://[^\s<\"]+)",
+                      lambda m: f'<a href="{m.group(1)}">{m.group(1)}</a>', part)
+        part = re.sub(r"\*\*(?=\S)(.+?)(?<=\S)\*\*", r"<strong>\1</strong>", part)
+        part = re.sub(r"(?<![*\w])\*(?=\S)(.+?)(?<=\S)\*(?![*\w])", r"<em>\1</em>", part)
+        out.append(part)
+    return "".join(out)
+
+
+def _lines_with_breaks(lines: list[str]) -> str:
+    """Join paragraph lines; two trailing spaces (or a backslash) mean <br />."""
+    parts = []
+    for i, line in enumerate(lines):
+        hard = line.endswith("  ") or line.endswith("\\")
+        text = _inline(line.rstrip().rstrip("\\").strip())
+        parts.append(text + ("<br />" if hard and i < len(lines) - 1 else ""))
+    return "\n".join(parts)
+
+
+def _slug(text: str) -> str:
+    text = re.sub(r"[^\w\s-]", "", re.sub(r"<[^>]+>", "", text)).strip().lower()
+    return re.sub(r"\s+", "-", text) or "section"
+
+
+def _render_list(lines: list[str], loose: bool) -> str:
+    """Render a (possibly nested) list block."""
+    items = []   # (indent, ordered, [lines])
+    for line in lines:
+        match = _ITEM_RE.match(line)
+        if match:
+            items.append((len(match.group(1)), match.group(2)[0].isdigit(), [match.group(3)]))
+        elif items and line.strip():
+            items[-1][2].append(line.strip())
+
+    out, stack = [], []   # stack of (indent, tag)
+    for indent, ordered, text in items:
+        while stack and indent < stack[-1][0]:
+            out.append(f"</li></{stack.pop()[1]}>")
+        if not stack or indent > stack[-1][0]:
+            tag = "ol" if ordered else "ul"
+            out.append(f"<{tag}>")
+            stack.append((indent, tag))
+        else:
+            out.append("</li>")
+        body = _lines_with_breaks(text)
+        out.append(f"<li><p>{body}</p>" if loose else f"<li>{body}")
+    while stack:
+        out.append(f"</li></{stack.pop()[1]}>")
+    return "".join(out)
+
+
+@lru_cache(maxsize=4096)
+def render_block(kind: str, source: str) -> str:
+    """HTML for one block; cached by source, so unchanged blocks are free."""
+    lines = source.split("\n")
+    if kind == "heading":
+        match = _HEADING_RE.match(lines[0])
+        level, text = len(match.group(1)), _inline(match.group(2))
+        return f'<h{level} id="{_slug(text)}">{text}</h{level}>'
+    if kind == "rule":
+        return "<hr />"
+    if kind == "code":
+        return f"<pre><code>{html.escape(chr(10).join(lines[1:-1]))}</code></pre>"
+    if kind in ("list", "loose_list"):
+        return _render_list(lines, kind == "loose_list")
+    return f"<p>{_lines_with_breaks(lines)}</p>"
+
+
+def split_blocks(markdown: str) -> list[tuple[str, str]]:
+    """Split markdown into (kind, source) blocks, pandoc-style."""
+    blocks = []
+    lines = markdown.split("\n")
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        if not line.strip():
+            i += 1
+            continue
+        if _FENCE_RE.match(line):
+            fence = _FENCE_RE.match(line).group(1)
+            end = i + 1
+            while end < len(lines) and not lines[end].startswith(fence):
+                end += 1
+            blocks.append(("code", "\n".join(lines[i:end + 1])))
+            i = end + 1
+        elif _HEADING_RE.match(line):
+            blocks.append(("heading", line))
+            i += 1
+        elif _RULE_RE.match(line):
+            blocks.append(("rule", line))
+            i += 1
+        elif _ITEM_RE.match(line):
+            ordered = _ITEM_RE.match(line).group(2)[0].isdigit()
+            end, loose = i + 1, False
+            while end < len(lines):
+                if lines[end].strip():
+                    if not (_ITEM_RE.match(lines[end]) or lines[end].startswith((" ", "\t"))):
+                        break
+                    end += 1
+                    continue
+                # A blank line continues the list only if an item of the same kind follows
+                following = end + 1
+                while following < len(lines) and not lines[following].strip():
+                    following += 1
+                item = _ITEM_RE.match(lines[following]) if following < len(lines) else None
+                if item and (item.group(1) or item.group(2)[0].isdigit() == ordered):
+                    loose, end = True, following
+                else:
+                    break
+            blocks.append(("loose_list" if loose else "list",
+                           "\n".join(l for l in lines[i:end] if l.strip())))
+            i = end
+        else:
+            # Paragraph: pandoc needs a blank line before headings and lists
+            end = i + 1
+            while end < len(lines) and lines[end].strip() and not _RULE_RE.match(lines[end]) \
+                    and not _FENCE_RE.match(lines[end]):
+                end += 1
+            blocks.append(("paragraph", "\n".join(lines[i:end])))
+            i = end
+    return blocks
+
+
+def render_blocks(markdown: str) -> list[dict]:
+    """[{"id", "html"}] for every block; ids are stable while a block is unchanged."""
+    seen: dict[str, int] = {}
+    out = []
+    for kind, source in split_blocks(markdown):
+        digest = hashlib.sha1(f"{kind}\0{source}".encode("utf-8")).hexdigest()[:12]
+        seen[digest] = seen.get(digest, 0) + 1
+        out.append({"id": f"{digest}-{seen[digest]}", "html": render_block(kind, source)})
+    return out
+
+
+def diff_blocks(old: list[dict], new: list[dict]) -> list[dict]:
+    """Patches that turn ``old`` into ``new``, applied in order, indices in the new list."""
+    matcher = difflib.SequenceMatcher(a=[b["id"] for b in old], b=[b["id"] for b in new],
+                                      autojunk=False)
+    patches = []
+    for op, i1, i2, j1, j2 in matcher.get_opcodes():
+        if op == "equal":
+            continue
+        if op == "delete":
+            patches.append({"op": "delete", "index": j1, "count": i2 - i1})
+        elif op == "insert":
+            patches.append({"op": "insert", "index": j1, "blocks": new[j1:j2]})
+        else:
+            patches.append({"op": "replace", "index": j1, "count": i2 - i1, "blocks": new[j1:j2]})
+    return patches
+
+
+# --- Stylesheet ------------------------------------------------------------
+
+_css_cache = {"mtime": None, "text": ""}
+_css_lock = threading.Lock()
+
+
+def stylesheet() -> tuple[str, float | None]:
+    """cv_style.css text, re-read only when the file changes; plus its mtime."""
+    try:
+        mtime = os.path.getmtime(CSS_PATH)
+    except OSError:
+        return "", None
+    with _css_lock:
+        if _css_cache["mtime"] != mtime:
+            with open(CSS_PATH, "r") as f:
+                _css_cache.update(mtime=mtime, text=f.read())
+        return _css_cache["text"], mtime
+
+
+# --- Documents -------------------------------------------------------------
+
+class PreviewDocument:
+    """Current blocks of one document plus the recent patch history."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.version = 0
+        self.blocks: list[dict] = []
+        self.history: deque = deque(maxlen=HISTORY)   # (version, patches)
+        self.changed = threading.Condition()
+        self._disk_lock = threading.Lock()
+        self._mtime = None
+
+    def update(self, markdown: str) -> tuple[int, list[dict], float]:
+        """Re-render ``markdown``; returns (version, patches, render_ms)."""
+        started = time.perf_counter()
+        blocks = render_blocks(markdown)
+        with self.changed:
+            patches = diff_blocks(self.blocks, blocks)
+            if patches or self.version == 0:
+                self.version += 1
+                self.blocks = blocks
+                self.history.append((self.version, patches))
+                self.changed.notify_all()
+            return self.version, patches, (time.perf_counter() - started) * 1000
+
+    def preview(self, markdown: str) -> tuple[int, list[dict], float]:
+        """Diff a draft against the saved blocks without changing the document.
+
+        Returns (version the patches apply to, patches, render_ms).
+        """
+        started = time.perf_counter()
+        blocks = render_blocks(markdown)
+        version, saved = self.snapshot()
+        return version, diff_blocks(saved, blocks), (time.perf_counter() - started) * 1000
+
+    def snapshot(self) -> tuple[int, list[dict]]:
+        """(version, blocks) read together."""
+        with self.changed:
+            return self.version, list(self.blocks)
+
+    def refresh_from_disk(self) -> None:
+        """Pick up saves to the file (cheap stat when nothing changed).
+
+        Every stream and page request calls this; the stat, read and update
+        run under one lock so an older read can never land after a newer
+        one. The stamp is recorded only once the file was read (stat first,
+        so a save during the read is picked up on the next call).
+        """
+        with self._disk_lock:
+            try:
+                st = os.stat(self.path)
+                stamp = (st.st_mtime_ns, st.st_size)
+                if stamp == self._mtime:
+                    return
+                with open(self.path, "r") as f:
+                    markdown = f.read()
+            except OSError:
+                return
+            self.update(markdown)
+            self._mtime = stamp
+
+    def patches_since(self, version: int) -> tuple[int, list[dict]] | None:
+        """(current version, patches from ``version`` to it).
+
+        None when the client needs a reset: the history is too short, or
+        ``version`` is ahead of this document (e.g. after a server restart).
+        """
+        with self.changed:
+            if version == self.version:
+                return self.version, []
+            if version > self.version or not self.history or self.history[0][0] > version + 1:
+                return None
+            pending = [patches for v, patches in self.history if v > version]
+            return self.version, [p for patches in pending for p in patches]
+
+
+_documents: dict[str, PreviewDocument] = {}
+_documents_lock = threading.Lock()
+
+
+def document(name: str) -> PreviewDocument | None:
+    """Document for "profile" or "cv/<job_name>"; None for unknown names."""
+    if name == "profile":
+        path = USER_MD_PATH
+    elif name.startswith("cv/") and name[3:]:
+        path = os.path.join(OUTPUT_DIR, f"cv_{safe_job_name(name[3:])}.md")
+    else:
+        return None
+    with _documents_lock:
+        if name not in _documents:
+            _documents[name] = PreviewDocument(path)
+        doc = _documents[name]
+    doc.refresh_from_disk()
+    return doc
+
+
+_CLIENT_JS = """
+const root = document.getElementById("cv-preview");
+let version = Number(root.dataset.version);
+// Saved blocks, and the draft patches (relative to them) currently shown
+let saved = [...root.children].map(el => ({id: el.dataset.block, html: el.innerHTML}));
+let draft = null;
+const wrap = b => `<div data-block="${b.id}" style="display:contents">${b.html}</div>`;
+const fragment = blocks => document.createRange().createContextualFragment(blocks.map(wrap).join(""));
+function applyTo(blocks, patches) {
+  blocks = blocks.slice();
+  for (const p of patches) {
+    blocks.splice(p.index, p.op === "insert" ? 0 : p.count, ...(p.op === "delete" ? [] : p.blocks));
+  }
+  return blocks;
+}
+function apply(patches) {
+  for (const p of patches) {
+    if (p.op !== "insert") {
+      for (let i = 0; i < p.count; i++) root.children[p.index].remove();
+    }
+    if (p.op !== "delete") root.insertBefore(fragment(p.blocks), root.children[p.index] || null);
+  }
+}
+function showSaved(patches) {
+  // Patch the DOM in place unless a draft is on screen
+  if (draft === null && patches) apply(patches);
+  else root.replaceChildren(fragment(saved));
+  draft = null;
+}
+function connect() {
+  const events = new EventSource(`${location.pathname.replace(/\\/$/, "")}/events?since=${version}`);
+  events.addEventListener("patch", e => {
+    const m = JSON.parse(e.data); saved = applyTo(saved, m.patches); version = m.version; showSaved(m.patches);
+  });
+  events.addEventListener("reset", e => {
+    const m = JSON.parse(e.data); saved = m.blocks; version = m.version; showSaved(null);
+  });
+  events.addEventListener("style", e => { document.getElementById("cv-style").textContent = JSON.parse(e.data).css; });
+}
+// Drafts from the embedding editor; patches for an older saved version are stale
+window.addEventListener("message", e => {
+  const m = e.data;
+  if (e.source !== window.parent || !EDITOR_ORIGINS.includes(e.origin) || !m || m.type !== "draft") return;
+  if (m.patches === null) { if (draft !== null) showSaved(null); return; }
+  if (m.version !== version) return;
+  draft = m.patches;
+  root.replaceChildren(fragment(applyTo(saved, draft)));
+});
+connect();
+"""
+
+
+_origins: set[str] = set()
+
+
+def allowed_origins() -> set[str]:
+    """Origins of editors allowed to POST drafts (LIVE_PREVIEW_ORIGINS + --allow-origin)."""
+    configured = os.getenv("LIVE_PREVIEW_ORIGINS", DEFAULT_ORIGINS)
+    return {o.strip().rstrip("/") for o in configured.split(",") if o.strip()} | _origins
+
+
+def page_html(doc: PreviewDocument) -> str:
+    """Standalone page with the inlined stylesheet and the live-update script."""
+    css, _ = stylesheet()
+    version, blocks = doc.snapshot()
+    body = "".join(f'<div data-block="{b["id"]}" style="display:contents">{b["html"]}</div>'
+                   for b in blocks)
+    origins = json.dumps(sorted(allowed_origins())).replace("</", "<\\/")
+    return (
+        "<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\" /><title>Preview</title>\n"
+        f"<style id=\"cv-style\">{css}</style></head>\n"
+        f"<body><main id=\"cv-preview\" data-version=\"{version}\">{body}</main>\n"
+        f"<script>const EDITOR_ORIGINS = {origins};{_CLIENT_JS}</script></body></html>\n"
+    )
+
+
+# --- HTTP server -----------------------------------------------------------
+
+class PreviewHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: str, content_type: str, cors: bool = False) -> None:
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        if cors:
+            self._cors_headers()
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _origin_allowed(self) -> bool:
+        """Requests without an Origin (curl, scripts) are same-machine tools."""
+        origin = self.headers.get("Origin")
+        return origin is None or origin.rstrip("/") in allowed_origins()
+
+    def _cors_headers(self) -> None:
+        origin = self.headers.get("Origin")
+        if origin is not None and origin.rstrip("/") in allowed_origins():
+            self.send_header("Access-Control-Allow-Origin", origin)
+            self.send_header("Vary", "Origin")
+
+    def _route(self) -> tuple[PreviewDocument | None, bool, dict]:
+        url = urlparse(self.path)
+        name = url.path.strip("/")
+        events = name.endswith("/events")
+        if events:
+            name = name[:-len("/events")]
+        return document(name), events, parse_qs(url.query)
+
+    def do_GET(self):
+        doc, events, query = self._route()
+        if doc is None:
+            self._send(404, "Not found: use /profile or /cv/<job_name>", "text/plain")
+        elif events:
+            try:
+                since = int(query.get("since", ["0"])[0])
+            except ValueError:
+                self._send(400, "since must be a version number", "text/plain")
+                return
+            self._stream(doc, since)
+        else:
+            self._send(200, page_html(doc), "text/html; charset=utf-8")
+
+    def do_OPTIONS(self):
+        """CORS preflight for the editor's draft POSTs."""
+        if not self._origin_allowed():
+            self._send(403, "origin not allowed", "text/plain")
+            return
+        self.send_response(204)
+        self._cors_headers()
+        self.send_header("Access-Control-Allow-Methods", "POST")
+        self.send_header("Access-Control-Allow-Headers", "Content-Type")
+        self.send_header("Access-Control-Max-Age", "600")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length)
+        if not self._origin_allowed():
+            self._send(403, json.dumps({"error": "origin not allowed"}), "application/json")
+            return
+        doc, events, _ = self._route()
+        if doc is None or events:
+            self._send(404, json.dumps({"error": "unknown document"}), "application/json", cors=True)
+            return
+        version, patches, render_ms = doc.preview(body.decode("utf-8"))
+        self._send(200, json.dumps({"version": version, "patches": patches,
+                                    "render_ms": round(render_ms, 3)}), "application/json", cors=True)
+
+    def _event(self, name: str, payload: dict) -> None:
+        self.wfile.write(f"event: {name}\ndata: {json.dumps(payload)}\n\n".encode("utf-8"))
+        self.wfile.flush()
+
+    def _stream(self, doc: PreviewDocument, version: int) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.end_headers()
+        _, css_mtime = stylesheet()
+        try:
+            while True:
+                doc.refresh_from_disk()
+                pending = doc.patches_since(version)
+                if pending is None:
+                    version, blocks = doc.snapshot()
+                    self._event("reset", {"version": version, "blocks": blocks})
+                else:
+                    current, patches = pending
+                    if patches:
+                        self._event("patch", {"version": current, "patches": patches})
+                    version = current
+                css, mtime = stylesheet()
+                if mtime != css_mtime:
+                    css_mtime = mtime
+                    self._event("style", {"css": css})
+                with doc.changed:
+                    if doc.version == version:
+                        doc.changed.wait(POLL_INTERVAL)
+        except (BrokenPipeError, ConnectionResetError):
+            return
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Live HTML preview server for CVs and the profile.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--allow-origin", action="append", default=[],
+                        help="Extra editor origin allowed to POST drafts (repeatable)")
+    args = parser.parse_args(argv)
+    _origins.update(o.rstrip("/") for o in args.allow_origin)
+
+    server = ThreadingHTTPServer((args.host, args.port), PreviewHandler)
+    server.daemon_threads = True
+    print(f"Live preview on http://{args.host}:{args.port}/profile and /cv/<job_name>")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
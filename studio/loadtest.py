@@ -0,0 +1,514 @@
+#!/usr/bin/env python3
+"""
+Load-test harness for the cv_agent graph.
+
+Starts two local stub services and drives the real graph (agent.py:graph,
+as registered in langgraph.json) against them, so no OpenAI or FireCrawl
+quota is used:
+
+- an OpenAI-compatible /v1/chat/completions endpoint with configurable
+  latency and token rate. Requests that carry tools (the assistant node)
+  get a scripted tool-call sequence; plain requests (the LLM-backed tools)
+  get canned text. With --throttle a share of requests is answered with
+  429 + Retry-After, to exercise the retry/rate-limit layer (resilience.py).
+- a FireCrawl-compatible /scrape endpoint returning a job posting
+  generated for the run (stub_posting), so every run is a new vacancy
+  and not a repost of the previous one.
+
+Runs execute in worker processes (each running several concurrent
+threads) against a scratch copy of data/, and the report covers
+throughput, latency percentiles, CPU time and peak memory per worker and
+the generate_pdf render queue depth.
+
+Usage:
+    python3 loadtest.py [--workers 2] [--concurrency 4] [--runs 10]
+                        [--latency 0.3] [--tokens-per-sec 80]
+                        [--scrape-latency 0.5] [--throttle 0.1] [--render]
+                        [--script FILE]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import re
+import resource
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Directory paths relative to this file
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(BASE_DIR, "data")
+
+# Every run gets its own posting, so the repost index (job_index.py) sees
+# distinct vacancies and the report measures the pipeline, not cache hits.
+# Postings are built from these pools with a generator seeded by the job
+# name; the "Ref:" line lets the stubs rebuild a run's posting from any
+# prompt that quotes it.
+_TITLES = ["Operations Manager", "Project Manager", "Program Lead", "Delivery Manager",
+           "Business Operations Lead", "Process Improvement Manager", "PMO Lead"]
+_LEVELS = ["Junior", "Mid-level", "Senior", "Lead", "Principal"]
+_VERBS = ["Lead", "Build", "Own", "Scale", "Coordinate", "Redesign", "Automate", "Audit"]
+_OBJECTS = ["vendor onboarding", "quarterly planning", "incident reviews", "budget tracking",
+            "release calendars", "hiring pipelines", "customer escalations", "KPI dashboards",
+            "supplier contracts", "risk registers", "capacity models", "SOP libraries"]
+_TEAMS = ["finance", "logistics", "support", "sales", "engineering", "marketing", "legal", "HR"]
+_SKILLS = ["process optimization", "stakeholder management", "change management", "forecasting",
+           "data analysis", "contract negotiation", "lean methods", "risk management",
+           "budget ownership", "documentation", "team leadership", "OKR planning"]
+_TOOLS = ["Jira", "Confluence", "Asana", "Notion", "Tableau", "Power BI", "Salesforce",
+          "SAP", "Airtable", "Looker", "Google Workspace", "Excel"]
+_LANGUAGES = ["English", "German", "French", "Spanish", "Dutch", "Polish"]
+_CITIES = ["Berlin", "Lisbon", "Warsaw", "Amsterdam", "Madrid", "Remote"]
+
+
+def stub_posting(job: str) -> tuple[str, str]:
+    """(markdown posting, requirements JSON) for one run, derived from ``job``."""
+    rng = random.Random(job)
+    title = f"{rng.choice(_LEVELS)} {rng.choice(_TITLES)}"
+    skills = rng.sample(_SKILLS, 4)
+    tools = rng.sample(_TOOLS, 3)
+    languages = rng.sample(_LANGUAGES, 2)
+    duties = [f"{rng.choice(_VERBS)} {obj} with the {rng.choice(_TEAMS)} team in {rng.randint(2, 12)} markets"
+              for obj in rng.sample(_OBJECTS, 4)]
+    years = rng.randint(2, 9)
+    posting = "\n".join([
+        f"# {title}",
+        "",
+        f"**{job.replace('_', ' ').title()} GmbH** | {rng.choice(_CITIES)} | "
+        f"EUR {rng.randint(40, 70)}-{rng.randint(71, 110)}k",
+        "",
+        "## Responsibilities",
+        *[f"- {duty}" for duty in duties],
+        f"- Report progress in {tools[0]} and {tools[1]}",
+        "",
+        "## Requirements",
+        f"- {years}+ years of {skills[0]} and {skills[1]}",
+        f"- Hands-on {skills[2]}; {skills[3]} is a plus",
+        f"- Daily use of {', '.join(tools)}",
+        f"- Fluent {languages[0]}, good {languages[1]}",
+        "",
+        f"Ref: {job}",
+        "",
+    ])
+    requirements = json.dumps({
+        "core_skills_and_requirements": skills,
+        "tools_and_technologies": tools,
+        "soft_skills": ["stakeholder communication", "leadership"],
+        "key_action_verbs": sorted({duty.split()[0].lower() for duty in duties}),
+        "languages": languages,
+        "experience_level": title.split()[0].lower(),
+    })
+    return posting, requirements
+
+
+def _job_in(text: str) -> str | None:
+    """Job name from a posting's "Ref:" line quoted anywhere in ``text``."""
+    match = re.search(r"Ref: (\w+)", text)
+    return match.group(1) if match else None
+
+
+STUB_CV = """# JANE DOE
+**Senior Operations Manager**
+Berlin, Germany | Email: jane@example.com | Phone: +49 000 000
+LinkedIn: linkedin.com/in/janedoe
+
+---
+
+## PROFESSIONAL SUMMARY
+
+Operations leader with expertise in process optimization and cross-functional delivery.
+
+---
+
+## PROFESSIONAL EXPERIENCE
+
+### Operations Manager | Example GmbH
+*2020 – Present | Berlin*
+
+- Led cross-functional projects across 4 regions, cutting delivery time by 30%.
+- Built Jira reporting used by 60+ stakeholders.
+
+---
+
+## EDUCATION & CERTIFICATIONS
+
+**MSc — Management** | Example University, Germany
+
+---
+
+## SKILLS & LANGUAGES
+
+**Competencies:** Project management, Process optimization
+**Soft Skills:** Stakeholder communication, Leadership
+**Tools:** Jira, Google Workspace
+**Languages:** English (Fluent)
+"""
+
+# Tool calls the stub makes the assistant emit, one entry per assistant
+# turn (an entry with several calls is a parallel tool call). Strings may
+# use {job}, {url} and {posting}, filled from the run's user message.
+DEFAULT_SCRIPT = [
+    [{"name": "extract_job_url", "args": {"url": "{url}"}}],
+    [{"name": "clean_job_description", "args": {"raw_content": "{posting}"}}],
+    [{"name": "analyze_job_requirements", "args": {"job_description": "{posting}"}}],
+    [{"name": "read_template", "args": {}}, {"name": "read_user_data", "args": {}}],
+    [{"name": "write_cv", "args": {"job_name": "{job}", "content": STUB_CV}}],
+    [{"name": "generate_pdf", "args": {"job_name": "{job}"}}],
+]
+
+FINAL_MESSAGE = "Created your CV for the Senior Operations Manager role. PDF is ready."
+
+
+def _estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+class StubConfig:
+    """Latency model and script shared by the stub handlers."""
+
+    def __init__(self, latency: float, tokens_per_sec: float, scrape_latency: float,
+                 script: list, throttle: float = 0.0):
+        self.latency = latency
+        self.throttle = throttle  # fraction of chat requests answered with 429
+        self.tokens_per_sec = tokens_per_sec
+        self.scrape_latency = scrape_latency
+        self.script = script
+        self.lock = threading.Lock()
+        self.stats = {"chat_requests": 0, "scrape_requests": 0, "throttled": 0,
+                      "prompt_tokens": 0, "completion_tokens": 0}
+
+    def count(self, **increments) -> None:
+        with self.lock:
+            for key, value in increments.items():
+                self.stats[key] += value
+
+
+def _fill(value, job: str, url: str):
+    if isinstance(value, str):
+        if "{posting}" in value:
+            value = value.replace("{posting}", stub_posting(job)[0])
+        return value.replace("{job}", job).replace("{url}", url)
+    if isinstance(value, dict):
+        return {k: _fill(v, job, url) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_fill(v, job, url) for v in value]
+    return value
+
+
+def _message_text(message: dict) -> str:
+    content = message.get("content") or ""
+    if isinstance(content, list):
+        content = " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content
+
+
+def _chat_reply(config: StubConfig, request: dict) -> tuple[dict, int]:
+    """Build the scripted completion for a chat request."""
+    messages = request.get("messages", [])
+    if request.get("tools"):
+        # Assistant node: the step is the number of tool-calling turns so far
+        step = sum(1 for m in messages if m.get("role") == "assistant" and m.get("tool_calls"))
+        first_user = next((_message_text(m) for m in messages if m.get("role") == "user"), "")
+        job_match = re.search(r"job[:= ]+(\w+)", first_user)
+        url_match = re.search(r"https?://\S+", first_user)
+        job = job_match.group(1) if job_match else "loadtest"
+        url = url_match.group(0) if url_match else "https://jobs.example.com/1"
+        if step < len(config.script):
+            calls = _fill(config.script[step], job, url)
+            message = {
+                "role": "assistant",
+                "content": None,
+                "tool_calls": [
+                    {
+                        "id": f"call_{uuid.uuid4().hex[:12]}",
+                        "type": "function",
+                        "function": {"name": call["name"], "arguments": json.dumps(call["args"])},
+                    }
+                    for call in calls
+                ],
+            }
+            finish = "tool_calls"
+            output = json.dumps(calls)
+        else:
+            message = {"role": "assistant", "content": FINAL_MESSAGE}
+            finish = "stop"
+            output = FINAL_MESSAGE
+    else:
+        # LLM-backed tools: answer by prompt type
+        system = _message_text(messages[0]) if messages else ""
+        posting, requirements = stub_posting(
+            _job_in(" ".join(_message_text(m) for m in messages)) or "loadtest")
+        if "requirements analyzer" in system:
+            output = requirements
+        elif "CV editor" in system:
+            output = STUB_CV
+        else:
+            output = posting
+        message = {"role": "assistant", "content": output}
+        finish = "stop"
+
+    prompt_tokens = sum(_estimate_tokens(_message_text(m)) for m in messages)
+    completion_tokens = _estimate_tokens(output)
+    body = {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": request.get("model", "stub"),
+        "choices": [{"index": 0, "message": message, "finish_reason": finish}],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+    return body, completion_tokens
+
+
+def _make_handler(config: StubConfig):
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status: int, body: dict, headers: dict | None = None) -> None:
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            try:
+                request = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError:
+                self._send_json(400, {"error": {"message": "invalid JSON"}})
+                return
+
+            if self.path.rstrip("/").endswith("/chat/completions"):
+                if config.throttle and random.random() < config.throttle:
+                    config.count(throttled=1)
+                    self._send_json(429, {"error": {"message": "Rate limit reached", "type": "requests"}},
+                                    {"Retry-After": "1"})
+                    return
+                body, completion_tokens = _chat_reply(config, request)
+                time.sleep(config.latency + completion_tokens / config.tokens_per_sec)
+                config.count(chat_requests=1,
+                             prompt_tokens=body["usage"]["prompt_tokens"],
+                             completion_tokens=completion_tokens)
+                self._send_json(200, body)
+            elif self.path.rstrip("/").endswith("/scrape"):
+                time.sleep(config.scrape_latency)
+                config.count(scrape_requests=1)
+                self._send_json(200, {
+                    "success": True,
+                    "data": {
+                        "markdown": stub_posting(
+                            request.get("url", "").rstrip("/").rsplit("/", 1)[-1] or "loadtest")[0],
+                        "metadata": {"sourceURL": request.get("url", ""), "statusCode": 200},
+                    },
+                })
+            else:
+                self._send_json(404, {"error": {"message": f"unknown path {self.path}"}})
+
+    return StubHandler
+
+
+def start_stub_server(config: StubConfig) -> ThreadingHTTPServer:
+    """Start the OpenAI + FireCrawl stub on a free localhost port."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _make_handler(config))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _prepare_data_dir() -> str:
+    """Scratch copy of data/ so runs never touch the user's files."""
+    scratch = tempfile.mkdtemp(prefix="cv_loadtest_")
+    shutil.copy(os.path.join(DATA_DIR, "template.md"), scratch)
+    user_md = os.path.join(DATA_DIR, "user.md")
+    if not os.path.exists(user_md):
+        user_md = os.path.join(DATA_DIR, "user_example.md")
+    shutil.copy(user_md, os.path.join(scratch, "user.md"))
+    os.makedirs(os.path.join(scratch, "output"))
+    return scratch
+
+
+def _worker(worker_id: int, stub_url: str, data_dir: str, concurrency: int, runs: int,
+            results: multiprocessing.Queue) -> None:
+    """Run ``runs`` graph invocations with ``concurrency`` threads."""
+    # Must be set before agent/tools are imported
+    os.environ.update({
+        "OPENAI_BASE_URL": f"{stub_url}/v1",
+        "OPENAI_API_KEY": "stub",
+        "FIRECRAWL_API_URL": stub_url,
+        "FIRECRAWL_API_KEY": "stub",
+        "CV_DATA_DIR": data_dir,
+        "LANGSMITH_TRACING": "false",
+    })
+    from langchain_core.messages import HumanMessage
+    from agent import graph
+    from prefetch import prefetch_stats
+    from resilience import resilience_metrics
+    from routing import routing_metrics
+    from tools import renders_in_flight
+
+    queue_samples = []
+    done = threading.Event()
+
+    def sample_queue():
+        while not done.wait(0.05):
+            queue_samples.append(renders_in_flight())
+
+    def run_once(i: int):
+        job = f"loadtest_w{worker_id}_{i}"
+        started = time.perf_counter()
+        try:
+            graph.invoke(
+                {"messages": [HumanMessage(
+                    content=f"Create a CV for job:{job} https://jobs.example.com/{job}"
+                )]},
+                {"recursion_limit": 50},
+            )
+            return time.perf_counter() - started, None
+        except Exception as e:
+            return time.perf_counter() - started, f"{type(e).__name__}: {e}"
+
+    sampler = threading.Thread(target=sample_queue, daemon=True)
+    sampler.start()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(run_once, range(runs)))
+    wall = time.perf_counter() - started
+    done.set()
+
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    results.put({
+        "worker": worker_id,
+        "latencies": [t for t, err in outcomes if err is None],
+        "errors": [err for _, err in outcomes if err is not None],
+        "wall": wall,
+        "cpu_seconds": usage.ru_utime + usage.ru_stime,
+        "max_rss_mb": usage.ru_maxrss / 1024,  # ru_maxrss is KiB on Linux
+        "queue_max": max(queue_samples, default=0),
+        "queue_mean": statistics.fmean(queue_samples) if queue_samples else 0.0,
+        "routing": routing_metrics().snapshot(),
+        "resilience": resilience_metrics(),
+        "prefetch": prefetch_stats(),
+    })
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100
+    lo, hi = int(k), min(int(k) + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def run_load_test(workers: int, concurrency: int, runs: int, config: StubConfig) -> dict:
+    """Run the load test and return the aggregated report."""
+    server = start_stub_server(config)
+    stub_url = f"http://127.0.0.1:{server.server_address[1]}"
+    data_dir = _prepare_data_dir()
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    try:
+        started = time.perf_counter()
+        procs = [
+            ctx.Process(target=_worker, args=(w, stub_url, data_dir, concurrency, runs, results))
+            for w in range(workers)
+        ]
+        for proc in procs:
+            proc.start()
+        per_worker = [results.get() for _ in procs]
+        for proc in procs:
+            proc.join()
+        wall = time.perf_counter() - started
+    finally:
+        server.shutdown()
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    latencies = [t for w in per_worker for t in w["latencies"]]
+    errors = [e for w in per_worker for e in w["errors"]]
+    return {
+        "workers": workers,
+        "concurrency_per_worker": concurrency,
+        "runs": workers * runs,
+        "completed": len(latencies),
+        "errors": len(errors),
+        "error_samples": errors[:5],
+        "wall_seconds": round(wall, 3),
+        "throughput_runs_per_sec": round(len(latencies) / wall, 3) if wall else 0.0,
+        "latency_seconds": {
+            "p50": round(_percentile(latencies, 50), 3),
+            "p90": round(_percentile(latencies, 90), 3),
+            "p99": round(_percentile(latencies, 99), 3),
+            "max": round(max(latencies, default=float("nan")), 3),
+        },
+        "per_worker": [
+            {
+                "worker": w["worker"],
+                "completed": len(w["latencies"]),
+                "cpu_seconds": round(w["cpu_seconds"], 3),
+                "max_rss_mb": round(w["max_rss_mb"], 1),
+                "render_queue_max": w["queue_max"],
+                "render_queue_mean": round(w["queue_mean"], 3),
+                "routing": w["routing"],
+                "resilience": w["resilience"],
+                "prefetch": w["prefetch"],
+            }
+            for w in sorted(per_worker, key=lambda w: w["worker"])
+        ],
+        "stub": dict(config.stats),
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Load-test the cv_agent graph against local stubs.")
+    parser.add_argument("--workers", type=int, default=2, help="Worker processes")
+    parser.add_argument("--concurrency", type=int, default=4, help="Concurrent runs per worker")
+    parser.add_argument("--runs", type=int, default=10, help="Runs per worker")
+    parser.add_argument("--latency", type=float, default=0.3, help="Stub LLM base latency (s)")
+    parser.add_argument("--tokens-per-sec", type=float, default=80.0, help="Stub LLM output token rate")
+    parser.add_argument("--scrape-latency", type=float, default=0.5, help="Stub scrape latency (s)")
+    parser.add_argument("--render", action="store_true",
+                        help="Keep the generate_pdf step (needs pandoc and a PDF engine)")
+    parser.add_argument("--throttle", type=float, default=0.0,
+                        help="Fraction of stub LLM requests answered with 429 + Retry-After")
+    parser.add_argument("--script", help="JSON file with the tool-call script (list of turns)")
+    args = parser.parse_args(argv)
+
+    if args.script:
+        with open(args.script, "r") as f:
+            script = json.load(f)
+    else:
+        script = [
+            turn for turn in DEFAULT_SCRIPT
+            if args.render or turn[0]["name"] != "generate_pdf"
+        ]
+
+    config = StubConfig(args.latency, args.tokens_per_sec, args.scrape_latency, script,
+                        args.throttle)
+    report = run_load_test(args.workers, args.concurrency, args.runs, config)
+    json.dump(report, sys.stdout, indent=2)
+    print()
+    return 0 if report["errors"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,176 @@
+"""
+Speculative prefetch of job URLs found in user messages.
+
+When a user pastes a job link, the first assistant turn nearly always
+ends in extract_job_url -> clean_job_description. The prefetch node in
+agent.py calls start() with the message's URLs before that turn, so
+scraping (and cleaning, unless the page is a known repost) runs while
+the model is still thinking. The tools then take() the in-flight or
+finished result instead of starting their own call; if the prefetch
+failed or never ran, they simply do the work themselves.
+
+Only CV-mode messages are prefetched (never "[PROFILE EDIT MODE]"
+turns), and only URLs that look like job postings (job boards, ATS hosts
+or a jobs/careers path), so links pasted for other reasons do not spend
+FireCrawl or OpenAI quota.
+
+Results are kept for PREFETCH_TTL seconds, so several sessions with the
+same link share one scrape. A tool waits at most CV_PREFETCH_WAIT seconds
+for an in-flight prefetch, then does the work itself.
+
+Configuration (environment variables):
+    CV_PREFETCH        "clean" (default: scrape and clean), "scrape" or "off"
+    CV_PREFETCH_WAIT   max seconds a tool waits for a prefetch (default 20)
+"""
+
+import hashlib
+import os
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+
+PREFETCH_TTL = 600
+MAX_URLS_PER_MESSAGE = 3
+
+_URL_RE = re.compile(r"https?://[^\s<>()\"'`\]]+")
+
+# Job boards / applicant tracking systems, and job-like URL path segments
+_JOB_HOSTS = (
+    "greenhouse.io", "lever.co", "workable.com", "ashbyhq.com", "smartrecruiters.com",
+    "myworkdayjobs.com", "personio.de", "personio.com", "recruitee.com", "teamtailor.com",
+    "jobvite.com", "bamboohr.com", "breezy.hr", "join.com", "indeed.", "glassdoor.",
+    "stepstone.", "xing.com", "monster.", "welcometothejungle.com", "wellfound.com",
+)
+_JOB_PATH_RE = re.compile(
+    r"/(jobs?|careers?|vacanc(y|ies)|positions?|openings?|stellen\w*|karriere|"
+    r"job-?offers?|apply|postings?|recruit\w*)(/|\b|$)|[?&](gh_jid|jobid|job_id|jk)=",
+    re.IGNORECASE,
+)
+_PROFILE_MODE = "[PROFILE EDIT MODE]"
+
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="prefetch")
+_lock = threading.Lock()
+# key -> (started_at, future); keys are "scrape:<url>" and "clean:<sha256 of raw>"
+_futures: dict[str, tuple[float, Future]] = {}
+_stats = {"started": 0, "hits": 0, "misses": 0, "failed": 0, "timeouts": 0}
+
+
+def mode() -> str:
+    return os.getenv("CV_PREFETCH", "clean").lower()
+
+
+def wait_seconds() -> float:
+    try:
+        return float(os.getenv("CV_PREFETCH_WAIT", "20"))
+    except ValueError:
+        return 20.0
+
+
+def looks_like_job_url(url: str) -> bool:
+    """Job board / ATS host, or a jobs/careers-style path."""
+    host = url.split("://", 1)[-1].split("/", 1)[0].lower()
+    if any(job_host in host for job_host in _JOB_HOSTS) or \
+            host.startswith(("jobs.", "careers.", "career.", "karriere.", "apply.")):
+        return True
+    if "linkedin.com" in host:
+        return "/jobs/" in url
+    return bool(_JOB_PATH_RE.search(url[url.find(host) + len(host):]))
+
+
+def find_urls(text: str) -> list[str]:
+    """Distinct http(s) URLs in ``text``, trailing punctuation removed."""
+    urls = []
+    for url in _URL_RE.findall(text):
+        url = url.rstrip(".,;:!?")
+        if url not in urls:
+            urls.append(url)
+    return urls[:MAX_URLS_PER_MESSAGE]
+
+
+def _raw_key(raw: str) -> str:
+    return "clean:" + hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _prune(now: float) -> None:
+    for key in [k for k, (at, _) in _futures.items() if now - at > PREFETCH_TTL]:
+        del _futures[key]
+
+
+def _submit(key: str, fn, *args) -> Future | None:
+    """Start ``fn`` unless a live prefetch for ``key`` exists (caller holds no lock)."""
+    now = time.time()
+    with _lock:
+        _prune(now)
+        if key in _futures:
+            return None
+        future = _executor.submit(fn, *args)
+        _futures[key] = (now, future)
+        _stats["started"] += 1
+        return future
+
+
+def _scrape_then_clean(url: str) -> str:
+    from tools import _clean_job_description, _posting_index, _scrape_job_url
+
+    raw = _scrape_job_url(url)
+    # Possible reposts wait for the agent to compare them with the stored posting
+    if mode() == "clean" and _posting_index("find_in_page", raw) is None:
+        _submit(_raw_key(raw), _clean_job_description, raw)
+    return raw
+
+
+def start(text: str) -> list[str]:
+    """Prefetch the job URLs in a user message; returns the URLs started."""
+    if mode() == "off" or not os.getenv("FIRECRAWL_API_KEY"):
+        return []
+    if text.lstrip().startswith(_PROFILE_MODE):
+        return []
+    started = []
+    for url in filter(looks_like_job_url, find_urls(text)):
+        if _submit("scrape:" + url, _scrape_then_clean, url) is not None:
+            started.append(url)
+    return started
+
+
+def _take(key: str) -> str | None:
+    with _lock:
+        entry = _futures.get(key)
+    if entry is None:
+        with _lock:
+            _stats["misses"] += 1
+        return None
+    try:
+        result = entry[1].result(timeout=wait_seconds())
+    except FutureTimeout:
+        # Stuck prefetch: the tool does the work itself; a late result is
+        # still kept for the next caller
+        with _lock:
+            _stats["timeouts"] += 1
+        return None
+    except Exception:
+        # Let the tool retry the work itself
+        with _lock:
+            _stats["failed"] += 1
+            if _futures.get(key) is entry:
+                del _futures[key]
+        return None
+    with _lock:
+        _stats["hits"] += 1
+    return result
+
+
+def take_scrape(url: str) -> str | None:
+    """Prefetched page content for ``url`` (waits if in flight), else None."""
+    return _take("scrape:" + url)
+
+
+def take_clean(raw: str) -> str | None:
+    """Prefetched clean_job_description output for ``raw`` (waits if in flight), else None."""
+    return _take(_raw_key(raw))
+
+
+def prefetch_stats() -> dict:
+    with _lock:
+        return dict(_stats, live=len(_futures))
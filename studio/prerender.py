@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Background pre-rendering service.
+
+Watches the inputs of every preview and re-renders PDFs shortly after they
+change, so the web UI finds an up-to-date PDF instead of waiting for a cold
+render on the first request:
+
+- data/user.md            -> data/profile_preview.pdf
+- data/output/cv_*.md     -> the matching cv_*.pdf (agent or web editor saves)
+- assets/cv_style.css     -> profile + every CV that already has a PDF
+- assets/cv_header.tex    -> same as above (LaTeX engines)
+
+Changes are debounced per target and rendered by a bounded worker pool.
+Renders take the same per-file lock as generate_pdf and the web routes,
+and a target whose PDF is already newer than its inputs (e.g. the agent
+just rendered it) is skipped.
+Every --sync-interval seconds the service also reconciles the CV catalog
+with data/output (catalog.sync_if_changed), so files edited or deleted
+outside the app show up in the listing without it scanning the directory.
+Polling (os.stat) is used instead of OS-specific notification APIs so the
+service has no extra dependencies.
+
+Usage:
+    python3 prerender.py [--workers 2] [--debounce 1.0] [--interval 0.5]
+                         [--sync-interval 30] [--once]
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from catalog import BASE_DIR, OUTPUT_DIR, USER_MD_PATH, sync_if_changed
+from generate_profile_pdf import PROFILE_PDF_PATH, render_profile_pdf
+
+ASSETS_DIR = os.path.join(BASE_DIR, "assets")
+CSS_PATH = os.path.join(ASSETS_DIR, "cv_style.css")
+LATEX_HEADER_PATH = os.path.join(ASSETS_DIR, "cv_header.tex")
+
+PROFILE_TARGET = "profile"
+
+
+def _cv_target(md_filename: str) -> str:
+    """Map 'cv_google_pm.md' to the render target 'cv:google_pm'."""
+    return f"cv:{md_filename[len('cv_'):-len('.md')]}"
+
+
+def _render_target(target: str) -> str:
+    """Render one target and return a short status line."""
+    if target == PROFILE_TARGET:
+        return f"profile -> {render_profile_pdf(only_if_stale=True)}"
+
+    # Imported lazily: tools pulls in the LLM stack, which profile-only
+    # renders do not need.
+    from tools import _render_cv_pdf
+    job_name = target.split(":", 1)[1]
+    result = _render_cv_pdf(job_name, only_if_stale=True)
+    if result.startswith("Error"):
+        raise RuntimeError(result)
+    return f"{job_name} -> {result}"
+
+
+class PrerenderService:
+    """Debounced file watcher feeding a bounded render pool.
+
+    Each target is rendered by at most one worker at a time; a change that
+    arrives while a target is rendering marks it dirty and it is rendered
+    once more after the current run finishes.
+    """
+
+    def __init__(self, workers: int = 2, debounce: float = 1.0, interval: float = 0.5,
+                 sync_interval: float = 30.0):
+        self.debounce = debounce
+        self.interval = interval
+        self.sync_interval = sync_interval
+        self._last_sync = float("-inf")
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="prerender")
+        self._lock = threading.Lock()
+        self._mtimes: dict[str, float] = {}
+        self._pending: dict[str, float] = {}  # target -> time of last change
+        self._in_flight: set[str] = set()
+        self._dirty: set[str] = set()
+        self._stop = threading.Event()
+
+    # -- change detection -------------------------------------------------
+
+    def _watched_files(self) -> dict[str, str]:
+        """Return {path: kind} for everything that feeds a preview."""
+        files = {USER_MD_PATH: "profile", CSS_PATH: "style", LATEX_HEADER_PATH: "style"}
+        if os.path.isdir(OUTPUT_DIR):
+            for name in os.listdir(OUTPUT_DIR):
+                if name.startswith("cv_") and name.endswith(".md"):
+                    files[os.path.join(OUTPUT_DIR, name)] = "cv"
+        return files
+
+    def _targets_for(self, path: str, kind: str) -> list[str]:
+        if kind == "profile":
+            return [PROFILE_TARGET]
+        if kind == "cv":
+            return [_cv_target(os.path.basename(path))]
+        # Stylesheet/header changes affect the profile and every rendered CV
+        targets = [PROFILE_TARGET]
+        for name in os.listdir(OUTPUT_DIR) if os.path.isdir(OUTPUT_DIR) else []:
+            if name.startswith("cv_") and name.endswith(".pdf"):
+                targets.append(f"cv:{name[len('cv_'):-len('.pdf')]}")
+        return targets
+
+    def scan(self, initial: bool = False) -> None:
+        """Stat watched files and schedule targets whose inputs changed."""
+        now = time.monotonic()
+        seen = {}
+        for path, kind in self._watched_files().items():
+            try:
+                mtime = os.stat(path).st_mtime
+            except FileNotFoundError:
+                continue
+            seen[path] = mtime
+            if initial or self._mtimes.get(path) == mtime:
+                continue
+            with self._lock:
+                for target in self._targets_for(path, kind):
+                    self._pending[target] = now
+        self._mtimes = seen
+
+    def schedule_stale(self) -> None:
+        """Queue targets whose PDF is missing or older than its markdown."""
+        now = time.monotonic() - self.debounce
+        stale = []
+        profile_pdf = PROFILE_PDF_PATH
+        if os.path.exists(USER_MD_PATH) and (
+            not os.path.exists(profile_pdf)
+            or os.path.getmtime(profile_pdf) < os.path.getmtime(USER_MD_PATH)
+        ):
+            stale.append(PROFILE_TARGET)
+        for path, kind in self._watched_files().items():
+            if kind != "cv":
+                continue
+            pdf_path = path[:-len(".md")] + ".pdf"
+            if not os.path.exists(pdf_path) or os.path.getmtime(pdf_path) < os.path.getmtime(path):
+                stale.append(_cv_target(os.path.basename(path)))
+        with self._lock:
+            for target in stale:
+                self._pending.setdefault(target, now)
+
+    def sync_catalog(self) -> None:
+        """Reconcile the catalog with disk at most every ``sync_interval`` seconds."""
+        now = time.monotonic()
+        if now - self._last_sync < self.sync_interval:
+            return
+        self._last_sync = now
+        try:
+            touched = sync_if_changed()
+        except Exception as e:
+            print(f"[prerender] Error syncing catalog: {str(e)}", file=sys.stderr, flush=True)
+            return
+        if touched:
+            print(f"[prerender] catalog: {touched} CV(s) synced from disk", flush=True)
+
+    # -- rendering --------------------------------------------------------
+
+    def _dispatch_ready(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            ready = [t for t, changed in self._pending.items() if now - changed >= self.debounce]
+            for target in ready:
+                del self._pending[target]
+                if target in self._in_flight:
+                    self._dirty.add(target)
+                    continue
+                self._in_flight.add(target)
+                self._pool.submit(self._run, target)
+
+    def _run(self, target: str) -> None:
+        started = time.perf_counter()
+        try:
+            status = _render_target(target)
+            print(f"[prerender] {status} ({time.perf_counter() - started:.2f}s)", flush=True)
+        except Exception as e:
+            print(f"[prerender] Error rendering {target}: {str(e)}", file=sys.stderr, flush=True)
+        finally:
+            with self._lock:
+                self._in_flight.discard(target)
+                if target in self._dirty:
+                    self._dirty.discard(target)
+                    self._pending[target] = time.monotonic() - self.debounce
+
+    def queue_depth(self) -> int:
+        """Number of targets waiting for or undergoing a render."""
+        with self._lock:
+            return len(self._pending) + len(self._in_flight)
+
+    # -- lifecycle --------------------------------------------------------
+
+    def run(self, once: bool = False) -> None:
+        """Render stale previews, then keep watching until stop() is called.
+
+        With ``once=True``, returns as soon as the stale previews are done.
+        """
+        self.scan(initial=True)
+        self.schedule_stale()
+        self.sync_catalog()
+        while not self._stop.is_set():
+            self._dispatch_ready()
+            if once and self.queue_depth() == 0:
+                break
+            self._stop.wait(self.interval)
+            if not once:
+                self.scan()
+                self.sync_catalog()
+        self._pool.shutdown(wait=True)
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Pre-render profile and CV PDFs in the background.")
+    parser.add_argument("--workers", type=int, default=2, help="Max concurrent renders")
+    parser.add_argument("--debounce", type=float, default=1.0, help="Seconds of quiet before rendering")
+    parser.add_argument("--interval", type=float, default=0.5, help="Polling interval in seconds")
+    parser.add_argument("--sync-interval", type=float, default=30.0,
+                        help="Seconds between catalog syncs with data/output")
+    parser.add_argument("--once", action="store_true", help="Render stale previews and exit")
+    args = parser.parse_args(argv)
+
+    service = PrerenderService(args.workers, args.debounce, args.interval, args.sync_interval)
+    try:
+        service.run(once=args.once)
+    except KeyboardInterrupt:
+        service.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,345 @@
+"""
+Patch operations on the user's profile (data/user.md).
+
+Instead of re-emitting the whole profile for a one-word fix, the agent
+sends a list of small operations. They are applied to the parsed heading
+tree (see user_profile.py) and the file is written once, atomically:
+either every operation applies or user.md is left untouched.
+
+Untouched lines are re-serialized verbatim, so a patch only changes the
+lines it targets. apply_patch() reports which sections changed, and the
+cached parse of user.md is replaced by the patched tree so readers do not
+re-parse the whole file.
+
+Operations (dicts, "op" selects the kind):
+    add_role       title, company, dates, focus, bullets, [position]
+    update_role    role, [title], [company], [dates], [focus]
+    remove_role    role
+    add_bullet     role, text, [index]
+    update_bullet  role, index | match, text
+    remove_bullet  role, index | match
+    add_item       section, text, [group]      (skills, languages, education, ...)
+    update_item    section, index | match, text
+    remove_item    section, index | match
+    set_field      field, text                 (Personal Information: Email, Phone, ...)
+    set_text       section, text               (e.g. the Professional Summary)
+
+``role`` is "Title | Company" as in user.md or the role's 1-based position;
+``index`` is 1-based; ``match`` is a case-insensitive substring.
+
+Every writer of user.md (patches, the write/update tools and the web
+editor via ``python3 profile_patch.py --write < user.md``) holds the same
+file lock as the catalog's renders, so concurrent edits take turns instead
+of overwriting each other.
+"""
+
+import argparse
+import os
+import re
+import sys
+
+import user_profile
+from catalog import USER_MD_PATH, render_lock, temp_output_path
+from user_profile import Node
+
+_BULLET_RE = re.compile(r"^(\s*[-*]\s+)(.*?)\s*$")
+_SEPARATOR = "---"
+
+
+class PatchError(ValueError):
+    """An operation could not be applied; nothing was written."""
+
+
+def _section(root: Node, name: str) -> Node:
+    """Find a section by kind ("skills") or by (part of) its heading title."""
+    key = name.strip().lower()
+    if key in user_profile.SECTION_KEYWORDS:
+        node = user_profile.find_section(root, key)
+    else:
+        node = next((n for n in root.walk() if n.heading is not None and key in n.title.lower()), None)
+    if node is None:
+        raise PatchError(f"Section '{name}' not found in user.md.")
+    return node
+
+
+def _role_node(root: Node, ref: str) -> Node:
+    roles = user_profile.roles(root)
+    ref = str(ref).strip()
+    if ref.isdigit():
+        index = int(ref) - 1
+        if 0 <= index < len(roles):
+            return roles[index].node
+    else:
+        for role in roles:
+            if role.label.casefold() == ref.casefold():
+                return role.node
+    known = "; ".join(f"{i}. {r.label}" for i, r in enumerate(roles, start=1))
+    raise PatchError(f"Role '{ref}' not found. Roles: {known}")
+
+
+def _position(op: dict, key: str, what: str, count: int, insert: bool = False) -> int:
+    """0-based position from the op's 1-based ``key`` among ``count`` entries.
+
+    Inserts may also target ``count + 1`` (the end).
+    """
+    try:
+        number = int(op[key])
+    except (TypeError, ValueError):
+        raise PatchError(f"'{key}' must be a number, got {op[key]!r}.") from None
+    if insert and not 1 <= number <= count + 1:
+        raise PatchError(f"{what} position {number} is out of range (1-{count + 1}).")
+    if not insert and not 1 <= number <= count:
+        raise PatchError(f"{what} #{number} does not exist (there are {count}).")
+    return number - 1
+
+
+def _bullet_lines(node: Node) -> list[int]:
+    """Indices into node.body of top-level list items."""
+    return [i for i, line in enumerate(node.body) if _BULLET_RE.match(line)]
+
+
+def _locate(node: Node, op: dict, what: str) -> int:
+    """Resolve an op's ``index`` or ``match`` to a body line index."""
+    bullets = _bullet_lines(node)
+    if op.get("index") is not None:
+        return bullets[_position(op, "index", what, len(bullets))]
+    match = (op.get("match") or "").casefold()
+    if match:
+        hits = [i for i in bullets if match in node.body[i].casefold()]
+        if len(hits) == 1:
+            return hits[0]
+        if not hits:
+            raise PatchError(f"No {what.lower()} matches '{op['match']}'.")
+        raise PatchError(f"{len(hits)} {what.lower()}s match '{op['match']}'; be more specific.")
+    raise PatchError(f"{what} operations need 'index' or 'match'.")
+
+
+def _insert_bullet(node: Node, text: str, after: int | None) -> None:
+    """Insert '- text' after body line ``after`` (or after the last bullet)."""
+    bullets = _bullet_lines(node)
+    if after is None:
+        if bullets:
+            after = bullets[-1]
+        else:
+            # No list yet: start one after the last non-blank, non-separator line
+            content = [i for i, line in enumerate(node.body)
+                       if line.strip() and line.strip() != _SEPARATOR]
+            after = content[-1] if content else -1
+            node.body.insert(after + 1, "")
+            after += 1
+    prefix = _BULLET_RE.match(node.body[bullets[0]]).group(1) if bullets else "- "
+    node.body.insert(after + 1, f"{prefix}{text.strip()}")
+
+
+def _role_body(op: dict, separator: bool) -> list[str]:
+    body = []
+    dates = (op.get("dates") or "").strip().strip("*")
+    if dates:
+        body.append(f"*{dates}*")
+    body.append("")
+    if op.get("focus"):
+        body += [f"**Focus**: {op['focus'].strip()}", ""]
+    for bullet in op.get("bullets") or []:
+        body.append(f"- {bullet.strip()}")
+    if op.get("bullets"):
+        body.append("")
+    if separator:
+        body += [_SEPARATOR, ""]
+    return body
+
+
+def _ends_with_separator(node: Node) -> bool:
+    content = [line.strip() for line in node.body if line.strip()]
+    return bool(content) and content[-1] == _SEPARATOR
+
+
+def _apply(root: Node, op: dict) -> str:
+    """Apply one operation in place; returns the title of the changed section."""
+    kind = op.get("op")
+    text = (op.get("text") or "").strip()
+
+    if kind == "add_role":
+        section = _section(root, "experience")
+        if not op.get("title"):
+            raise PatchError("add_role needs a 'title'.")
+        title = op["title"].strip()
+        if op.get("company"):
+            title += f" | {op['company'].strip()}"
+        level = section.level + 1
+        existing = section.children
+        separator = bool(existing) and _ends_with_separator(existing[0])
+        node = Node(level=level, title=title, heading=f"{'#' * level} {title}",
+                    body=_role_body(op, separator))
+        # Newest first by default
+        position = _position(op, "position", "Role", len(existing), insert=True) if op.get("position") else 0
+        existing.insert(position, node)
+        return section.title
+
+    if kind in ("update_role", "remove_role"):
+        node = _role_node(root, op.get("role", ""))
+        section = _section(root, "experience")
+        if kind == "remove_role":
+            section.children.remove(node)
+            return section.title
+        title, _, company = node.title.partition(" | ")
+        title = (op.get("title") or title).strip()
+        company = (op.get("company") if op.get("company") is not None else company).strip()
+        node.title = f"{title} | {company}" if company else title
+        node.heading = f"{'#' * node.level} {node.title}"
+        if op.get("dates"):
+            dates = f"*{op['dates'].strip().strip('*')}*"
+            date_index = next((i for i, line in enumerate(node.body)
+                               if re.match(r"^\*[^*].*\*$", line.strip())), None)
+            if date_index is None:
+                node.body.insert(0, dates)
+            else:
+                node.body[date_index] = dates
+        if op.get("focus"):
+            focus_index = next((i for i, line in enumerate(node.body)
+                                if line.strip().startswith("**Focus")), None)
+            focus = f"**Focus**: {op['focus'].strip()}"
+            if focus_index is None:
+                node.body[1:1] = ["", focus] if node.body and node.body[0].startswith("*") else [focus, ""]
+            else:
+                node.body[focus_index] = focus
+        return section.title
+
+    if kind in ("add_bullet", "update_bullet", "remove_bullet"):
+        node = _role_node(root, op.get("role", ""))
+        if kind == "add_bullet":
+            if not text:
+                raise PatchError("add_bullet needs 'text'.")
+            bullets = _bullet_lines(node)
+            after = None
+            if op.get("index") is not None and bullets:
+                position = _position(op, "index", "Bullet", len(bullets), insert=True)
+                after = bullets[position - 1] if position > 0 else bullets[0] - 1
+            _insert_bullet(node, text, after)
+        else:
+            line = _locate(node, op, "Bullet")
+            if kind == "remove_bullet":
+                del node.body[line]
+            else:
+                if not text:
+                    raise PatchError("update_bullet needs 'text'.")
+                node.body[line] = _BULLET_RE.match(node.body[line]).group(1) + text
+        return node.title
+
+    if kind in ("add_item", "update_item", "remove_item", "set_text"):
+        section = _section(root, op.get("section", ""))
+        if kind == "set_text":
+            if not text:
+                raise PatchError("set_text needs 'text'.")
+            keep_separator = _ends_with_separator(section)
+            section.body = ["", text, ""] + ([_SEPARATOR, ""] if keep_separator else [])
+        elif kind == "add_item":
+            if not text:
+                raise PatchError("add_item needs 'text'.")
+            after = None
+            if op.get("group"):
+                group = op["group"].casefold()
+                label = next((i for i, line in enumerate(section.body)
+                              if line.startswith("**") and group in line.casefold()), None)
+                if label is None:
+                    raise PatchError(f"Group '{op['group']}' not found in section '{section.title}'.")
+                after = label
+                for i in range(label + 1, len(section.body)):
+                    if _BULLET_RE.match(section.body[i]):
+                        after = i
+                    elif section.body[i].strip():
+                        break
+                if after == label:
+                    section.body.insert(label + 1, f"- {text}")
+                    return section.title
+            _insert_bullet(section, text, after)
+        else:
+            line = _locate(section, op, "Item")
+            if kind == "remove_item":
+                del section.body[line]
+            else:
+                if not text:
+                    raise PatchError("update_item needs 'text'.")
+                section.body[line] = _BULLET_RE.match(section.body[line]).group(1) + text
+        return section.title
+
+    if kind == "set_field":
+        section = _section(root, "personal")
+        field = (op.get("field") or "").strip()
+        if not field:
+            raise PatchError("set_field needs 'field'.")
+        pattern = re.compile(rf"^(\s*[-*]\s+\*\*{re.escape(field)}:?\*\*:?\s*)", re.IGNORECASE)
+        for i, line in enumerate(section.body):
+            match = pattern.match(line)
+            if match:
+                if text:
+                    section.body[i] = match.group(1) + text
+                else:
+                    del section.body[i]
+                return section.title
+        if not text:
+            raise PatchError(f"Field '{field}' not found.")
+        fields = [i for i, line in enumerate(section.body) if line.lstrip().startswith(("- **", "* **"))]
+        position = fields[-1] + 1 if fields else len(section.body)
+        section.body.insert(position, f"- **{field}:** {text}")
+        return section.title
+
+    raise PatchError(f"Unknown operation '{kind}'.")
+
+
+def _write_atomic(path: str, text: str) -> None:
+    tmp_path = temp_output_path(path)
+    try:
+        with open(tmp_path, "w") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def write_profile(path: str, text: str) -> None:
+    """Replace the whole profile at ``path``, taking turns with other writers."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with render_lock(path):
+        _write_atomic(path, text)
+
+
+def apply_patch(path: str, operations: list[dict]) -> list[str]:
+    """Apply all operations to the profile at ``path`` atomically.
+
+    Returns the titles of the sections that changed, in order. Raises
+    PatchError (and leaves the file untouched) if any operation fails.
+    """
+    if not operations:
+        raise PatchError("No operations given.")
+    # Held from read to write: a concurrent edit cannot slip in between
+    with render_lock(path):
+        with open(path, "r") as f:
+            original = f.read()
+        root = user_profile.parse(original)
+        changed = []
+        for number, op in enumerate(operations, start=1):
+            try:
+                title = _apply(root, op)
+            except PatchError as e:
+                raise PatchError(f"Operation {number} ({op.get('op')}): {e}") from None
+            if title not in changed:
+                changed.append(title)
+        text = user_profile.serialize(root)
+        if text != original:
+            _write_atomic(path, text)
+            user_profile.cache_parsed(path, root)
+    return changed
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Write data/user.md under the profile lock.")
+    parser.add_argument("--write", action="store_true", required=True,
+                        help="Replace user.md with stdin")
+    parser.parse_args(argv)
+    write_profile(USER_MD_PATH, sys.stdin.read())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,345 @@
+"""
+Shared rate limiting, retries and circuit breaking for outbound calls.
+
+Every LLM call (agent turns and the LLM-backed tools) and every FireCrawl
+scrape goes through guarded(provider, model, fn, ...). Each
+(provider, model) pair gets its own:
+
+- token bucket: steady request rate with a burst allowance; callers wait
+  for a token (up to a deadline) instead of hitting the provider's limit
+- AIMD concurrency limit: +1 slot after a window of successes, halved on
+  429s/timeouts, so the limit settles just below what the provider takes
+- retries: exponential backoff with full jitter, honouring Retry-After;
+  only for 429, 5xx, timeouts and connection errors
+- circuit breaker: after N consecutive failures (5xx or timeouts) calls
+  fail fast for a cool-down period, then a single trial call decides
+  whether to close it. A 429 means the provider is up but busy, so it
+  only slows the limiter and bucket down and never opens the breaker.
+
+Errors are classified from their HTTP status (``status_code`` on the
+error or on its ``response``, as openai, httpx and requests errors carry
+it) and their exception type, never from the message text.
+
+When a call cannot be made (breaker open, no token or slot in time) a
+CallRejected error is raised. The tools turn it into an "Error ..."
+string that tells the agent to wait, instead of failing again at once.
+
+Configuration (environment variables):
+    CV_RATE_<PROVIDER>        "rate_per_sec,burst", e.g. CV_RATE_OPENAI=5,10
+    CV_MAX_CONCURRENCY        upper bound of the AIMD limit (default 16)
+    CV_RETRY_ATTEMPTS         attempts per call, including the first (default 4)
+    CV_BREAKER_FAILURES       consecutive failures that open a breaker (default 5)
+    CV_BREAKER_RESET_SECONDS  cool-down before a trial call (default 30)
+    CV_ACQUIRE_TIMEOUT        max seconds to wait for a token/slot (default 60)
+
+Throughput, retries, throttling and rejections per key are kept in
+resilience_metrics().
+"""
+
+import math
+import os
+import random
+import threading
+import time
+
+# Default "rate_per_sec,burst" per provider
+DEFAULT_RATES = {
+    "openai": (5.0, 10),
+    "firecrawl": (1.0, 3),
+}
+
+
+class CallRejected(RuntimeError):
+    """The call was not attempted (circuit open or no capacity in time)."""
+
+    def __init__(self, key: str, reason: str, retry_after: float):
+        super().__init__(f"{key} {reason}; try again in {math.ceil(retry_after)}s")
+        self.retry_after = retry_after
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def _rate_for(provider: str) -> tuple[float, int]:
+    configured = os.getenv(f"CV_RATE_{provider.upper()}")
+    if configured:
+        rate, _, burst = configured.partition(",")
+        return float(rate), int(burst or max(1, float(rate)))
+    return DEFAULT_RATES.get(provider, (5.0, 10))
+
+
+class TokenBucket:
+    """Classic token bucket: ``rate`` tokens per second, at most ``burst`` stored."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, deadline: float) -> bool:
+        """Take one token, waiting until ``deadline`` (monotonic) at the latest."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+    def drain(self) -> None:
+        """Empty the bucket (the provider said we are over its limit)."""
+        with self._lock:
+            self._tokens = 0.0
+            self._updated = time.monotonic()
+
+
+class AIMDLimiter:
+    """Concurrency limit with additive increase and multiplicative decrease."""
+
+    def __init__(self, initial: int = 4, minimum: int = 1, maximum: int = 16):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = float(initial)
+        self.in_flight = 0
+        self._successes = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, deadline: float) -> bool:
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            self.in_flight += 1
+            return True
+
+    def release(self, outcome: str) -> None:
+        """``outcome`` is "ok", "throttled" (429/timeout) or "error"."""
+        with self._cond:
+            self.in_flight -= 1
+            if outcome == "ok":
+                # +1 slot per limit-sized window of successes (~ one per round trip)
+                self._successes += 1
+                if self._successes >= self.limit:
+                    self._successes = 0
+                    self.limit = min(self.maximum, self.limit + 1)
+            elif outcome == "throttled":
+                self._successes = 0
+                self.limit = max(self.minimum, self.limit / 2)
+            self._cond.notify_all()
+
+
+class CircuitBreaker:
+    """closed -> open after N consecutive failures -> half-open trial -> closed/open."""
+
+    def __init__(self, failures: int = 5, reset_seconds: float = 30.0):
+        self.failure_threshold = failures
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> float:
+        """Return 0 if a call may proceed, else seconds until the next trial."""
+        with self._lock:
+            if self.state == "closed":
+                return 0.0
+            remaining = self._opened_at + self.reset_seconds - time.monotonic()
+            if remaining > 0:
+                return remaining
+            if self._trial_running:
+                return 1.0
+            self.state = "half_open"
+            self._trial_running = True
+            return 0.0
+
+    def cancel_trial(self) -> None:
+        """The half-open trial call was not made (or says nothing about health)."""
+        with self._lock:
+            self._trial_running = False
+            if self.state == "half_open":
+                self.state = "open"
+                self._opened_at = time.monotonic() - self.reset_seconds
+
+    def record(self, success: bool) -> None:
+        with self._lock:
+            self._trial_running = False
+            if success:
+                self.state = "closed"
+                self._failures = 0
+                return
+            self._failures += 1
+            if self.state == "half_open" or self._failures >= self.failure_threshold:
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+
+# Exception class names (anywhere in the MRO) by category, so the
+# provider SDKs do not have to be imported here
+_THROTTLE_TYPES = {"RateLimitError"}
+_TIMEOUT_TYPES = {"TimeoutError", "APITimeoutError", "Timeout", "TimeoutException",
+                  "ReadTimeout", "ConnectTimeout"}
+_CONNECTION_TYPES = {"ConnectionError", "APIConnectionError", "ConnectError", "RemoteProtocolError"}
+
+
+def _status_code(error: Exception) -> int | None:
+    """HTTP status of ``error`` or of the error it was raised from."""
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        for source in (error, getattr(error, "response", None)):
+            code = getattr(source, "status_code", None)
+            if isinstance(code, int):
+                return code
+        error = error.__cause__
+    return None
+
+
+def _retry_after(error: Exception) -> float | None:
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after") or headers.get("Retry-After")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def classify(error: Exception) -> str:
+    """"throttled" (429), "timeout", "server_error" (5xx), "connection" or "fatal"."""
+    names = {cls.__name__ for cls in type(error).__mro__}
+    status = _status_code(error)
+    if status == 429 or names & _THROTTLE_TYPES:
+        return "throttled"
+    if status in (408, 504) or names & _TIMEOUT_TYPES:
+        return "timeout"
+    if status is not None and status >= 500:
+        return "server_error"
+    if status is None and names & _CONNECTION_TYPES:
+        return "connection"
+    return "fatal"
+
+
+class Guard:
+    """Bucket, limiter, breaker and counters for one (provider, model)."""
+
+    def __init__(self, key: str, provider: str):
+        self.key = key
+        rate, burst = _rate_for(provider)
+        self.bucket = TokenBucket(rate, burst)
+        self.limiter = AIMDLimiter(maximum=int(_env_float("CV_MAX_CONCURRENCY", 16)))
+        self.breaker = CircuitBreaker(
+            failures=int(_env_float("CV_BREAKER_FAILURES", 5)),
+            reset_seconds=_env_float("CV_BREAKER_RESET_SECONDS", 30),
+        )
+        self._lock = threading.Lock()
+        self._started = time.monotonic()
+        self.counts = {"calls": 0, "succeeded": 0, "failed": 0, "retries": 0,
+                       "throttled": 0, "timeouts": 0, "rejected": 0}
+        self.seconds = 0.0
+
+    def _count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self.counts[name] += n
+
+    def call(self, fn, *args, **kwargs):
+        attempts = max(1, int(_env_float("CV_RETRY_ATTEMPTS", 4)))
+        acquire_timeout = _env_float("CV_ACQUIRE_TIMEOUT", 60)
+        self._count("calls")
+        for attempt in range(attempts):
+            wait = self.breaker.allow()
+            if wait:
+                self._count("rejected")
+                raise CallRejected(self.key, "circuit open after repeated failures", wait)
+            deadline = time.monotonic() + acquire_timeout
+            if not self.bucket.acquire(deadline) or not self.limiter.acquire(deadline):
+                self.breaker.cancel_trial()
+                self._count("rejected")
+                raise CallRejected(self.key, "is saturated", acquire_timeout)
+
+            started = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                kind = classify(e)
+                # 429s and timeouts mean "too much load": shrink the concurrency limit
+                self.limiter.release("throttled" if kind in ("throttled", "timeout") else "error")
+                if kind in ("timeout", "server_error"):
+                    self.breaker.record(False)
+                else:
+                    # Rate limiting and client errors (bad request, auth) say
+                    # nothing about provider health
+                    self.breaker.cancel_trial()
+                if kind == "throttled":
+                    self._count("throttled")
+                    self.bucket.drain()
+                elif kind == "timeout":
+                    self._count("timeouts")
+                if kind == "fatal" or attempt == attempts - 1:
+                    self._count("failed")
+                    raise
+                # Full jitter backoff, but never sooner than Retry-After
+                delay = random.uniform(0, min(30.0, 0.5 * 2 ** attempt))
+                delay = max(delay, _retry_after(e) or 0.0)
+                self._count("retries")
+                time.sleep(delay)
+                continue
+            self.limiter.release("ok")
+            self.breaker.record(True)
+            with self._lock:
+                self.counts["succeeded"] += 1
+                self.seconds += time.perf_counter() - started
+            return result
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counts = dict(self.counts)
+            elapsed = time.monotonic() - self._started
+            seconds = self.seconds
+        counts.update({
+            "throughput_per_sec": round(counts["succeeded"] / elapsed, 3) if elapsed else 0.0,
+            "mean_seconds": round(seconds / counts["succeeded"], 4) if counts["succeeded"] else None,
+            "concurrency_limit": int(self.limiter.limit),
+            "in_flight": self.limiter.in_flight,
+            "breaker": self.breaker.state,
+        })
+        return counts
+
+
+_guards: dict[str, Guard] = {}
+_guards_lock = threading.Lock()
+
+
+def guard(provider: str, model: str) -> Guard:
+    key = f"{provider}/{model}"
+    with _guards_lock:
+        if key not in _guards:
+            _guards[key] = Guard(key, provider)
+        return _guards[key]
+
+
+def guarded(provider: str, model: str, fn, *args, **kwargs):
+    """Call ``fn`` under the (provider, model) rate limit, retries and breaker."""
+    return guard(provider, model).call(fn, *args, **kwargs)
+
+
+def resilience_metrics() -> dict:
+    """Per-key counters: calls, successes, retries, throttling, rejections, limits."""
+    with _guards_lock:
+        guards = list(_guards.values())
+    return {g.key: g.snapshot() for g in guards}
@@ -0,0 +1,156 @@
+"""
+Per-turn model routing for the assistant node.
+
+Most assistant turns only plan: greet the user, pick the next tool, or
+acknowledge a finished step. Those go to a small, fast model. Turns that
+write or rewrite CV/profile content go to the strong model:
+
+- right after the inputs for writing arrive (read_user_data, read_template,
+  read_cv, polish_cv, score_cv_keywords, fit_cv_pages results)
+- after a write was rejected ("CV NOT written: ...") and must be repaired
+- whenever the fast model tries to call a writing tool itself (its answer
+  is discarded and the turn is re-run on the strong model)
+
+Configuration (environment variables):
+    CV_AGENT_ROUTING         "on" (default) or "off" (always strong)
+    CV_AGENT_FAST_MODEL      default "gpt-5-mini"
+    CV_AGENT_STRONG_MODEL    default "gpt-5.2"
+    CV_AGENT_STRONG_AFTER    comma-separated tool names that trigger the
+                             strong model (default: WRITE_INPUT_TOOLS)
+    CV_AGENT_ROUTING_LOG     optional JSONL file; one line per decision
+
+Decisions, latencies and token usage per model are kept in
+routing_metrics() for measuring the savings.
+"""
+
+import json
+import os
+import threading
+import time
+
+FAST = "fast"
+STRONG = "strong"
+
+# Tools whose results are the inputs for writing CV/profile content
+WRITE_INPUT_TOOLS = frozenset({
+    "read_user_data", "read_template", "read_cv",
+    "polish_cv", "score_cv_keywords", "fit_cv_pages",
+})
+
+# Tools that carry model-written content; the fast model may not call them
+WRITER_TOOLS = frozenset({"write_cv", "write_cv_structured", "write_user_data", "patch_user_data"})
+
+
+def routing_enabled() -> bool:
+    return os.getenv("CV_AGENT_ROUTING", "on").lower() not in ("off", "0", "false")
+
+
+def model_for(tier: str) -> str:
+    if tier == FAST:
+        return os.getenv("CV_AGENT_FAST_MODEL", "gpt-5-mini")
+    return os.getenv("CV_AGENT_STRONG_MODEL", "gpt-5.2")
+
+
+def _strong_after() -> frozenset:
+    configured = os.getenv("CV_AGENT_STRONG_AFTER")
+    if not configured:
+        return WRITE_INPUT_TOOLS
+    return frozenset(name.strip() for name in configured.split(",") if name.strip())
+
+
+def choose_tier(messages: list) -> tuple[str, str]:
+    """Pick the model tier for the next assistant turn.
+
+    Returns (tier, reason). Only the tool results since the last AI
+    message are considered: they are what the model is about to act on.
+    """
+    if not routing_enabled():
+        return STRONG, "routing_off"
+
+    trailing = []
+    for message in reversed(messages):
+        if getattr(message, "type", None) != "tool":
+            break
+        trailing.append(message)
+    if not trailing:
+        return FAST, "user_turn"
+
+    triggers = _strong_after()
+    for message in trailing:
+        name = getattr(message, "name", None) or ""
+        content = message.content if isinstance(message.content, str) else ""
+        if name in WRITER_TOOLS and content.startswith(("CV NOT written", "Profile NOT updated")):
+            return STRONG, f"repair:{name}"
+        if name in triggers:
+            return STRONG, f"after:{name}"
+    return FAST, "planning"
+
+
+def needs_escalation(response) -> str | None:
+    """Return a reason if a fast-model response must be redone by the strong model."""
+    for call in getattr(response, "tool_calls", None) or []:
+        if call.get("name") in WRITER_TOOLS:
+            return f"fast_called:{call['name']}"
+    return None
+
+
+class RoutingMetrics:
+    """Thread-safe counters of routing decisions, latency and tokens per model."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._turns = {}
+            self._reasons = {}
+            self._escalations = 0
+
+    def record(self, tier: str, model: str, reason: str, seconds: float, response,
+               escalated: bool = False) -> None:
+        usage = getattr(response, "usage_metadata", None) or {}
+        with self._lock:
+            stats = self._turns.setdefault(model, {
+                "tier": tier, "turns": 0, "seconds": 0.0,
+                "input_tokens": 0, "output_tokens": 0,
+            })
+            stats["turns"] += 1
+            stats["seconds"] += seconds
+            stats["input_tokens"] += usage.get("input_tokens", 0)
+            stats["output_tokens"] += usage.get("output_tokens", 0)
+            self._reasons[reason] = self._reasons.get(reason, 0) + 1
+            if escalated:
+                self._escalations += 1
+
+        log_path = os.getenv("CV_AGENT_ROUTING_LOG")
+        if log_path:
+            entry = {
+                "at": time.time(), "tier": tier, "model": model, "reason": reason,
+                "seconds": round(seconds, 4), "escalated": escalated,
+                "input_tokens": usage.get("input_tokens", 0),
+                "output_tokens": usage.get("output_tokens", 0),
+            }
+            with self._lock, open(log_path, "a") as f:
+                f.write(json.dumps(entry) + "\n")
+
+    def snapshot(self) -> dict:
+        """Per-model turns, mean latency and tokens, plus decision reasons."""
+        with self._lock:
+            models = {}
+            for model, stats in self._turns.items():
+                models[model] = dict(stats)
+                models[model]["mean_seconds"] = round(stats["seconds"] / stats["turns"], 4)
+                models[model]["seconds"] = round(stats["seconds"], 4)
+            return {
+                "models": models,
+                "reasons": dict(self._reasons),
+                "escalations": self._escalations,
+            }
+
+
+_metrics = RoutingMetrics()
+
+
+def routing_metrics() -> RoutingMetrics:
+    return _metrics
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark and import-time profile for the studio modules.
+
+Each measurement runs in a fresh interpreter (like the LangGraph server,
+a scaled-out worker or a generate_profile_pdf.py subprocess would), so
+nothing is served from an already-warm sys.modules.
+
+- startup: wall time of `python -c "import <module>"`, repeated N times
+- profile: `python -X importtime`, aggregated into the slowest top-level
+  packages and the slowest individual imports (cumulative microseconds)
+
+Usage:
+    python3 startup_bench.py [--modules agent tools generate_profile_pdf]
+                             [--runs 10] [--top 15] [--json]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+STUDIO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def time_import(module: str, runs: int) -> dict:
+    """Wall-clock seconds to start Python and import ``module``."""
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, "-c", f"import {module}"],
+            cwd=STUDIO_DIR, capture_output=True, text=True,
+        )
+        samples.append(time.perf_counter() - started)
+        if result.returncode != 0:
+            raise RuntimeError(f"import {module} failed:\n{result.stderr.strip()}")
+    return {
+        "runs": runs,
+        "min_s": round(min(samples), 4),
+        "median_s": round(statistics.median(samples), 4),
+        "max_s": round(max(samples), 4),
+    }
+
+
+def baseline(runs: int) -> float:
+    """Median seconds for a bare interpreter start, to subtract from imports."""
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "pass"], capture_output=True)
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def profile_imports(module: str) -> list[tuple[str, int, int]]:
+    """Parse `-X importtime` output into (name, self_us, cumulative_us)."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=STUDIO_DIR, capture_output=True, text=True,
+    )
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        entries.append((name.rstrip(), int(self_us), int(cumulative_us)))
+    return entries
+
+
+def summarize_profile(entries: list[tuple[str, int, int]], top: int) -> dict:
+    """Slowest top-level packages (by self time) and slowest single imports."""
+    by_package: dict[str, int] = {}
+    for name, self_us, _ in entries:
+        package = name.strip().split(".")[0]
+        by_package[package] = by_package.get(package, 0) + self_us
+    packages = sorted(by_package.items(), key=lambda item: item[1], reverse=True)[:top]
+    imports = sorted(entries, key=lambda entry: entry[2], reverse=True)[:top]
+    return {
+        "total_ms": round(sum(self_us for _, self_us, _ in entries) / 1000, 1),
+        "packages_ms": [(name, round(us / 1000, 1)) for name, us in packages],
+        "slowest_imports_ms": [(name.strip(), round(cum / 1000, 1)) for name, _, cum in imports],
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark cold start of the studio modules.")
+    parser.add_argument("--modules", nargs="+", default=["agent", "tools", "generate_profile_pdf"])
+    parser.add_argument("--runs", type=int, default=10, help="Fresh interpreters per module")
+    parser.add_argument("--top", type=int, default=15, help="Rows in the import profile")
+    parser.add_argument("--json", action="store_true", help="Print a JSON report")
+    args = parser.parse_args(argv)
+
+    interpreter_s = baseline(args.runs)
+    report = {"python": sys.version.split()[0], "interpreter_start_s": round(interpreter_s, 4),
+              "modules": {}}
+    for module in args.modules:
+        try:
+            timing = time_import(module, args.runs)
+        except RuntimeError as e:
+            report["modules"][module] = {"error": str(e)}
+            continue
+        timing["import_only_median_s"] = round(timing["median_s"] - interpreter_s, 4)
+        timing["profile"] = summarize_profile(profile_imports(module), args.top)
+        report["modules"][module] = timing
+
+    if args.json:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+        return 0
+
+    print(f"Python {report['python']}, bare interpreter start {interpreter_s * 1000:.0f} ms")
+    for module, timing in report["modules"].items():
+        print(f"\n== import {module} ==")
+        if "error" in timing:
+            print(timing["error"])
+            continue
+        print(f"cold start median {timing['median_s'] * 1000:.0f} ms "
+              f"(import only {timing['import_only_median_s'] * 1000:.0f} ms, "
+              f"min {timing['min_s'] * 1000:.0f} ms, max {timing['max_s'] * 1000:.0f} ms)")
+        print("slowest packages (self time):")
+        for name, ms in timing["profile"]["packages_ms"]:
+            print(f"  {ms:8.1f} ms  {name}")
+        print("slowest imports (cumulative):")
+        for name, ms in timing["profile"]["slowest_imports_ms"]:
+            print(f"  {ms:8.1f} ms  {name}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,34 +4,70 @@ Custom tools for the CV Tailoring Agent.
 Tools:
 - read_template: Read CV structure template
 - read_user_data: Read user's factual data
+- patch_user_data: Apply small edits to user.md (roles, bullets, skills, fields)
 - read_cv: Read existing CV for a job
 - write_cv: Write tailored CV markdown
+- write_cv_structured: Write a CV from a compact selection, assembled locally
+- write_cv_variants: Draft several CV versions concurrently and keep the best
 - generate_pdf: Convert markdown to PDF
+- export_cv: Write PDF, HTML, DOCX and plain text from one parse
+- fit_cv_pages: Render a CV to PDF, adjusting layout to hit a page count
 - extract_job_url: Extract job description from URL (using FireCrawl)
 - clean_job_description: Clean raw HTML/markdown from extracted content
 - translate_job_description: Translate non-English job descriptions
 - analyze_job_requirements: Extract structured requirements from job description
+- score_cv_keywords: Local keyword-coverage score of a CV against requirements
 """
 
 import os
 import subprocess
+import threading
+from functools import lru_cache
 from langchain_core.tools import tool
-from langchain_community.document_loaders.firecrawl import FireCrawlLoader
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import ChatPromptTemplate
-from dotenv import load_dotenv
+from pydantic import BaseModel, Field
 
-# Load environment variables from .env file
+from catalog import write_cv_file, record_pdf, render_lock, temp_output_path, is_fresh
+from layout_fit import clear_fit, fit_cv, fit_path, format_report
+from cv_schema import validate_cv, errors, violations_json
+from cv_assemble import assemble_cv, profile_gaps, SelectionError
+from resilience import guarded
+import prefetch
+from profile_patch import apply_patch, write_profile, PatchError
+import cv_export
+import user_profile
+
+# Load environment variables from .env file. Heavy clients (OpenAI,
+# FireCrawl) and numpy are imported inside the tools that use them, so
+# importing this module stays cheap for the graph server and subprocesses.
 _this_dir = os.path.dirname(os.path.abspath(__file__))
-load_dotenv(os.path.join(_this_dir, ".env"))
+_env_path = os.path.join(_this_dir, ".env")
+if os.path.exists(_env_path):
+    from dotenv import load_dotenv
+    load_dotenv(_env_path)
 
 # Directory paths relative to this file
 BASE_DIR = os.path.dirname(_this_dir)
-DATA_DIR = os.path.join(BASE_DIR, "data")
+# CV_DATA_DIR lets the load-test harness point the tools at a scratch copy
+DATA_DIR = os.getenv("CV_DATA_DIR") or os.path.join(BASE_DIR, "data")
 ASSETS_DIR = os.path.join(BASE_DIR, "assets")
 OUTPUT_DIR = os.path.join(DATA_DIR, "output")
 
 
+# Model used by the LLM-backed tools (cleaning, translation, analysis, polish)
+LLM_MODEL = "gpt-5.2"
+
+
+@lru_cache(maxsize=None)
+def chat_model(model: str):
+    """Return a shared ChatOpenAI client for ``model``, built on first use.
+    
+    The client's own retries are off: resilience.guarded() retries with
+    backoff, rate limits and circuit breaking shared across all callers.
+    """
+    from langchain_openai import ChatOpenAI
+    return ChatOpenAI(model=model, max_retries=0)
+
+
 @tool
 def read_template() -> str:
     """Read the CV template that defines structure, formatting, and layout rules.
@@ -80,17 +116,63 @@ def write_user_data(content: str) -> str:
     """
     user_path = os.path.join(DATA_DIR, "user.md")
     
-    # Ensure data directory exists
-    os.makedirs(DATA_DIR, exist_ok=True)
-    
     try:
-        with open(user_path, "w") as f:
-            f.write(content)
+        write_profile(user_path, content)
         return "✅ Profile updated successfully! The changes have been saved to user.md."
     except Exception as e:
         return f"Error writing profile: {str(e)}"
 
 
+class ProfileOperation(BaseModel):
+    """One edit to user.md; which fields apply depends on ``op``."""
+    op: str = Field(description=(
+        "add_role | update_role | remove_role | add_bullet | update_bullet | remove_bullet | "
+        "add_item | update_item | remove_item | set_field | set_text"))
+    role: str = Field(default="", description="'Title | Company' as in user.md, or its 1-based position")
+    section: str = Field(default="", description="For *_item/set_text: skills, languages, education, summary, or a heading title")
+    index: int | None = Field(default=None, description="1-based bullet/item position")
+    match: str = Field(default="", description="Case-insensitive text identifying the bullet/item (instead of index)")
+    text: str = Field(default="", description="New bullet, item, field value or section text")
+    group: str = Field(default="", description="add_item: bold group label inside the section, e.g. 'Tools'")
+    field: str = Field(default="", description="set_field: Personal Information field, e.g. 'Email'")
+    title: str = Field(default="", description="add_role/update_role: job title")
+    company: str | None = Field(default=None, description="add_role/update_role: company")
+    dates: str = Field(default="", description="add_role/update_role: 'Jan 2020 – Present | Berlin'")
+    focus: str = Field(default="", description="add_role/update_role: focus line")
+    bullets: list[str] = Field(default_factory=list, description="add_role: achievement bullets")
+    position: int | None = Field(default=None, description="add_role: 1-based position (default 1 = newest)")
+
+
+@tool
+def patch_user_data(operations: list[ProfileOperation]) -> str:
+    """Apply targeted edits to the user's profile (user.md) without rewriting it.
+    
+    All operations are applied together: if any one fails, nothing is saved.
+    Lines that are not targeted stay exactly as they are.
+    
+    Args:
+        operations: Edits to apply in order, e.g.
+            {"op": "add_bullet", "role": "Product Manager | Acme", "text": "Cut churn 12%"}
+            {"op": "update_item", "section": "skills", "match": "Jira", "text": "Jira, Linear"}
+            {"op": "set_field", "field": "Phone", "text": "+49 170 000000"}
+    
+    Returns:
+        The sections that changed, or the error to fix.
+    
+    PREFERRED over write_user_data for adding/changing/removing individual
+    roles, bullets, skills, languages or contact fields.
+    """
+    user_path = os.path.join(DATA_DIR, "user.md")
+    ops = [_as_dict(op) for op in operations]
+    try:
+        changed = apply_patch(user_path, ops)
+    except FileNotFoundError:
+        return "Error: user.md not found. Please create data/user.md with your information."
+    except PatchError as e:
+        return f"Profile NOT updated: {str(e)}"
+    return f"✅ Profile updated ({len(ops)} edits). Changed sections: {', '.join(changed)}"
+
+
 @tool
 def update_user_data(content: str) -> str:
     """Update the user's profile data (user.md) with new content.
@@ -106,12 +188,8 @@ def update_user_data(content: str) -> str:
     """
     user_path = os.path.join(DATA_DIR, "user.md")
     
-    # Ensure data directory exists
-    os.makedirs(DATA_DIR, exist_ok=True)
-    
     try:
-        with open(user_path, "w") as f:
-            f.write(content)
+        write_profile(user_path, content)
         return f"✅ Profile successfully updated at {user_path}"
     except Exception as e:
         return f"❌ Error updating profile: {str(e)}"
@@ -138,94 +216,247 @@ def read_cv(job_name: str) -> str:
 
 
 @tool
-def write_cv(job_name: str, content: str) -> str:
+def write_cv(job_name: str, content: str, source_url: str = "") -> str:
     """Write the tailored CV markdown content for a specific job.
     
     Args:
         job_name: The job identifier (e.g., 'google_pm', 'meta_engineer')
         content: The full markdown content of the CV
+        source_url: URL of the job posting, if the job came from a link
     
     Returns:
         Confirmation message with the file path.
     
+    The CV is checked against template.md before anything is written. If it
+    breaks the template (missing/misordered sections, summary too long, too
+    many bullets, ...), nothing is written and the violations are returned
+    as JSON with line numbers - fix just those lines and call again.
+    
     IMPORTANT: After calling this, you MUST call generate_pdf with the same job_name.
     """
-    # Sanitize job name for filename
-    safe_name = job_name.lower().replace(" ", "_").replace("-", "_")
+    return _save_cv(job_name, content, source_url, "write_cv")
+
+
+class RoleSelection(BaseModel):
+    """One role from user.md to include in the CV."""
+    role: str = Field(description="'Title | Company' exactly as in user.md, or its 1-based position")
+    bullets: list[str] = Field(default_factory=list, description="Tailored bullets (max 4, one sentence each)")
+    description: str = Field(default="", description="One-sentence summary instead of bullets, for less relevant roles")
+
+
+class SkillSelection(BaseModel):
+    """Ordered skill lists for the SKILLS & LANGUAGES section."""
+    competencies: list[str] = Field(default_factory=list)
+    soft_skills: list[str] = Field(default_factory=list)
+    tools: list[str] = Field(default_factory=list)
+    languages: list[str] = Field(default_factory=list, description="Leave empty to use user.md languages")
+
+
+@tool
+def write_cv_structured(job_name: str, target_role: str, summary: str,
+                        roles: list[RoleSelection], skills: SkillSelection,
+                        source_url: str = "") -> str:
+    """Write a tailored CV from a compact selection; the markdown is assembled locally.
     
-    # Ensure output directory exists
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    Header, contact lines, dates, education, separators and formatting come from
+    user.md and template.md automatically - only send the tailored parts.
+    If user.md has no education, that section is left out and reported as a
+    warning (it cannot be added from here).
     
-    # Fix markdown formatting: ensure two spaces at end of lines that need line breaks
-    content = _fix_markdown_line_breaks(content)
+    Args:
+        job_name: The job identifier (e.g., 'google_pm', 'meta_engineer')
+        target_role: Role title shown under the name (the job's title)
+        summary: The tailored professional summary (max 4 sentences)
+        roles: Roles to include, most recent first, each with bullets or a description
+        skills: Ordered competencies, soft skills and tools (languages optional)
+        source_url: URL of the job posting, if the job came from a link
     
-    cv_path = os.path.join(OUTPUT_DIR, f"cv_{safe_name}.md")
-    with open(cv_path, "w") as f:
-        f.write(content)
+    Returns:
+        Confirmation message, or the problems to fix.
+    
+    PREFERRED over write_cv for new CVs. Use write_cv for free-form edits.
+    IMPORTANT: After calling this, you MUST call generate_pdf with the same job_name.
+    """
+    user_path = os.path.join(DATA_DIR, "user.md")
+    try:
+        profile = user_profile.load(user_path)
+    except FileNotFoundError:
+        return "Error: user.md not found. Please create data/user.md with your information."
     
-    return f"CV written to {cv_path}. Now call generate_pdf('{job_name}') to create the PDF."
+    selection = {
+        "target_role": target_role,
+        "summary": summary,
+        "roles": [_as_dict(r) for r in roles],
+        "skills": _as_dict(skills),
+    }
+    try:
+        content = assemble_cv(selection, profile)
+    except SelectionError as e:
+        return f"CV NOT written: {str(e)}"
+    # Sections user.md cannot fill are reported as warnings, not errors
+    return _save_cv(job_name, content, source_url, "write_cv_structured",
+                    profile_gaps(profile))
+
 
+class CVDraft(BaseModel):
+    """One tailored CV selection, in write_cv_structured's format."""
+    target_role: str = Field(description="Role title shown under the name (the job's title)")
+    summary: str = Field(description="Tailored professional summary, max 4 sentences")
+    roles: list[RoleSelection] = Field(description="Roles to include, most recent first")
+    skills: SkillSelection
 
-def _fix_markdown_line_breaks(content: str) -> str:
-    """Automatically fix markdown line breaks by adding two spaces where needed.
+
+_VARIANT_SYSTEM_PROMPT = """You tailor a CV to a job by selecting and rewording the user's real experience.
+
+Rules:
+- Facts (titles, companies, dates, metrics, degrees, deep technical skills) come ONLY from the profile.
+- Soft skills, common business tools and general competencies from the job may be added if the profile makes them plausible.
+- Use the job's terminology to describe the user's actual experience; never copy posting sentences verbatim.
+- Summary: max 4 sentences, opening with the job's role type and focus area.
+- Roles: reference each as "Title | Company" exactly as in the profile; max 4 one-sentence bullets for relevant roles, a one-sentence description for less relevant ones.
+- Skills: order competencies, soft skills and tools by relevance to the job.
+
+EMPHASIS for this version: {emphasis}"""
+
+
+@tool
+def write_cv_variants(job_name: str, job_description: str, requirements: str,
+                      emphases: list[str] | None = None, target_pages: int = 1,
+                      source_url: str = "") -> str:
+    """Draft several versions of a CV with different emphasis at once and keep the best.
+    
+    All drafts are written concurrently, drafts that break the template are
+    dropped, and the rest are scored locally on keyword coverage of the
+    requirements and on page fit. The best one is saved as the job's CV and
+    rendered to PDF; the others are kept for comparison.
     
-    This ensures proper PDF rendering even if the LLM forgets to add trailing spaces.
+    Args:
+        job_name: The job identifier (e.g., 'google_pm', 'meta_engineer')
+        job_description: The (cleaned, English) job description
+        requirements: The JSON output of analyze_job_requirements
+        emphases: Versions to compare, e.g. ["leadership", "technical"]
+                  (built-in: leadership, technical, impact, balanced; any other
+                  text is used as the emphasis). Default: leadership, technical, balanced
+        target_pages: Page count the CV should fit on (default 1)
+        source_url: URL of the job posting, if the job came from a link
+    
+    Returns:
+        The ranking of all versions, where the winner was written, and the PDF result.
+    
+    Use this when the user wants to compare emphasis options. No need to call
+    generate_pdf afterwards.
     """
-    lines = content.split('\n')
-    fixed_lines = []
-    
-    in_header = False
-    in_skills = False
-    in_education = False
-    
-    for i, line in enumerate(lines):
-        # Detect sections
-        if line.startswith('# '):  # Name line
-            in_header = True
-            in_skills = False
-            in_education = False
-        elif line.startswith('## SKILLS'):
-            in_skills = True
-            in_header = False
-            in_education = False
-        elif line.startswith('## EDUCATION'):
-            in_education = True
-            in_skills = False
-            in_header = False
-        elif line.startswith('## '):  # Other section
-            in_header = False
-            in_skills = False
-            in_education = False
-        
-        # Add two spaces to lines that need them
-        next_line = lines[i + 1] if i + 1 < len(lines) else ''
-        
-        # Header section: name, title, contact lines (before first ----)
-        if in_header and line.strip() and not line.startswith('---') and not line.startswith('##'):
-            # LinkedIn/last header line should get spaces too if followed by blank line then ---
-            next_next_line = lines[i + 2] if i + 2 < len(lines) else ''
-            should_add_spaces = (
-                (next_line.strip() and not next_line.startswith('---')) or  # Another header line follows
-                (not next_line.strip() and next_next_line.startswith('---'))  # Blank line then separator
-            )
-            if should_add_spaces and not line.endswith('  '):
-                line = line.rstrip() + '  '
-        
-        # Skills section: Competencies, Soft Skills, Tools, Languages lines
-        elif in_skills and line.startswith('**') and ':' in line:
-            # Add two spaces to all skill category lines except the last one
-            next_is_skill_line = next_line.startswith('**') and ':' in next_line
-            if next_is_skill_line and not line.endswith('  '):
-                line = line.rstrip() + '  '
-        
-        # Education section: degree lines
-        elif in_education and line.startswith('**'):
-            if not line.endswith('  ') and next_line.startswith('**'):
-                line = line.rstrip() + '  '
-        
-        fixed_lines.append(line)
+    from concurrent.futures import ThreadPoolExecutor
+    from langchain_core.prompts import ChatPromptTemplate
+    from cv_variants import (DEFAULT_EMPHASES, MAX_CONCURRENT_DRAFTS, emphasis_instructions,
+                             format_ranking, rank_variants, save_variants)
+    
+    user_path = os.path.join(DATA_DIR, "user.md")
+    try:
+        with open(user_path, "r") as f:
+            profile_text = f.read()
+        profile = user_profile.load(user_path)
+    except FileNotFoundError:
+        return "Error: user.md not found. Please create data/user.md with your information."
+    
+    emphases = list(dict.fromkeys(e.strip() for e in emphases or [] if e.strip())) or DEFAULT_EMPHASES
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", _VARIANT_SYSTEM_PROMPT),
+        ("human", "PROFILE:\n{profile}\n\nJOB DESCRIPTION:\n{job_description}\n\n"
+                  "REQUIREMENTS:\n{requirements}"),
+    ])
+    chain = prompt | chat_model(LLM_MODEL).with_structured_output(CVDraft)
+    
+    def draft(emphasis: str) -> str:
+        selection = guarded("openai", LLM_MODEL, chain.invoke, {
+            "emphasis": emphasis_instructions(emphasis),
+            "profile": profile_text,
+            "job_description": job_description,
+            "requirements": requirements,
+        })
+        return assemble_cv(_as_dict(selection), profile)
+    
+    drafts, failures = {}, {}
+    with ThreadPoolExecutor(max_workers=min(len(emphases), MAX_CONCURRENT_DRAFTS)) as pool:
+        futures = {emphasis: pool.submit(draft, emphasis) for emphasis in emphases}
+        for emphasis, future in futures.items():
+            try:
+                drafts[emphasis] = future.result()
+            except Exception as e:
+                failures[emphasis] = str(e)
+    
+    # Only drafts that pass the template can win; nothing is written otherwise
+    gaps = profile_gaps(profile)
+    for emphasis, markdown in list(drafts.items()):
+        normalized, violations = validate_cv(markdown, optional_sections=gaps)
+        blocking = errors(violations)
+        if blocking:
+            failures[emphasis] = "template errors: " + "; ".join(v.message for v in blocking)
+            del drafts[emphasis]
+        else:
+            drafts[emphasis] = normalized
+    if not drafts:
+        return "Error drafting CV variants (nothing written): " + "; ".join(
+            f"{k}: {v}" for k, v in failures.items())
+    
+    try:
+        ranked = rank_variants(drafts, requirements, target_pages)
+    except Exception as e:
+        return f"Error scoring CV variants: {str(e)}"
+    report = "Variants (best first):\n" + format_ranking(ranked)
+    if failures:
+        report += "\nDropped: " + "; ".join(f"{k}: {v}" for k, v in failures.items())
+    
+    result = _save_cv(job_name, drafts[ranked[0]["emphasis"]], source_url, "write_cv_variants", gaps)
+    if not result.startswith("CV written"):
+        return f"{report}\n\n{result}"
+    
+    safe_name = job_name.lower().replace(" ", "_").replace("-", "_")
+    # Replaces the drafts of earlier runs, even when there are no others now
+    others = save_variants(OUTPUT_DIR, safe_name,
+                           {r["emphasis"]: drafts[r["emphasis"]] for r in ranked[1:]})
+    report += f"\n\nKept '{ranked[0]['emphasis']}' as {os.path.join(OUTPUT_DIR, f'cv_{safe_name}.md')}."
+    if len(ranked) > 1:
+        report += f" Other versions: {others}"
+    return f"{report}\n{generate_pdf.invoke({'job_name': job_name})}"
+
+
+def _as_dict(value) -> dict:
+    """Tool args may arrive as pydantic models or plain dicts."""
+    return value.model_dump() if hasattr(value, "model_dump") else dict(value)
+
+
+def _save_cv(job_name: str, content: str, source_url: str, tool_name: str,
+             optional_sections: tuple[str, ...] = ()) -> str:
+    """Validate CV markdown against the template and write it with its catalog entry."""
+    # Sanitize job name for filename
+    safe_name = job_name.lower().replace(" ", "_").replace("-", "_")
+    
+    # Ensure output directory exists
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    
+    # Check structure against template.md and fix formatting (trailing
+    # two spaces for line breaks, blank lines) in one pass
+    content, violations = validate_cv(content, optional_sections=optional_sections)
+    blocking = errors(violations)
+    if blocking:
+        return (
+            f"CV NOT written: {len(blocking)} template violation(s). Fix only these "
+            f"and call {tool_name} again:\n{violations_json(blocking)}"
+        )
+    
+    cv_path = os.path.join(OUTPUT_DIR, f"cv_{safe_name}.md")
+    try:
+        # Writes the file and its catalog entry together
+        write_cv_file(safe_name, cv_path, content, source_url)
+        # A layout fitted to the previous text no longer applies
+        clear_fit(cv_path)
+    except Exception as e:
+        return f"Error writing CV: {str(e)}"
     
-    return '\n'.join(fixed_lines)
+    warnings = [v for v in violations if v.severity == "warning"]
+    note = f"\nTemplate warnings (optional fixes):\n{violations_json(warnings)}" if warnings else ""
+    return f"CV written to {cv_path}. Now call generate_pdf('{job_name}') to create the PDF.{note}"
 
 
 @tool
@@ -240,6 +471,33 @@ def generate_pdf(job_name: str) -> str:
     
     This should be called after write_cv to generate the final PDF.
     """
+    global _renders_in_flight
+    with _renders_lock:
+        _renders_in_flight += 1
+    try:
+        return _render_cv_pdf(job_name)
+    finally:
+        with _renders_lock:
+            _renders_in_flight -= 1
+
+
+# Number of generate_pdf renders currently running (render queue depth)
+_renders_in_flight = 0
+_renders_lock = threading.Lock()
+
+
+def renders_in_flight() -> int:
+    """Return how many CV renders are running right now in this process."""
+    return _renders_in_flight
+
+
+def _render_cv_pdf(job_name: str, only_if_stale: bool = False) -> str:
+    """Render cv_<job_name>.md to PDF (or HTML when no engine exists).
+    
+    Holds the PDF's render lock, so the prerender service and the web
+    routes never write the same file at the same time. With
+    ``only_if_stale``, a PDF newer than all of its inputs is kept.
+    """
     import pypandoc
     
     # Sanitize job name for filename
@@ -262,46 +520,45 @@ def generate_pdf(job_name: str) -> str:
         if pdf_engine is None:
             # Fallback to HTML
             html_path = os.path.join(OUTPUT_DIR, f"cv_{safe_name}.html")
-            pypandoc.convert_file(
-                md_path,
-                'html',
-                outputfile=html_path,
-                extra_args=[
-                    '--standalone',
-                    '--css', css_path,
-                    '--metadata', 'title=CV'
-                ]
-            )
+            with render_lock(html_path):
+                tmp_path = temp_output_path(html_path)
+                pypandoc.convert_file(
+                    md_path,
+                    'html',
+                    outputfile=tmp_path,
+                    extra_args=[
+                        '--standalone',
+                        '--css', css_path,
+                        '--metadata', 'title=CV'
+                    ]
+                )
+                os.replace(tmp_path, html_path)
+                record_pdf(safe_name, md_path, html_path, "html")
             return f"PDF engine not available. HTML created at {html_path}. Open in browser and print to PDF."
         
-        # Build extra args based on engine
-        extra_args = ['--standalone', f'--pdf-engine={pdf_engine}']
-        
+        header_path = os.path.join(ASSETS_DIR, "cv_header.tex")
         if pdf_engine in ['pdflatex', 'xelatex']:
-            # LaTeX-specific settings for proper list rendering
-            # Create a header file to ensure proper list formatting
-            latex_header = os.path.join(ASSETS_DIR, "cv_header.tex")
-            _ensure_latex_header(latex_header)
-            
-            extra_args.extend([
-                '-V', 'geometry:margin=0.6in',
-                '-V', 'fontsize=10pt',
-                '-V', 'linestretch=1.05',
-                '-H', latex_header,  # Include custom header for list styling
-            ])
-        elif pdf_engine == 'wkhtmltopdf':
-            # wkhtmltopdf uses CSS
-            extra_args.extend(['--css', css_path])
-        else:
-            # For weasyprint - best option for CSS support
-            extra_args.extend(['--css', css_path])
+            # Custom header for list styling
+            _ensure_latex_header(header_path)
+        extra_args = cv_export.pdf_args(md_path, pdf_engine, css_path)
         
-        pypandoc.convert_file(
-            md_path,
-            'pdf',
-            outputfile=pdf_path,
-            extra_args=extra_args
-        )
+        with render_lock(pdf_path):
+            inputs = [md_path, css_path, header_path, fit_path(md_path)]
+            if only_if_stale and is_fresh(pdf_path, inputs):
+                return f"PDF already up to date at {pdf_path}"
+            tmp_path = temp_output_path(pdf_path)
+            try:
+                pypandoc.convert_file(
+                    md_path,
+                    'pdf',
+                    outputfile=tmp_path,
+                    extra_args=extra_args
+                )
+                os.replace(tmp_path, pdf_path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+            record_pdf(safe_name, md_path, pdf_path, pdf_engine)
         
         return f"PDF generated successfully at {pdf_path}"
         
@@ -309,6 +566,91 @@ def generate_pdf(job_name: str) -> str:
         return f"Error generating PDF: {str(e)}"
 
 
+@tool
+def export_cv(job_name: str, formats: list[str] = ["pdf", "html", "docx", "txt"]) -> str:
+    """Export a CV to several formats at once (PDF, HTML, Word, plain text).
+    
+    Args:
+        job_name: The job identifier (must match a previously written CV)
+        formats: Any of "pdf", "html", "docx", "txt" (default: all four)
+    
+    Returns:
+        The file path and time taken for each format, or error message.
+    
+    Use this when the user asks for a CV in formats other than PDF
+    (e.g. Word for a recruiter). One call produces every format requested.
+    """
+    safe_name = job_name.lower().replace(" ", "_").replace("-", "_")
+    md_path = os.path.join(OUTPUT_DIR, f"cv_{safe_name}.md")
+    
+    if not os.path.exists(md_path):
+        return f"Error: No markdown file found at {md_path}. Call write_cv first."
+    
+    pdf_engine = _get_pdf_engine() if "pdf" in formats else None
+    if pdf_engine in ('pdflatex', 'xelatex'):
+        _ensure_latex_header(os.path.join(ASSETS_DIR, "cv_header.tex"))
+    
+    global _renders_in_flight
+    with _renders_lock:
+        _renders_in_flight += 1
+    try:
+        with render_lock(os.path.join(OUTPUT_DIR, f"cv_{safe_name}.pdf")):
+            report = cv_export.export_cv(md_path, formats, pdf_engine)
+            if "pdf" in report["outputs"]:
+                record_pdf(safe_name, md_path, report["outputs"]["pdf"], pdf_engine)
+    except Exception as e:
+        return f"Error exporting CV: {str(e)}"
+    finally:
+        with _renders_lock:
+            _renders_in_flight -= 1
+    return cv_export.format_report(report)
+
+
+@tool
+def fit_cv_pages(job_name: str, target_pages: int = 1) -> str:
+    """Render a CV to PDF, adjusting font size, margins and line height to fit a page count.
+    
+    Args:
+        job_name: The job identifier (must match a previously written CV)
+        target_pages: Number of pages the PDF must fit on (default 1)
+    
+    Returns:
+        The chosen layout and page count, or the sections that still overflow
+        at the most compact layout (shorten those and call this again).
+    
+    Use this INSTEAD of rewriting the CV when it is only slightly too long.
+    The chosen layout is kept for later generate_pdf calls.
+    """
+    safe_name = job_name.lower().replace(" ", "_").replace("-", "_")
+    
+    md_path = os.path.join(OUTPUT_DIR, f"cv_{safe_name}.md")
+    pdf_path = os.path.join(OUTPUT_DIR, f"cv_{safe_name}.pdf")
+    
+    if not os.path.exists(md_path):
+        return f"Error: No markdown file found at {md_path}. Call write_cv first."
+    
+    pdf_engine = _get_pdf_engine()
+    if pdf_engine not in ('weasyprint', 'pdflatex', 'xelatex'):
+        return "Error: page fitting needs weasyprint, pdflatex or xelatex. Use generate_pdf instead."
+    
+    try:
+        latex_header = os.path.join(ASSETS_DIR, "cv_header.tex")
+        if pdf_engine != 'weasyprint':
+            _ensure_latex_header(latex_header)
+        with render_lock(pdf_path):
+            tmp_path = temp_output_path(pdf_path)
+            try:
+                report = fit_cv(md_path, tmp_path, pdf_engine, target_pages, latex_header)
+                os.replace(tmp_path, pdf_path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+            record_pdf(safe_name, md_path, pdf_path, pdf_engine)
+        return f"PDF generated at {pdf_path}. " + format_report(report)
+    except Exception as e:
+        return f"Error fitting CV to {target_pages} page(s): {str(e)}"
+
+
 def _ensure_latex_header(header_path: str) -> None:
     """Create LaTeX header file for proper CV formatting."""
     header_content = r"""% CV LaTeX Header - Ensures proper list rendering
@@ -331,7 +673,12 @@ def _ensure_latex_header(header_path: str) -> None:
 % Better paragraph spacing
 \setlength{\parskip}{4pt}
 """
-    # Only write if doesn't exist or needs update
+    # Only write if doesn't exist or needs update (rewriting it on every
+    # render would wake up the prerender watcher for no reason)
+    if os.path.exists(header_path):
+        with open(header_path, 'r') as f:
+            if f.read() == header_content:
+                return
     os.makedirs(os.path.dirname(header_path), exist_ok=True)
     with open(header_path, 'w') as f:
         f.write(header_content)
@@ -364,6 +711,15 @@ def _get_pdf_engine() -> str | None:
     return None
 
 
+def _posting_index(method: str, *args):
+    """Call a JobIndex method; the index is only a cache, so failures are ignored."""
+    try:
+        from job_index import job_index
+        return getattr(job_index(), method)(*args)
+    except Exception:
+        return None
+
+
 @tool
 def extract_job_url(url: str) -> str:
     """Extract job description content from a URL using FireCrawl.
@@ -375,42 +731,65 @@ def extract_job_url(url: str) -> str:
     
     Returns:
         The extracted job description content in clean markdown format.
+        If the page looks like a repost of a job already processed, a
+        NEAR-DUPLICATE notice with the stored results comes first.
         
     Note: FireCrawl with onlyMainContent=True provides very clean output.
     You may still want to call clean_job_description() for additional cleanup.
     
     Use this when the user provides a job URL instead of a text description.
     """
+    if not os.getenv("FIRECRAWL_API_KEY"):
+        return "Error: FIRECRAWL_API_KEY environment variable not set"
+    
     try:
-        # FireCrawl API key from environment
-        api_key = os.getenv("FIRECRAWL_API_KEY")
-        if not api_key:
-            return "Error: FIRECRAWL_API_KEY environment variable not set"
-        
-        # FireCrawl scrape parameters for optimal job description extraction
-        scrape_params = {
-            "onlyMainContent": True,  # Extract only main content, no nav/footer
-            "formats": ["markdown"],  # Output in markdown format
-            "maxAge": 172800000,       # Cache for 2 days (in milliseconds)
-        }
+        # The prefetch node may already have scraped this URL
+        content = prefetch.take_scrape(url)
+        if content is None:
+            content = _scrape_job_url(url)
         
-        loader = FireCrawlLoader(
-            api_key=api_key,
-            url=url,
-            mode="scrape",  # scrape single page
-            params=scrape_params
-        )
-        docs = loader.load()
-        
-        if docs:
-            # Return the page content from the first document
-            return docs[0].page_content
-        else:
-            return "Error: No content extracted from URL"
+        # A possible repost is flagged; the agent compares and decides
+        match = _posting_index("find_in_page", content)
+        _posting_index("record_scrape", url, content)
+        if match is not None:
+            from job_index import format_match
+            notice = format_match(match, "ignore this note and process the NEW POSTING below.")
+            return f"{notice}\n\nNEW POSTING:\n{content}"
+        return content
     except Exception as e:
         return f"Error extracting job description from URL: {str(e)}"
 
 
+def _scrape_job_url(url: str) -> str:
+    """Scrape ``url`` with FireCrawl and return the page markdown (raises on failure)."""
+    # FireCrawl API key from environment
+    api_key = os.getenv("FIRECRAWL_API_KEY")
+    if not api_key:
+        raise RuntimeError("FIRECRAWL_API_KEY environment variable not set")
+    
+    # FireCrawl scrape parameters for optimal job description extraction
+    scrape_params = {
+        "onlyMainContent": True,  # Extract only main content, no nav/footer
+        "formats": ["markdown"],  # Output in markdown format
+        "maxAge": 172800000,       # Cache for 2 days (in milliseconds)
+    }
+    
+    from langchain_community.document_loaders.firecrawl import FireCrawlLoader
+    
+    loader = FireCrawlLoader(
+        api_key=api_key,
+        api_url=os.getenv("FIRECRAWL_API_URL"),  # Self-hosted or stub endpoint
+        url=url,
+        mode="scrape",  # scrape single page
+        params=scrape_params
+    )
+    docs = guarded("firecrawl", "scrape", loader.load)
+    if not docs:
+        raise RuntimeError("No content extracted from URL")
+    # Return the page content from the first document
+    return docs[0].page_content
+
+
 @tool
 def clean_job_description(raw_content: str) -> str:
     """Extract only the actual job description from scraped content.
@@ -433,7 +812,25 @@ def clean_job_description(raw_content: str) -> str:
     
     IMPORTANT: Call this AFTER extract_job_url and BEFORE translate_job_description.
     """
-    llm = ChatOpenAI(model="gpt-5.2")
+    # The prefetch node may already be cleaning this page
+    cleaned = prefetch.take_clean(raw_content)
+    if cleaned is not None:
+        return cleaned
+    try:
+        return _clean_job_description(raw_content)
+    except Exception as e:
+        return f"Error cleaning job description: {str(e)}"
+
+
+def _clean_job_description(raw_content: str) -> str:
+    """Cleaned posting from the job index, or from the LLM (raises on failure)."""
+    cached = _posting_index("cached_clean", raw_content)
+    if cached:
+        return cached
+    
+    from langchain_core.prompts import ChatPromptTemplate
+    
+    llm = chat_model(LLM_MODEL)
     
     prompt = ChatPromptTemplate.from_messages([
         ("system", """Extract ONLY the job posting content. Remove everything else.
@@ -461,12 +858,10 @@ Do NOT add any commentary. Do NOT summarize. Just extract the job posting."""),
         ("human", "{raw_content}")
     ])
     
-    try:
-        chain = prompt | llm
-        response = chain.invoke({"raw_content": raw_content})
-        return response.content
-    except Exception as e:
-        return f"Error cleaning job description: {str(e)}"
+    chain = prompt | llm
+    response = guarded("openai", LLM_MODEL, chain.invoke, {"raw_content": raw_content})
+    _posting_index("record_clean", raw_content, response.content)
+    return response.content
 
 
 @tool
@@ -488,7 +883,13 @@ def translate_job_description(clean_job_description: str) -> str:
     CRITICAL: This should receive CLEANED content (after clean_job_description).
     Core goal: MAINTAIN ALL CONTENTS - don't lose any requirements, responsibilities, or details.
     """
-    llm = ChatOpenAI(model="gpt-5.2")
+    cached = _posting_index("cached_translation", clean_job_description)
+    if cached:
+        return cached
+    
+    from langchain_core.prompts import ChatPromptTemplate
+    
+    llm = chat_model(LLM_MODEL)
     
     prompt = ChatPromptTemplate.from_messages([
         ("system", """You are a professional translator specializing in job descriptions and technical content.
@@ -527,14 +928,15 @@ Remember: Your primary goal is COMPLETENESS. Every detail matters for CV matchin
     
     try:
         chain = prompt | llm
-        response = chain.invoke({"job_description": clean_job_description})
+        response = guarded("openai", LLM_MODEL, chain.invoke, {"job_description": clean_job_description})
+        _posting_index("record_translation", clean_job_description, response.content)
         return response.content
     except Exception as e:
         return f"Error translating job description: {str(e)}"
 
 
 @tool
-def analyze_job_requirements(job_description: str) -> str:
+def analyze_job_requirements(job_description: str, check_reposts: bool = True) -> str:
     """Analyze a job description and extract structured requirements for CV tailoring.
     
     This tool uses AI to identify and categorize:
@@ -546,14 +948,28 @@ def analyze_job_requirements(job_description: str) -> str:
     
     Args:
         job_description: The full text of the job description (should be in English)
+        check_reposts: Set to false once you have compared a NEAR-DUPLICATE
+                       notice and decided this is a different job
     
     Returns:
         Structured JSON-formatted requirements that should be used to tailor the CV.
         This output should guide which skills to emphasize and what terminology to use.
+        For a possible repost of an analyzed job, a NEAR-DUPLICATE notice instead.
     
     IMPORTANT: If job description is not in English, call translate_job_description first!
     """
-    llm = ChatOpenAI(model="gpt-5.2")
+    cached = _posting_index("cached_analysis", job_description)
+    if cached:
+        return cached
+    if check_reposts:
+        match = _posting_index("find", job_description, "text", "analysis")
+        if match is not None:
+            from job_index import format_match
+            return format_match(match, "call analyze_job_requirements again with check_reposts=false.")
+    
+    from langchain_core.prompts import ChatPromptTemplate
+    
+    llm = chat_model(LLM_MODEL)
     
     prompt = ChatPromptTemplate.from_messages([
         ("system", """You are a job requirements analyzer. Extract and categorize key requirements from job descriptions.
@@ -584,12 +1000,43 @@ Be specific and extract exact terms from the job description. Don't generalize."
     
     try:
         chain = prompt | llm
-        response = chain.invoke({"job_description": job_description})
+        response = guarded("openai", LLM_MODEL, chain.invoke, {"job_description": job_description})
+        _posting_index("record_analysis", job_description, response.content)
         return response.content
     except Exception as e:
         return f"Error analyzing job requirements: {str(e)}"
 
 
+@tool
+def score_cv_keywords(job_name: str, requirements: str) -> str:
+    """Score how well a written CV covers the job's requirements (local, no AI call).
+    
+    Args:
+        job_name: The job identifier (must match a previously written CV)
+        requirements: The JSON output of analyze_job_requirements
+    
+    Returns:
+        Overall keyword coverage plus coverage per category (skills, tools,
+        soft skills, verbs, languages) and the requirement terms the CV misses.
+    
+    Use this after write_cv to spot missing keywords. Only add missing terms
+    the user can actually demonstrate (see Content Tiers).
+    """
+    safe_name = job_name.lower().replace(" ", "_").replace("-", "_")
+    cv_path = os.path.join(OUTPUT_DIR, f"cv_{safe_name}.md")
+    
+    if not os.path.exists(cv_path):
+        return f"Error: No CV found for job '{job_name}'. Call write_cv first."
+    
+    try:
+        from ats_score import score_cv, format_score
+        
+        with open(cv_path, "r") as f:
+            return format_score(score_cv(f.read(), requirements))
+    except Exception as e:
+        return f"Error scoring CV: {str(e)}"
+
+
 @tool
 def polish_cv(cv_markdown: str, job_description: str) -> str:
     """
@@ -610,7 +1057,9 @@ def polish_cv(cv_markdown: str, job_description: str) -> str:
     
     IMPORTANT: Call this AFTER write_cv and BEFORE generate_pdf
     """
-    llm = ChatOpenAI(model="gpt-5.2")
+    from langchain_core.prompts import ChatPromptTemplate
+    
+    llm = chat_model(LLM_MODEL)
     
     prompt = ChatPromptTemplate.from_messages([
         ("system", """You are a CV editor ensuring professional, standardized language.
@@ -660,7 +1109,7 @@ Output the polished CV markdown:""")
     
     try:
         chain = prompt | llm
-        response = chain.invoke({
+        response = guarded("openai", LLM_MODEL, chain.invoke, {
             "cv_markdown": cv_markdown,
             "job_description": job_description
         })
@@ -674,12 +1123,18 @@ __all__ = [
     'read_template',
     'read_user_data',
     'write_user_data',
+    'patch_user_data',
     'read_cv',
     'write_cv',
+    'write_cv_structured',
+    'write_cv_variants',
     'generate_pdf',
+    'export_cv',
+    'fit_cv_pages',
     'extract_job_url',
     'clean_job_description',
     'translate_job_description',
     'analyze_job_requirements',
+    'score_cv_keywords',
     'polish_cv'
 ]
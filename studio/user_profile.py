@@ -0,0 +1,186 @@
+"""
+Parser for the user's profile (data/user.md).
+
+The profile is parsed into a tree of heading nodes that keeps every line
+verbatim, so serialize(parse(text)) == text. On top of the tree there are
+typed views of the parts the CV tools need: personal info, roles,
+education and languages.
+
+Heading levels are not fixed (the example profile nests data sections
+under "## YOUR DATA" and uses "####" for roles), so sections are found by
+title and entries are the headings one level below them.
+"""
+
+import os
+import re
+import threading
+from dataclasses import dataclass, field
+
+_HEADING_RE = re.compile(r"^(#{1,6})\s+(.*?)\s*$")
+_FIELD_RE = re.compile(r"^\s*[-*]\s+\*\*(.+?):?\*\*:?\s*(.*?)\s*$")
+_BULLET_RE = re.compile(r"^\s*[-*]\s+(.*?)\s*$")
+_DATE_LINE_RE = re.compile(r"^\*[^*].*\*$")
+
+# Section title keywords (case-insensitive) for the typed views
+SECTION_KEYWORDS = {
+    "personal": ("personal information", "personal info", "contact"),
+    "summary": ("summary",),
+    "experience": ("experience",),
+    "education": ("education",),
+    "languages": ("languages",),
+    "skills": ("skills",),
+}
+
+
+@dataclass
+class Node:
+    """A heading and everything under it until the next heading of the same or higher level."""
+    level: int                     # 0 for the document root
+    title: str
+    heading: str | None            # original heading line (None for root)
+    body: list[str] = field(default_factory=list)   # lines before the first child
+    children: list["Node"] = field(default_factory=list)
+
+    def lines(self) -> list[str]:
+        out = [] if self.heading is None else [self.heading]
+        out.extend(self.body)
+        for child in self.children:
+            out.extend(child.lines())
+        return out
+
+    def walk(self):
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+
+def parse(text: str) -> Node:
+    """Parse markdown into a heading tree. Lossless: see serialize()."""
+    root = Node(level=0, title="", heading=None)
+    stack = [root]
+    in_code = False
+    for line in text.split("\n"):
+        if line.startswith("```"):
+            in_code = not in_code
+        match = None if in_code else _HEADING_RE.match(line)
+        if match is None:
+            stack[-1].body.append(line)
+            continue
+        level = len(match.group(1))
+        while stack[-1].level >= level:
+            stack.pop()
+        node = Node(level=level, title=match.group(2), heading=line)
+        stack[-1].children.append(node)
+        stack.append(node)
+    return root
+
+
+def serialize(root: Node) -> str:
+    return "\n".join(root.lines())
+
+
+# path -> ((mtime_ns, size), root); see load()
+_PARSED: dict[str, tuple[tuple[int, int], Node]] = {}
+_PARSED_LOCK = threading.Lock()
+
+
+def _stamp(path: str) -> tuple[int, int]:
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def load(path: str) -> Node:
+    """Parse the profile at ``path``, reusing the last parse while the file is unchanged.
+
+    The returned tree is shared: read it, do not modify it.
+    """
+    stamp = _stamp(path)
+    with _PARSED_LOCK:
+        cached = _PARSED.get(path)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+    with open(path, "r") as f:
+        root = parse(f.read())
+    with _PARSED_LOCK:
+        _PARSED[path] = (stamp, root)
+    return root
+
+
+def cache_parsed(path: str, root: Node) -> None:
+    """Record ``root`` as the parse of the file just written to ``path``."""
+    stamp = _stamp(path)
+    with _PARSED_LOCK:
+        _PARSED[path] = (stamp, root)
+
+
+def find_section(root: Node, kind: str) -> Node | None:
+    """Return the first heading whose title matches a SECTION_KEYWORDS kind."""
+    keywords = SECTION_KEYWORDS[kind]
+    for node in root.walk():
+        if node.heading is not None and any(k in node.title.lower() for k in keywords):
+            return node
+    return None
+
+
+@dataclass
+class Role:
+    title: str
+    company: str
+    date_line: str                 # "*Jan 2020 – Present | Berlin*" (may be "")
+    focus: str
+    bullets: list[str]
+    node: Node
+
+    @property
+    def label(self) -> str:
+        return f"{self.title} | {self.company}" if self.company else self.title
+
+
+def _role_from_node(node: Node) -> Role:
+    title, _, company = node.title.partition(" | ")
+    date_line, focus, bullets = "", "", []
+    for line in node.body:
+        stripped = line.strip()
+        if not date_line and _DATE_LINE_RE.match(stripped):
+            date_line = stripped
+        elif stripped.startswith("**Focus"):
+            focus = stripped.split(":", 1)[1].lstrip("*").strip() if ":" in stripped else ""
+        else:
+            match = _BULLET_RE.match(line)
+            if match:
+                bullets.append(match.group(1))
+    return Role(title.strip(), company.strip(), date_line, focus, bullets, node)
+
+
+def roles(root: Node) -> list[Role]:
+    """Roles in profile order (entries under the experience section)."""
+    section = find_section(root, "experience")
+    if section is None:
+        return []
+    return [_role_from_node(child) for child in section.children]
+
+
+def personal_info(root: Node) -> dict[str, str]:
+    """Fields like {'name': ..., 'email': ...} from '- **Field:** value' lines."""
+    section = find_section(root, "personal")
+    info = {}
+    if section is None:
+        return info
+    for line in section.body:
+        match = _FIELD_RE.match(line)
+        if match:
+            info[match.group(1).strip().lower()] = match.group(2).strip()
+    return info
+
+
+def list_items(root: Node, kind: str) -> list[str]:
+    """Bullet items in a section's body (education, languages, ...)."""
+    section = find_section(root, kind)
+    if section is None:
+        return []
+    items = []
+    for line in section.body:
+        match = _BULLET_RE.match(line)
+        if match and not line.lstrip().startswith("**INSTRUCTIONS"):
+            items.append(match.group(1))
+    return items
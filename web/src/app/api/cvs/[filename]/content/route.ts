@@ -1,12 +1,70 @@
 import { NextRequest, NextResponse } from "next/server";
 import fs from "fs";
 import path from "path";
+import { spawn } from "child_process";
 
-const OUTPUT_DIR = path.join(process.cwd(), "..", "data", "output");
+const BASE_DIR = path.join(process.cwd(), "..");
+const OUTPUT_DIR = path.join(BASE_DIR, "data", "output");
+const SCHEMA_SCRIPT = path.join(BASE_DIR, "studio", "cv_schema.py");
+const CATALOG_SCRIPT = path.join(BASE_DIR, "studio", "catalog.py");
+
+interface NormalizeResult {
+  content: string;
+  violations: unknown[];
+}
+
+/**
+ * Normalize markdown and check it against data/template.md with the same
+ * single-pass validator write_cv uses (studio/cv_schema.py).
+ */
+function normalizeWithSchema(content: string): Promise<NormalizeResult> {
+  return new Promise((resolve, reject) => {
+    const child = spawn("python3", [SCHEMA_SCRIPT, "--normalize"], { cwd: BASE_DIR });
+    let stdout = "";
+    const timer = setTimeout(() => child.kill(), 10000);
+
+    child.stdout.on("data", (chunk) => (stdout += chunk));
+    child.on("error", reject);
+    child.on("close", () => {
+      clearTimeout(timer);
+      try {
+        resolve(JSON.parse(stdout));
+      } catch (error) {
+        reject(error);
+      }
+    });
+    child.stdin.end(content, "utf-8");
+  });
+}
+
+/**
+ * Write the CV through the catalog (studio/catalog.py write), so the file
+ * and its catalog row are updated together.
+ */
+function writeThroughCatalog(jobName: string, content: string): Promise<void> {
+  return new Promise((resolve, reject) => {
+    const child = spawn("python3", [CATALOG_SCRIPT, "write", jobName], { cwd: BASE_DIR });
+    let stderr = "";
+    const timer = setTimeout(() => child.kill(), 10000);
+
+    child.stderr.on("data", (chunk) => (stderr += chunk));
+    child.on("error", reject);
+    child.on("close", (code) => {
+      clearTimeout(timer);
+      if (code === 0) {
+        resolve();
+      } else {
+        reject(new Error(stderr || `catalog.py exited with ${code}`));
+      }
+    });
+    child.stdin.end(content, "utf-8");
+  });
+}
 
 /**
  * Fix markdown line breaks by adding two trailing spaces where needed.
- * This ensures proper rendering in PDF.
+ * This ensures proper rendering in PDF. Fallback for when the Python
+ * validator cannot run.
  */
 function fixMarkdownLineBreaks(content: string): string {
   const lines = content.split("\n");
@@ -85,11 +143,25 @@ export async function PUT(
     const mdFilename = filename.endsWith(".md") ? filename : filename.replace(".pdf", ".md");
     const filePath = path.join(OUTPUT_DIR, mdFilename);
 
-    // Fix markdown line breaks before saving
-    content = fixMarkdownLineBreaks(content);
+    // Normalize formatting before saving; violations are reported to the
+    // editor but never block a manual save
+    let violations: unknown[] = [];
+    try {
+      ({ content, violations } = await normalizeWithSchema(content));
+    } catch (error) {
+      console.error("CV validator unavailable, using basic line-break fix:", error);
+      content = fixMarkdownLineBreaks(content);
+    }
 
-    fs.writeFileSync(filePath, content, "utf-8");
-    return NextResponse.json({ success: true });
+    const jobName = mdFilename.replace(/^cv_/, "").replace(/\.md$/, "");
+    try {
+      await writeThroughCatalog(jobName, content);
+    } catch (error) {
+      // Reconciled by the next catalog sync (prerender service or catalog.py sync)
+      console.error("Catalog unavailable, writing file directly:", error);
+      fs.writeFileSync(filePath, content, "utf-8");
+    }
+    return NextResponse.json({ success: true, violations });
   } catch (error) {
     console.error("Error saving CV content:", error);
     return NextResponse.json({ success: false }, { status: 500 });
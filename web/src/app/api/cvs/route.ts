@@ -1,25 +1,87 @@
-import { NextResponse } from "next/server";
+import { NextRequest, NextResponse } from "next/server";
 import fs from "fs";
 import path from "path";
+import { execFile } from "child_process";
+import { promisify } from "util";
 
-const OUTPUT_DIR = path.join(process.cwd(), "..", "data", "output");
+const execFileAsync = promisify(execFile);
 
-export async function GET() {
-  try {
-    if (!fs.existsSync(OUTPUT_DIR)) {
-      return NextResponse.json({ cvs: [] });
-    }
+const BASE_DIR = path.join(process.cwd(), "..");
+const OUTPUT_DIR = path.join(BASE_DIR, "data", "output");
+const CATALOG_SCRIPT = path.join(BASE_DIR, "studio", "catalog.py");
 
-    const files = fs.readdirSync(OUTPUT_DIR);
-    const cvs = files
-      .filter((f) => f.startsWith("cv_") && f.endsWith(".pdf"))
-      .sort();
+interface CatalogItem {
+  job_name: string;
+  pdf_filename: string | null;
+  [key: string]: unknown;
+}
 
-    return NextResponse.json({ cvs });
-  } catch (error) {
-    console.error("Error reading CVs:", error);
-    return NextResponse.json({ cvs: [] });
+/**
+ * Query the SQLite catalog maintained by write_cv / generate_pdf.
+ * Supports ?limit=, ?cursor=, ?q=, ?sync=true and ?since= (change feed).
+ */
+async function queryCatalog(req: NextRequest) {
+  const params = req.nextUrl.searchParams;
+  const since = params.get("since");
+
+  const args = since !== null
+    ? [CATALOG_SCRIPT, "changes", "--since", String(parseInt(since, 10) || 0)]
+    : [
+        CATALOG_SCRIPT,
+        "list",
+        "--has-pdf",
+        "--limit",
+        String(Math.min(parseInt(params.get("limit") || "50", 10) || 50, 500)),
+      ];
+
+  if (since === null) {
+    const cursor = params.get("cursor");
+    const query = params.get("q");
+    if (cursor) args.push("--cursor", cursor);
+    if (query) args.push("--query", query);
+    if (params.get("sync") === "true") args.push("--sync");
   }
+
+  const { stdout } = await execFileAsync("python3", args, {
+    timeout: 10000,
+    cwd: BASE_DIR,
+  });
+  return JSON.parse(stdout);
 }
 
+/**
+ * Directory listing of the PDFs, used only when the catalog is unavailable.
+ */
+function scanOutputDir(): string[] {
+  if (!fs.existsSync(OUTPUT_DIR)) {
+    return [];
+  }
+  return fs
+    .readdirSync(OUTPUT_DIR)
+    .filter((f) => f.startsWith("cv_") && f.endsWith(".pdf"))
+    .sort();
+}
 
+export async function GET(req: NextRequest) {
+  try {
+    const result = await queryCatalog(req);
+    if (result.events) {
+      return NextResponse.json(result);
+    }
+    const items: CatalogItem[] = result.items;
+    return NextResponse.json({
+      cvs: items.map((item) => item.pdf_filename as string).sort(),
+      items,
+      nextCursor: result.next_cursor,
+      lastSeq: result.last_seq,
+    });
+  } catch (error) {
+    console.error("Catalog unavailable, scanning output directory:", error);
+    try {
+      return NextResponse.json({ cvs: scanOutputDir() });
+    } catch (scanError) {
+      console.error("Error reading CVs:", scanError);
+      return NextResponse.json({ cvs: [] });
+    }
+  }
+}
@@ -16,7 +16,7 @@ const GENERATE_SCRIPT = path.join(STUDIO_DIR, "generate_profile_pdf.py");
 // Track when the PDF was last generated
 let lastPdfMtime = 0;
 
-async function generateProfilePdf(): Promise<boolean> {
+async function generateProfilePdf(forceRegenerate: boolean): Promise<boolean> {
   try {
     // Check if user.md exists
     if (!fs.existsSync(USER_MD_PATH)) {
@@ -28,7 +28,13 @@ async function generateProfilePdf(): Promise<boolean> {
     const userMdStat = fs.statSync(USER_MD_PATH);
     const userMdMtime = userMdStat.mtimeMs;
 
-    if (fs.existsSync(PROFILE_PDF_PATH) && lastPdfMtime >= userMdMtime) {
+    // The PDF may have been pre-rendered in the background (studio/prerender.py),
+    // so compare against the file on disk, not just our own last render
+    const pdfMtime = fs.existsSync(PROFILE_PDF_PATH)
+      ? Math.max(fs.statSync(PROFILE_PDF_PATH).mtimeMs, lastPdfMtime)
+      : 0;
+
+    if (pdfMtime >= userMdMtime && !forceRegenerate) {
       // PDF is up to date
       return true;
     }
@@ -65,11 +71,7 @@ export async function GET(req: NextRequest) {
     // Force regenerate if requested
     const forceRegenerate = req.nextUrl.searchParams.get("regenerate") === "true";
 
-    if (forceRegenerate) {
-      lastPdfMtime = 0;
-    }
-
-    const success = await generateProfilePdf();
+    const success = await generateProfilePdf(forceRegenerate);
 
     if (!success || !fs.existsSync(PROFILE_PDF_PATH)) {
       return NextResponse.json(
@@ -1,12 +1,14 @@
 import { NextRequest, NextResponse } from "next/server";
-import { exec } from "child_process";
+import { exec, execFile } from "child_process";
 import { promisify } from "util";
 import path from "path";
 import fs from "fs";
 
 const execAsync = promisify(exec);
-const OUTPUT_DIR = path.join(process.cwd(), "..", "data", "output");
-const ASSETS_DIR = path.join(process.cwd(), "..", "assets");
+const execFileAsync = promisify(execFile);
+const BASE_DIR = path.join(process.cwd(), "..");
+const OUTPUT_DIR = path.join(BASE_DIR, "data", "output");
+const EXPORT_SCRIPT = path.join(BASE_DIR, "studio", "cv_export.py");
 
 export async function POST(req: NextRequest) {
   try {
@@ -16,7 +18,6 @@ export async function POST(req: NextRequest) {
     const safeName = filename.startsWith("cv_") ? filename : `cv_${filename}`;
     const mdPath = path.join(OUTPUT_DIR, `${safeName}.md`);
     const pdfPath = path.join(OUTPUT_DIR, `${safeName}.pdf`);
-    const cssPath = path.join(ASSETS_DIR, "cv_style.css");
 
     // Check if markdown exists
     if (!fs.existsSync(mdPath)) {
@@ -42,14 +43,14 @@ export async function POST(req: NextRequest) {
       }
     }
 
-    // Generate PDF using pandoc
-    const extraArgs = pdfEngine === "weasyprint" 
-      ? `--pdf-engine=weasyprint --css="${cssPath}"`
-      : `--pdf-engine=pdflatex -V geometry:margin=0.75in -V fontsize=10pt`;
-
-    const cmd = `pandoc "${mdPath}" -o "${pdfPath}" --standalone ${extraArgs}`;
-    
-    await execAsync(cmd);
+    // Render through studio/cv_export.py: it takes the same per-file lock
+    // as the agent and the prerender service, writes via a temp file and
+    // records the PDF in the catalog
+    await execFileAsync(
+      "python3",
+      [EXPORT_SCRIPT, safeName.replace(/^cv_/, ""), "--formats", "pdf", "--engine", pdfEngine],
+      { timeout: 60000, cwd: BASE_DIR }
+    );
 
     return NextResponse.json({ success: true, path: pdfPath });
   } catch (error: unknown) {
@@ -4,6 +4,7 @@ import { useState, useEffect, useCallback } from "react";
 import { RefreshCw, Download, FileText, ChevronDown, Edit3, Eye, Save, X } from "lucide-react";
 import { useEditor, EditorContent } from "@tiptap/react";
 import StarterKit from "@tiptap/starter-kit";
+import { useLivePreview } from "@/components/LivePreview";
 
 function formatCvName(filename: string): string {
   return filename
@@ -23,11 +24,17 @@ export default function CVPage() {
   const [viewMode, setViewMode] = useState<"pdf" | "edit">("pdf");
   const [mdContent, setMdContent] = useState("");
   const [isSaving, setIsSaving] = useState(false);
+  const [isExporting, setIsExporting] = useState(false);
+
+  // HTML preview that follows saves; PDFs are rendered only on export
+  const jobName = selectedCv.replace(/^cv_/, "").replace(/\.pdf$/, "");
+  const live = useLivePreview(selectedCv ? `cv/${jobName}` : null);
 
   const editor = useEditor({
     extensions: [StarterKit],
     content: "",
     immediatelyRender: false,
+    onUpdate: ({ editor }) => live.sendDraft(htmlToMarkdown(editor.getHTML())),
     editorProps: {
       attributes: {
         class: 'prose prose-sm sm:prose-base lg:prose-lg xl:prose-2xl m-5 focus:outline-none',
@@ -118,9 +125,28 @@ export default function CVPage() {
     }
   }, [selectedCv, viewMode, fetchMdContent]);
 
-  const handleDownload = () => {
-    if (selectedCv) {
+  const regeneratePdf = () =>
+    fetch("/api/regenerate-pdf", {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ filename: selectedCv.replace(".pdf", "") }),
+    });
+
+  const handleExport = async () => {
+    if (!selectedCv) return;
+    setIsExporting(true);
+    try {
+      const res = await regeneratePdf();
+      if (!res.ok) {
+        console.error("PDF export failed:", (await res.json()).error);
+        return;
+      }
+      setPdfUrl(`/api/cvs/${encodeURIComponent(selectedCv)}?t=${Date.now()}`);
       window.open(`/api/cvs/${encodeURIComponent(selectedCv)}?download=true`, "_blank");
+    } catch (error) {
+      console.error("Failed to export PDF:", error);
+    } finally {
+      setIsExporting(false);
     }
   };
 
@@ -141,17 +167,17 @@ export default function CVPage() {
 
       if (res.ok) {
         setMdContent(markdown);
-        // Regenerate PDF
-        await fetch("/api/regenerate-pdf", {
-          method: "POST",
-          headers: { "Content-Type": "application/json" },
-          body: JSON.stringify({ filename: selectedCv.replace(".pdf", "") }),
-        });
-        // Refresh to show new PDF
-        setPdfUrl("");
-        setTimeout(() => {
-          setPdfUrl(`/api/cvs/${encodeURIComponent(selectedCv)}?t=${Date.now()}`);
-        }, 500);
+        if (live.available) {
+          // The live preview picks the save up from disk
+          live.clearDraft();
+        } else {
+          // No live preview server: the PDF is the only preview
+          await regeneratePdf();
+          setPdfUrl("");
+          setTimeout(() => {
+            setPdfUrl(`/api/cvs/${encodeURIComponent(selectedCv)}?t=${Date.now()}`);
+          }, 500);
+        }
       }
     } catch (error) {
       console.error("Failed to save:", error);
@@ -225,10 +251,13 @@ export default function CVPage() {
                 className="btn btn-primary"
               >
                 <Save size={18} />
-                {isSaving ? "Saving..." : "Save & Regenerate"}
+                {isSaving ? "Saving..." : live.available ? "Save" : "Save & Regenerate"}
               </button>
               <button
-                onClick={() => setViewMode("pdf")}
+                onClick={() => {
+                  live.clearDraft();
+                  setViewMode("pdf");
+                }}
                 className="btn btn-ghost"
               >
                 <X size={18} />
@@ -249,13 +278,13 @@ export default function CVPage() {
           </button>
 
           <button
-            onClick={handleDownload}
-            disabled={!selectedCv}
+            onClick={handleExport}
+            disabled={!selectedCv || isExporting}
             className="inline-flex items-center justify-center gap-2 px-4 py-2 rounded-lg font-medium transition-all duration-200 disabled:opacity-50 disabled:cursor-not-allowed text-sm bg-white text-indigo-600 border border-indigo-100 shadow-sm hover:bg-indigo-50 hover:border-indigo-200"
-            title="Download PDF"
+            title="Render and download the PDF"
           >
             <Download size={18} />
-            Download PDF
+            {isExporting ? "Exporting..." : "Export PDF"}
           </button>
         </div>
       </header>
@@ -266,21 +295,41 @@ export default function CVPage() {
           viewMode === "pdf" ? (
             <div className="max-w-6xl mx-auto h-full flex flex-col">
               <div className="bg-white rounded-xl shadow-sm border border-gray-200 overflow-hidden flex-1 relative group transition-all hover:shadow-md">
-                <iframe
-                  src={pdfUrl + "#toolbar=0&navpanes=0&view=FitH"}
-                  className="w-full h-full border-0"
-                  title="CV Preview"
-                />
+                {live.available ? (
+                  <iframe
+                    ref={live.frameRef}
+                    src={live.src}
+                    className="w-full h-full border-0"
+                    title="CV Preview"
+                  />
+                ) : (
+                  <iframe
+                    src={pdfUrl + "#toolbar=0&navpanes=0&view=FitH"}
+                    className="w-full h-full border-0"
+                    title="CV Preview"
+                  />
+                )}
               </div>
             </div>
           ) : (
-            <div className="max-w-4xl mx-auto h-full">
+            <div className={`mx-auto h-full ${live.available ? "max-w-7xl grid grid-cols-2 gap-6" : "max-w-4xl"}`}>
               <div className="bg-white rounded-xl shadow-sm border border-gray-200 p-12 min-h-full">
                 <EditorContent
                   editor={editor}
                   className="prose prose-slate max-w-none focus:outline-none"
                 />
               </div>
+              {live.available && (
+                /* Unsaved edits are rendered here as you type */
+                <div className="bg-white rounded-xl shadow-sm border border-gray-200 overflow-hidden min-h-full">
+                  <iframe
+                    ref={live.frameRef}
+                    src={live.src}
+                    className="w-full h-full border-0"
+                    title="CV Draft Preview"
+                  />
+                </div>
+              )}
             </div>
           )
         ) : (
@@ -4,7 +4,8 @@ import { useState, useEffect, useCallback } from "react";
 import { useEditor, EditorContent } from "@tiptap/react";
 import StarterKit from "@tiptap/starter-kit";
 import Placeholder from "@tiptap/extension-placeholder";
-import { Save, X, Download, Upload, Edit3, Eye, UserCircle, Loader2, RefreshCw } from "lucide-react";
+import { Save, X, Download, Upload, Edit3, Eye, UserCircle, Loader2, RefreshCw, FileText } from "lucide-react";
+import { useLivePreview } from "@/components/LivePreview";
 
 export default function ProfilePage() {
   const [content, setContent] = useState("");
@@ -14,6 +15,9 @@ export default function ProfilePage() {
   const [pdfUrl, setPdfUrl] = useState("");
   const [pdfLoading, setPdfLoading] = useState(true);
 
+  // HTML preview that follows saves; the PDF is rendered only on export
+  const live = useLivePreview("profile");
+
   const editor = useEditor({
     extensions: [
       StarterKit,
@@ -24,6 +28,7 @@ export default function ProfilePage() {
     content: "",
     editable: true,
     immediatelyRender: false,
+    onUpdate: ({ editor }) => live.sendDraft(htmlToMarkdown(editor.getHTML())),
     editorProps: {
       attributes: {
         class: 'prose prose-sm sm:prose-base lg:prose-lg xl:prose-2xl m-5 focus:outline-none',
@@ -66,11 +71,17 @@ export default function ProfilePage() {
       .trim();
   };
 
-  // Refresh PDF preview with cache busting
+  // Refresh the preview: the live page follows saves by itself, so only the
+  // PDF fallback (no live preview server) needs a reload
   const refreshPdf = useCallback(() => {
+    if (live.available) return;
     setPdfLoading(true);
-    setPdfUrl(`/api/profile/pdf?regenerate=true&t=${Date.now()}`);
-  }, []);
+    setPdfUrl(`/api/profile/pdf?t=${Date.now()}`);
+  }, [live.available]);
+
+  const handleExportPdf = () => {
+    window.open(`/api/profile/pdf?regenerate=true&t=${Date.now()}`, "_blank");
+  };
 
   const fetchProfile = useCallback(async () => {
     try {
@@ -127,6 +138,7 @@ export default function ProfilePage() {
 
       if (res.ok) {
         setContent(markdown);
+        live.clearDraft();
         setViewMode("preview");
         // Refresh PDF after saving
         setTimeout(() => refreshPdf(), 100);
@@ -231,7 +243,10 @@ export default function ProfilePage() {
                 {isSaving ? "Saving..." : "Save Changes"}
               </button>
               <button
-                onClick={() => setViewMode("preview")}
+                onClick={() => {
+                  live.clearDraft();
+                  setViewMode("preview");
+                }}
                 className="inline-flex items-center justify-center gap-2 px-4 py-2 rounded-lg font-medium transition-all duration-200 text-sm text-gray-600 hover:bg-gray-100 hover:text-gray-900"
               >
                 <X size={18} />
@@ -248,7 +263,7 @@ export default function ProfilePage() {
             className="inline-flex items-center justify-center gap-2 px-4 py-2 rounded-lg font-medium transition-all duration-200 text-sm bg-white text-gray-700 border border-gray-200 shadow-sm hover:bg-gray-50 hover:text-gray-900 hover:border-gray-300"
             title="Refresh preview"
           >
-            <RefreshCw size={18} className={pdfLoading ? "animate-spin" : ""} />
+            <RefreshCw size={18} className={!live.available && pdfLoading ? "animate-spin" : ""} />
             <span className="sr-only">Refresh</span>
           </button>
 
@@ -272,6 +287,15 @@ export default function ProfilePage() {
             <Download size={18} />
             <span className="hidden sm:inline">Export</span>
           </button>
+
+          <button
+            onClick={handleExportPdf}
+            className="inline-flex items-center justify-center gap-2 px-4 py-2 rounded-lg font-medium transition-all duration-200 text-sm bg-white text-indigo-600 border border-indigo-100 shadow-sm hover:bg-indigo-50 hover:border-indigo-200"
+            title="Render the profile PDF"
+          >
+            <FileText size={18} />
+            <span className="hidden sm:inline">Export PDF</span>
+          </button>
         </div>
       </header>
 
@@ -283,32 +307,53 @@ export default function ProfilePage() {
             <p className="text-sm font-medium">Loading profile data...</p>
           </div>
         ) : viewMode === "preview" ? (
-          /* Preview Mode - PDF iframe like CV page */
+          /* Preview Mode - live HTML page, or the PDF when the live server is not running */
           <div className="max-w-6xl mx-auto h-full flex flex-col">
             <div className="bg-white rounded-xl shadow-sm border border-gray-200 overflow-hidden flex-1 relative group transition-all hover:shadow-md">
-              {pdfLoading && (
-                <div className="absolute inset-0 flex flex-col items-center justify-center bg-white z-10">
-                  <Loader2 size={32} className="animate-spin text-indigo-400" />
-                  <p className="text-sm text-gray-500 mt-3">Generating preview...</p>
-                </div>
+              {live.available ? (
+                <iframe
+                  ref={live.frameRef}
+                  src={live.src}
+                  className="w-full h-full border-0"
+                  title="Profile Preview"
+                />
+              ) : (
+                <>
+                  {pdfLoading && (
+                    <div className="absolute inset-0 flex flex-col items-center justify-center bg-white z-10">
+                      <Loader2 size={32} className="animate-spin text-indigo-400" />
+                      <p className="text-sm text-gray-500 mt-3">Generating preview...</p>
+                    </div>
+                  )}
+                  <iframe
+                    src={pdfUrl + "#toolbar=0&navpanes=0&view=FitH"}
+                    className="w-full h-full border-0"
+                    title="Profile Preview"
+                    onLoad={() => setPdfLoading(false)}
+                  />
+                </>
               )}
-              <iframe
-                src={pdfUrl + "#toolbar=0&navpanes=0&view=FitH"}
-                className="w-full h-full border-0"
-                title="Profile Preview"
-                onLoad={() => setPdfLoading(false)}
-              />
             </div>
           </div>
         ) : (
-          /* Edit Mode - TipTap editor */
-          <div className="max-w-4xl mx-auto h-full">
+          /* Edit Mode - TipTap editor, with the unsaved draft rendered live next to it */
+          <div className={`mx-auto h-full ${live.available ? "max-w-7xl grid grid-cols-2 gap-6" : "max-w-4xl"}`}>
             <div className="bg-white rounded-xl shadow-sm border border-gray-200 p-12 min-h-full ring-2 ring-indigo-500/10 shadow-md">
               <EditorContent
                 editor={editor}
                 className="prose prose-slate max-w-none focus:outline-none"
               />
             </div>
+            {live.available && (
+              <div className="bg-white rounded-xl shadow-sm border border-gray-200 overflow-hidden min-h-full">
+                <iframe
+                  ref={live.frameRef}
+                  src={live.src}
+                  className="w-full h-full border-0"
+                  title="Profile Draft Preview"
+                />
+              </div>
+            )}
           </div>
         )}
       </main>
@@ -0,0 +1,90 @@
+"use client";
+
+import { useCallback, useEffect, useRef, useState } from "react";
+
+// Started with `python3 live_preview.py` in studio/ (see README)
+export const LIVE_PREVIEW_URL = "http://localhost:8765";
+
+const DRAFT_DEBOUNCE_MS = 250;
+
+/**
+ * Live HTML preview of a document ("profile" or "cv/<job_name>") served by
+ * studio/live_preview.py.
+ *
+ * Embed `src` in an iframe attached to `frameRef`: the page follows saves
+ * over its own event stream. `sendDraft` renders unsaved editor content
+ * on the server (POST, nothing is written) and hands the patches to the
+ * iframe; `clearDraft` goes back to the saved version. `available` is
+ * false when the server is not running, so callers can fall back to PDFs.
+ */
+export function useLivePreview(doc: string | null) {
+  const frameRef = useRef<HTMLIFrameElement>(null);
+  const [available, setAvailable] = useState(false);
+  const docRef = useRef(doc);
+  const sequence = useRef(0);
+  const timer = useRef<ReturnType<typeof setTimeout> | null>(null);
+
+  useEffect(() => {
+    docRef.current = doc;
+    if (!doc) {
+      setAvailable(false);
+      return;
+    }
+    let cancelled = false;
+    // Opaque response: only tells whether the server answers
+    fetch(`${LIVE_PREVIEW_URL}/${doc}`, { mode: "no-cors" })
+      .then(() => !cancelled && setAvailable(true))
+      .catch(() => !cancelled && setAvailable(false));
+    return () => {
+      cancelled = true;
+    };
+  }, [doc]);
+
+  const post = useCallback((message: object) => {
+    frameRef.current?.contentWindow?.postMessage({ type: "draft", ...message }, LIVE_PREVIEW_URL);
+  }, []);
+
+  const sendDraft = useCallback(
+    (markdown: string) => {
+      if (timer.current) clearTimeout(timer.current);
+      timer.current = setTimeout(async () => {
+        const current = docRef.current;
+        if (!current) return;
+        const seq = ++sequence.current;
+        try {
+          const res = await fetch(`${LIVE_PREVIEW_URL}/${current}`, {
+            method: "POST",
+            headers: { "Content-Type": "text/markdown; charset=utf-8" },
+            body: markdown,
+          });
+          const data = await res.json();
+          // A slower response for an older draft must not replace a newer one
+          if (res.ok && seq === sequence.current && current === docRef.current) {
+            post({ version: data.version, patches: data.patches });
+          }
+        } catch (error) {
+          console.error("Live preview unavailable:", error);
+        }
+      }, DRAFT_DEBOUNCE_MS);
+    },
+    [post]
+  );
+
+  const clearDraft = useCallback(() => {
+    if (timer.current) clearTimeout(timer.current);
+    sequence.current++;
+    post({ patches: null });
+  }, [post]);
+
+  useEffect(() => () => {
+    if (timer.current) clearTimeout(timer.current);
+  }, []);
+
+  return {
+    available,
+    frameRef,
+    src: doc ? `${LIVE_PREVIEW_URL}/${doc}` : "",
+    sendDraft,
+    clearDraft,
+  };
+}